@@ -0,0 +1,84 @@
+# app/admission.py
+"""
+Controle de admissão para endpoints pesados (CPU/IO longos).
+
+Cada classe de endpoint tem seu próprio limite de concorrência (CapacityLimiter
+dedicado, fora do threadpool padrão do AnyIO) e uma fila limitada; com a fila
+cheia a requisição é recusada com 429 + Retry-After. Endpoints leves (health,
+strategies, leituras) continuam no threadpool padrão e nunca esperam atrás de
+backtests.
+
+Limites por env: ADMISSION_<NOME>_CONCURRENCY, ADMISSION_<NOME>_QUEUE, ADMISSION_RETRY_AFTER.
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import os
+from typing import Any, Callable
+
+import anyio
+from fastapi import HTTPException
+
+from app import metrics
+
+_queue_depth = metrics.gauge("admission_queue_depth", "Requisições aguardando vaga por classe de endpoint")
+_in_flight = metrics.gauge("admission_in_flight", "Requisições em execução por classe de endpoint")
+_admitted = metrics.counter("admission_admitted_total", "Requisições admitidas por classe de endpoint")
+_rejected = metrics.counter("admission_rejected_total", "Requisições recusadas (429) por classe de endpoint")
+
+
+class AdmissionGate:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, retry_after: int = 5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._limiters: dict[int, anyio.CapacityLimiter] = {}  # um por event loop
+        _queue_depth.set_function(lambda: self.queue_depth, gate=name)
+        _in_flight.set_function(lambda: self.in_flight, gate=name)
+
+    def _limiter(self) -> anyio.CapacityLimiter:
+        # limiters ficam presos ao loop onde foram criados (TestClient cria um loop por cliente)
+        key = id(asyncio.get_running_loop())
+        lim = self._limiters.get(key)
+        if lim is None:
+            self._limiters = {key: anyio.CapacityLimiter(self.max_concurrent)}
+            lim = self._limiters[key]
+        return lim
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(lim.statistics().tasks_waiting for lim in list(self._limiters.values()))
+
+    @property
+    def in_flight(self) -> int:
+        return sum(lim.statistics().borrowed_tokens for lim in list(self._limiters.values()))
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa `func` numa thread deste gate, ou recusa com 429 se a fila estiver cheia."""
+        lim = self._limiter()
+        stats = lim.statistics()
+        if stats.borrowed_tokens >= self.max_concurrent and stats.tasks_waiting >= self.max_queue:
+            _rejected.inc(gate=self.name)
+            raise HTTPException(
+                status_code=429,
+                detail=f"Capacidade esgotada para '{self.name}'. Tente novamente em {self.retry_after}s.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        _admitted.inc(gate=self.name)
+        return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=lim)
+
+
+def _gate(name: str, concurrency: int, queue: int) -> AdmissionGate:
+    env = name.upper()
+    return AdmissionGate(
+        name,
+        max_concurrent=int(os.getenv(f"ADMISSION_{env}_CONCURRENCY", concurrency)),
+        max_queue=int(os.getenv(f"ADMISSION_{env}_QUEUE", queue)),
+        retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", 5)),
+    )
+
+
+BACKTEST = _gate("backtest", concurrency=2, queue=8)  # POST /backtests/run
+UI = _gate("ui", concurrency=2, queue=8)              # /ui/backtests/{id} (cache miss)
+DATA = _gate("data", concurrency=2, queue=4)          # atualização/importação de preços
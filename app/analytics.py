@@ -0,0 +1,155 @@
+# app/analytics.py
+"""
+Analytics sobre a curva de equity armazenada (séries rolantes e downsampling).
+
+Todas as janelas são O(n) no tamanho da série, independente de `window`:
+- média/desvio por somas cumulativas
+- máximo rolante por deque monotônica
+"""
+from __future__ import annotations
+import math
+from collections import deque
+
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def rolling_mean_std(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Média e desvio padrão (ddof=0) em janela deslizante via somas cumulativas.
+    As primeiras `window-1` posições ficam NaN.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if window < 1 or n < window:
+        return mean, std
+
+    # centraliza para reduzir cancelamento numérico em sum(x^2) - sum(x)^2
+    shift = x.mean()
+    xc = x - shift
+    c1 = np.concatenate(([0.0], np.cumsum(xc)))
+    c2 = np.concatenate(([0.0], np.cumsum(xc * xc)))
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    m = s1 / window
+    var = np.maximum(s2 / window - m * m, 0.0)
+    mean[window - 1:] = m + shift
+    std[window - 1:] = np.sqrt(var)
+    return mean, std
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Máximo em janela deslizante com deque monotônica (cada índice entra/sai uma vez)."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window < 1:
+        return out
+    dq: deque[int] = deque()
+    for i in range(n):
+        v = x[i]
+        while dq and x[dq[-1]] <= v:
+            dq.pop()
+        dq.append(i)
+        if dq[0] <= i - window:
+            dq.popleft()
+        if i >= window - 1:
+            out[i] = x[dq[0]]
+    return out
+
+
+def rolling_metrics(equity: np.ndarray, window: int, periods: int = TRADING_DAYS) -> dict[str, np.ndarray]:
+    """
+    Sharpe, volatilidade (anualizados) e drawdown em relação ao pico da janela.
+    Retornos são simples (pct_change); a posição 0 não tem retorno e fica NaN.
+    """
+    equity = np.asarray(equity, dtype=float)
+    n = len(equity)
+    sharpe = np.full(n, np.nan)
+    vol = np.full(n, np.nan)
+    if n >= 2:
+        rets = equity[1:] / equity[:-1] - 1.0
+        mean, std = rolling_mean_std(rets, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sr = np.where(std > 0, mean / std * math.sqrt(periods), 0.0)
+        sr[np.isnan(std)] = np.nan
+        sharpe[1:] = sr
+        vol[1:] = std * math.sqrt(periods)
+
+    peak = rolling_max(equity, window)
+    drawdown = equity / peak - 1.0
+    return {"sharpe": sharpe, "volatility": vol, "drawdown": drawdown}
+
+
+def equity_metrics(equity: np.ndarray, periods: int = TRADING_DAYS) -> dict[str, float]:
+    """Retorno total, Sharpe anualizado (ddof=0) e drawdown máximo (mesmas fórmulas do backtest)."""
+    equity = np.asarray(equity, dtype=float)
+    if len(equity) < 2:
+        return {"total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0}
+    rets = equity[1:] / equity[:-1] - 1.0
+    std = rets.std()
+    return {
+        "total_return": float(equity[-1] / equity[0] - 1.0),
+        "sharpe": float(rets.mean() / std * math.sqrt(periods)) if std > 0 else 0.0,
+        "max_drawdown": float((equity / np.maximum.accumulate(equity) - 1.0).min()),
+    }
+
+
+def downsample_indices(n: int, max_points: int) -> np.ndarray:
+    """Índices igualmente espaçados (sempre inclui primeiro e último ponto)."""
+    if max_points <= 0 or n <= max_points:
+        return np.arange(n)
+    if max_points == 1:
+        return np.array([n - 1])
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(int))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: índices dos `n_out` pontos que preservam a forma
+    visual da série (picos e vales). Médias dos buckets são calculadas de uma vez
+    com np.add.reduceat; a escolha em cada bucket é um argmax vetorizado.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return downsample_indices(n, n_out) if n_out < 3 else np.arange(n)
+
+    # buckets internos: pontos [1, n-1) divididos em n_out-2 grupos
+    edges = (np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)) + 1).astype(np.intp)
+    edges[-1] = n - 1
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # o "próximo bucket" do último é o ponto final
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - next_x[b]) * (by - y[a]) - (x[a] - bx) * (next_y[b] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def lttb_series(dates: list, values: list[float], n_out: int) -> list[tuple]:
+    """LTTB sobre (datas, valores); retorna pares (data, valor) selecionados."""
+    if not dates:
+        return []
+    x = np.asarray(dates, dtype="datetime64[s]").astype(float)
+    idx = lttb_indices(x, np.asarray(values, dtype=float), n_out)
+    return [(dates[i], float(values[i])) for i in idx]
+
+
+def nan_to_none(values: np.ndarray) -> list[float | None]:
+    """Converte array numpy em lista JSON-friendly (NaN/inf -> None)."""
+    return [float(v) if np.isfinite(v) else None for v in values]
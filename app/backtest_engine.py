@@ -1,6 +1,8 @@
 # backtest_engine.py
 import os
 import math
+import time
+import numpy as np
 import pandas as pd
 import backtrader as bt
 from datetime import datetime, date
@@ -9,10 +11,12 @@ import logging
 from app.strategies.sma_cross import SmaCrossStrategy
 from app.strategies.donchian import DonchianBreakout
 from app.strategies.momentum import MomentumStrategy
-from app.services.yahoo import fetch_prices
+from app.services import market_data
+from app import timeframes
 
 
 logger = logging.getLogger("uvicorn.error")
+ENGINE = "backtrader"  # registrado na telemetria de cada execução (app/telemetry.py)
 DEBUG = os.getenv("BT_DEBUG", "0") == "1"
 def dprint(*args):
     if DEBUG:
@@ -59,14 +63,14 @@ def _sum_entry_cost_and_qty(tx_dict, dt_open: date, dt_close: date):
                 qty  += sz
     return cost, qty
 
-def compute_metrics(equity_series: pd.Series, daily_returns: pd.Series) -> dict:
+def compute_metrics(equity_series: pd.Series, daily_returns: pd.Series, periods_per_year: float = 252) -> dict:
     if equity_series is None or equity_series.empty:
         dprint("compute_metrics: equity_series VAZIA")
         return {"total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0}
     total_return = equity_series.iloc[-1] / equity_series.iloc[0] - 1.0
     sharpe = 0.0
     if daily_returns is not None and not daily_returns.empty and daily_returns.std(ddof=0) > 0:
-        sharpe = (daily_returns.mean() / daily_returns.std(ddof=0)) * math.sqrt(252)
+        sharpe = (daily_returns.mean() / daily_returns.std(ddof=0)) * math.sqrt(periods_per_year)
     cummax = equity_series.cummax()
     drawdowns = equity_series / cummax - 1.0
     max_dd = float(drawdowns.min()) if len(drawdowns) else 0.0
@@ -74,11 +78,67 @@ def compute_metrics(equity_series: pd.Series, daily_returns: pd.Series) -> dict:
     return {"total_return": float(total_return), "sharpe": float(sharpe), "max_drawdown": max_dd}
 
 
+def compute_trade_excursions(df: pd.DataFrame, trades: list[dict]) -> None:
+    """
+    Preenche MAE/MFE (relativos ao preço de entrada), barras mantidas e distância do stop.
+
+    Uma única redução segmentada (np.minimum/maximum.reduceat) cobre todos os
+    intervalos [abertura, fechamento] dos trades, sem fatiar o DataFrame por trade.
+    """
+    if not trades or df.empty:
+        return
+    # em segundos: serve para barras diárias (datas ISO) e intraday (data e hora)
+    dates = pd.to_datetime(df["date"]).values.astype("datetime64[s]")
+    # sentinela no fim: o índice "fechamento + 1" do último bar continua válido no reduceat
+    high = np.append(df["high"].to_numpy(dtype=float), np.nan)
+    low = np.append(df["low"].to_numpy(dtype=float), np.nan)
+
+    opens = np.array([t.get("open_date") or t["date"] for t in trades], dtype="datetime64[s]")
+    closes = np.array([t["date"] for t in trades], dtype="datetime64[s]")
+    start = np.searchsorted(dates, opens, side="left")
+    end = np.maximum(np.searchsorted(dates, closes, side="right") - 1, start)
+
+    bounds = np.empty(2 * len(trades), dtype=np.intp)
+    bounds[0::2] = start
+    bounds[1::2] = end + 1
+    seg_high = np.maximum.reduceat(high, bounds)[0::2]
+    seg_low = np.minimum.reduceat(low, bounds)[0::2]
+
+    entry = np.array([float(t.get("price") or 0.0) for t in trades])
+    is_long = np.array([t.get("side", "BUY") != "SELL" for t in trades])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        up = np.where(entry > 0, seg_high / entry - 1.0, np.nan)
+        down = np.where(entry > 0, seg_low / entry - 1.0, np.nan)
+    # short: alta é adversa e queda é favorável
+    mae = np.where(is_long, down, -up)
+    mfe = np.where(is_long, up, -down)
+
+    for i, t in enumerate(trades):
+        t["mae"] = float(mae[i]) if np.isfinite(mae[i]) else None
+        t["mfe"] = float(mfe[i]) if np.isfinite(mfe[i]) else None
+        t["bars_held"] = int(end[i] - start[i])
+        stop = t.pop("stop_price", None)
+        t["stop_distance"] = abs(float(t["price"]) - float(stop)) if stop is not None else None
+
+
+def _stamp(dt: datetime, intraday: bool) -> str:
+    """Data ISO das barras diárias ou maiores; data e hora nas intraday."""
+    return dt.isoformat(timespec="seconds") if intraday else dt.date().isoformat()
+
+
+def _bt_timeframe(timeframe: str) -> tuple[int, int]:
+    if timeframes.is_intraday(timeframe):
+        return bt.TimeFrame.Minutes, timeframes.INTRADAY_MINUTES[timeframe]
+    return {"1d": bt.TimeFrame.Days, "1wk": bt.TimeFrame.Weeks, "1mo": bt.TimeFrame.Months}[timeframe], 1
+
+
 class Recorder(bt.Analyzer):
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, intraday: bool = False):
         self.trades = []
         self.daily = []
         self.debug = debug
+        self.intraday = intraday
+        self._entry_stops = {}  # trade.ref -> stop definido na entrada
 
     def _get(self, obj, name, default=0.0):
         try:
@@ -93,6 +153,10 @@ class Recorder(bt.Analyzer):
         return self._get(h, "size"), self._get(h, "price")
 
     def notify_trade(self, trade):
+        if trade.justopened:
+            # a estratégia ainda mantém o stop calculado para a ordem de entrada
+            self._entry_stops[trade.ref] = getattr(self.strategy, "_pending_stop_price", None)
+            return
         if not trade.isclosed:
             return
 
@@ -138,18 +202,19 @@ class Recorder(bt.Analyzer):
                         f"denom={denom} return_pct={ret_pct}")
 
         self.trades.append({
-    "date": bt.num2date(trade.dtclose).date().isoformat(),
-    "open_date": bt.num2date(trade.dtopen).date().isoformat(),
+    "date": _stamp(bt.num2date(trade.dtclose), self.intraday),
+    "open_date": _stamp(bt.num2date(trade.dtopen), self.intraday),
     "side": side,
     "price": float(avg_entry_price),
     "size": float(effective_size),
     "commission": float(getattr(trade, "commission", 0.0) or 0.0),
     "pnl": float(pnlcomm),
     "return_pct": float(ret_pct) if ret_pct is not None else None,
+    "stop_price": self._entry_stops.pop(trade.ref, None),
 })
 
     def next(self):
-        dt_iso = self.strategy.data.datetime.date(0).isoformat()
+        dt_iso = _stamp(self.strategy.data.datetime.datetime(0), self.intraday)
         value = float(self.strategy.broker.getvalue())
         cash  = float(self.strategy.broker.get_cash())
         pos   = float(self.strategy.position.size)
@@ -173,9 +238,16 @@ def run_backtest(
     strategy_params: dict,
     initial_cash: float = 100000.0,
     commission: float = 0.0,
+    db=None,
+    timeframe: str = "1d",
 ) -> Dict[str, Any]:
-    # --- 1) Buscar dados ---
-    df = fetch_prices(ticker, start, end)
+    # --- 1) Buscar dados (Yahoo; com o provedor fora do ar, preços armazenados) ---
+    timeframe = timeframes.normalize(timeframe)
+    intraday = timeframes.is_intraday(timeframe)
+    t0 = time.perf_counter()
+    prices = market_data.load_prices(ticker, start, end, db=db, timeframe=timeframe)
+    t_fetch = time.perf_counter()
+    df = prices.df
     if df.empty:
         raise ValueError("Sem dados para o período escolhido")
 
@@ -185,8 +257,11 @@ def run_backtest(
     if DEBUG:
         dprint("DF head:\n" + df.head(3).to_string(index=False))
 
+    bt_tf, compression = _bt_timeframe(timeframe)
     data_feed = bt.feeds.PandasData(
         dataname=df,
+        timeframe=bt_tf,
+        compression=compression,
         datetime="date",
         open="open",
         high="high",
@@ -214,7 +289,7 @@ def run_backtest(
     cerebro.adddata(data_feed)
 
     # --- 3) Executar ---
-    cerebro.addanalyzer(Recorder, _name="recorder", debug=DEBUG)
+    cerebro.addanalyzer(Recorder, _name="recorder", debug=DEBUG, intraday=intraday)
     cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="ta")
     cerebro.addanalyzer(bt.analyzers.Transactions, _name="tx")  # ⬅️ novo
     results = cerebro.run()
@@ -235,7 +310,7 @@ def run_backtest(
         dprint("first_trades:\n" + "\n".join(str(t) for t in rec.trades[:3]))
 
     daily_ret = equity_curve.pct_change().dropna()
-    metrics = compute_metrics(equity_curve, daily_ret)
+    metrics = compute_metrics(equity_curve, daily_ret, timeframes.periods_per_year(timeframe, df["date"].to_numpy()))
     metrics["win_rate"] = _extract_win_rate(ta)
 
     # Atualizar drawdowns diários
@@ -262,6 +337,8 @@ def run_backtest(
             filled += 1
     dprint(f"filled return_pct via Transactions: {filled}/{len(rec.trades)}")
 
+    compute_trade_excursions(df, rec.trades)
+
     returns = [t.get("return_pct") for t in rec.trades if t.get("return_pct") is not None]
     metrics["avg_trade_return"] = float(sum(returns) / len(returns)) if returns else None
 
@@ -272,11 +349,21 @@ def run_backtest(
         f"equityN={rec.daily[-1]['equity'] if rec.daily else 'NA'}"
     )
     return {
+        "telemetry": {
+            "engine": ENGINE,
+            "bars": len(df),
+            "phases": {"fetch": t_fetch - t0, "simulate": time.perf_counter() - t_fetch},
+        },
         "metrics": metrics,
         "trades": rec.trades,
         "daily_positions": daily_positions,
+        "data_source": {
+            "source": prices.source,
+            "stale": prices.stale,
+            "last_date": prices.last_date.strftime("%Y-%m-%d") if prices.last_date else None,
+        },
         "equity_curve": [
-            {"date": k.strftime("%Y-%m-%d"), "equity": float(v)}
+            {"date": _stamp(k.to_pydatetime(), intraday), "equity": float(v)}
             for k, v in equity_curve.items()
         ],
     }
@@ -0,0 +1,75 @@
+# app/cache.py
+"""Cache LRU em memória, thread-safe (uvicorn roda endpoints sync em threadpool)."""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    LRU limitado por número de itens e, opcionalmente, por bytes (`max_bytes` + `sizeof`).
+    """
+    def __init__(
+        self,
+        maxsize: int = 256,
+        max_bytes: int | None = None,
+        sizeof: Callable[[Any], int] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda v: 0)
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._sizes: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # maior que o cache inteiro: não vale a pena guardar
+        with self._lock:
+            if key in self._data:
+                self.total_bytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.total_bytes += size
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                old, _ = self._data.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(old, 0)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] | None = None) -> None:
+        with self._lock:
+            if predicate is None:
+                self._data.clear()
+                self._sizes.clear()
+                self.total_bytes = 0
+                return
+            for k in [k for k in self._data if predicate(k)]:
+                del self._data[k]
+                self.total_bytes -= self._sizes.pop(k, 0)
+
+    def __len__(self) -> int:
+        return len(self._data)
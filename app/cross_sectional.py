@@ -0,0 +1,168 @@
+# app/cross_sectional.py
+"""
+Momentum cross-sectional (rotação) sobre o universo inteiro de símbolos.
+
+Tudo opera sobre a matriz de fechamentos datas × tickers (crud_prices.get_close_matrix):
+retornos de lookback, ranking e seleção top-K são operações NumPy sobre a matriz inteira,
+e a carteira rebalanceada é simulada sem laço por barra nem por ticker (só um produto
+acumulado sobre as datas de rebalanceamento).
+
+Convenção de execução: o ranking usa o fechamento da data de rebalanceamento e a carteira
+é montada nesse mesmo fechamento (close-to-close), com pesos iguais entre os K escolhidos.
+Com menos de K tickers elegíveis, o restante fica em caixa.
+"""
+from __future__ import annotations
+from typing import Any
+
+import numpy as np
+
+from app import indicators
+from app.analytics import equity_metrics
+
+REBALANCE_FREQS = ("W", "M", "Q", "Y")
+ENGINE = "xs_numpy"  # registrado na telemetria das rotações (app/telemetry.py)
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Propaga o último valor válido de cada coluna para baixo (feriados/dias sem negócio)."""
+    idx = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return matrix[idx, np.arange(matrix.shape[1])]
+
+
+def lookback_returns(prices: np.ndarray, lookback: int, skip: int = 0) -> np.ndarray:
+    """Retorno de t-lookback até t-skip (ex.: 12-1 meses ≈ lookback 252, skip 21)."""
+    if not 0 <= skip < lookback:
+        raise ValueError("skip deve estar entre 0 e lookback - 1")
+    mom = indicators.momentum(prices, lookback - skip)
+    if not skip:
+        return mom
+    out = np.full(prices.shape, np.nan)
+    out[skip:] = mom[:-skip]
+    return out
+
+
+def rank_scores(scores: np.ndarray) -> np.ndarray:
+    """Posição de cada ticker por linha (1 = maior score); NaN fica sem ranking."""
+    valid = ~np.isnan(scores)
+    order = np.argsort(np.where(valid, -scores, np.inf), axis=1, kind="stable")
+    ranks = np.empty(scores.shape)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1.0, scores.shape[1] + 1), scores.shape), axis=1)
+    ranks[~valid] = np.nan
+    return ranks
+
+
+def top_k_weights(scores: np.ndarray, k: int) -> np.ndarray:
+    """Pesos iguais nos K maiores scores de cada linha (linhas sem elegíveis ficam zeradas)."""
+    chosen = rank_scores(scores) <= k
+    n = chosen.sum(axis=1, keepdims=True)
+    return np.divide(chosen, n, out=np.zeros(scores.shape), where=n > 0)
+
+
+def rebalance_indices(dates: np.ndarray, every: str | int) -> np.ndarray:
+    """Última barra de cada semana/mês/trimestre/ano ("W", "M", "Q", "Y") ou a cada N barras."""
+    n = len(dates)
+    if isinstance(every, int) or str(every).isdigit():
+        return np.arange(int(every) - 1, n, int(every))
+    every = str(every).upper()
+    if every not in REBALANCE_FREQS:
+        raise ValueError(f"Frequência de rebalanceamento inválida: {every} (use W, M, Q, Y ou N barras)")
+    if every == "W":
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        period = (days + 3) // 7           # 1970-01-01 foi quinta: semanas começando na segunda
+    else:
+        months = dates.astype("datetime64[M]").astype(np.int64)
+        period = months // {"M": 1, "Q": 3, "Y": 12}[every]
+    return np.append(np.flatnonzero(period[1:] != period[:-1]), n - 1) if n else np.array([], dtype=int)
+
+
+def simulate_rebalanced(
+    close: np.ndarray, rebal: np.ndarray, weights: np.ndarray, commission: float = 0.0,
+) -> dict[str, np.ndarray]:
+    """
+    Equity (base 1.0) de uma carteira rebalanceada nas linhas `rebal` para `weights`
+    (uma linha de pesos por rebalanceamento). Entre rebalanceamentos as quantidades ficam
+    fixas (os pesos derivam com os preços); custo = commission * giro em cada rebalanceamento.
+    """
+    T, N = close.shape
+    out = {"equity": np.ones(T), "invested": np.zeros(T), "positions": np.zeros(T), "turnover": np.zeros(len(rebal))}
+    if not len(rebal):
+        return out
+    prices = forward_fill(close)
+    base = prices[rebal]
+
+    # fim de cada segmento (pesos antigos até o próximo rebalanceamento): deriva e crescimento
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_end = prices[rebal[1:]] / base[:-1]
+    held_end = np.where(weights[:-1] > 0, weights[:-1] * rel_end, 0.0)
+    growth_end = held_end.sum(axis=1) + (1.0 - weights[:-1].sum(axis=1))
+    drifted = np.zeros(weights.shape)
+    drifted[1:] = held_end / growth_end[:, None]
+    out["turnover"] = turnover = np.abs(weights - drifted).sum(axis=1)
+
+    # equity logo após cada rebalanceamento (já descontado o custo)
+    after = np.cumprod(np.concatenate([[1.0], growth_end]) * (1.0 - commission * turnover))
+
+    # barra a barra dentro de cada segmento
+    t = np.arange(rebal[0], T)
+    seg = np.searchsorted(rebal, t, side="right") - 1
+    w = weights[seg]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        held = np.where(w > 0, w * (prices[t] / base[seg]), 0.0)
+    growth = held.sum(axis=1) + (1.0 - w.sum(axis=1))
+    out["equity"][t] = after[seg] * growth
+    out["invested"][t] = held.sum(axis=1) / growth
+    out["positions"][t] = (w > 0).sum(axis=1)
+    return out
+
+
+def momentum_rotation(
+    dates: np.ndarray,
+    tickers: list[str],
+    close: np.ndarray,
+    *,
+    lookback: int = 126,
+    skip: int = 0,
+    top_k: int = 10,
+    rebalance: str | int = "M",
+    commission: float = 0.0,
+    initial_cash: float = 100000.0,
+    start: np.datetime64 | None = None,
+) -> dict[str, Any]:
+    """
+    Ranking por retorno de lookback, top-K com pesos iguais e rebalanceamento periódico.
+    Barras antes de `start` servem só de histórico para o primeiro ranking.
+    """
+    if top_k < 1:
+        raise ValueError("top_k deve ser >= 1")
+    scores = lookback_returns(forward_fill(close), lookback, skip)
+    scores[np.isnan(close)] = np.nan                           # só entra quem negociou na data
+
+    rebal = rebalance_indices(dates, rebalance)
+    begin = int(np.searchsorted(dates, start)) if start is not None else 0
+    rebal = rebal[rebal >= max(lookback, begin)]              # primeiro ranking com histórico completo
+    weights = top_k_weights(scores[rebal], top_k)
+    sim = simulate_rebalanced(close, rebal, weights, commission)
+
+    equity = sim["equity"][begin:] * initial_cash
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    holdings: dict[str, float] = {}
+    if len(rebal):
+        last = scores[rebal[-1]]
+        held = np.flatnonzero(weights[-1] > 0)
+        for j in held[np.argsort(-last[held], kind="stable")]:
+            holdings[tickers[j]] = float(weights[-1, j])
+    return {
+        "metrics": equity_metrics(equity),
+        "n_tickers": len(tickers),
+        "rebalances": int(len(rebal)),
+        "avg_turnover": float(sim["turnover"].mean()) if len(rebal) else 0.0,
+        "last_rebalance": str(dates[rebal[-1]]) if len(rebal) else None,
+        "holdings": holdings,
+        "daily_positions": [
+            {"date": str(d), "position_size": float(n), "cash": float(e * (1.0 - inv)), "equity": float(e), "drawdown": float(dd)}
+            for d, n, e, inv, dd in zip(
+                dates[begin:], sim["positions"][begin:], equity, sim["invested"][begin:], drawdown,
+            )
+        ],
+    }
@@ -1,10 +1,12 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
-from datetime import datetime
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, update, delete, desc, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, date, timedelta
+from typing import Iterator
 from app import models
+import base64
 import json
-import pandas as pd
 
 def create_backtest_record(
     db: Session,
@@ -17,6 +19,7 @@ def create_backtest_record(
     initial_cash: float,
     commission: float,
     timeframe: str | None,
+    profile_requested: bool = False,
 ) -> models.Backtest:
     bt = models.Backtest(
         ticker=ticker,
@@ -27,6 +30,7 @@ def create_backtest_record(
         initial_cash=initial_cash,
         commission=commission,
         timeframe=timeframe,
+        profile_requested=profile_requested,
         status="created",  # por enquanto "created"; atualizar depois
     )
     db.add(bt)
@@ -34,21 +38,65 @@ def create_backtest_record(
     db.refresh(bt)
     return bt
 
+def encode_cursor(created_at: datetime, backtest_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{backtest_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, bt_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(bt_id)
+    except Exception:
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+
 def list_backtests(
     db: Session,
     *,
     ticker: str | None,
     strategy_type: str | None,
     limit: int,
-    offset: int,
-) -> list[models.Backtest]:
-    stmt = select(models.Backtest).order_by(desc(models.Backtest.created_at))
+    offset: int = 0,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: tuple[datetime, int] | None = None,
+) -> list[tuple[models.Backtest, models.Metric | None]]:
+    """
+    Página de backtests (mais recentes primeiro) com a última Metric de cada um, em uma query.
+
+    Com `cursor` (created_at, id) a página começa logo após essa linha (keyset): o custo
+    não cresce com a profundidade, ao contrário de OFFSET, que continua aceito por compatibilidade.
+    """
+    B, M = models.Backtest, models.Metric
+    latest = aliased(M)
+    latest_metric_id = (
+        select(func.max(latest.id))
+        .where(latest.backtest_id == B.id)
+        .correlate(B)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(B, M)
+        .outerjoin(M, M.id == latest_metric_id)
+        .order_by(desc(B.created_at), desc(B.id))
+    )
     if ticker:
-        stmt = stmt.where(models.Backtest.ticker == ticker)
+        stmt = stmt.where(B.ticker == ticker)
     if strategy_type:
-        stmt = stmt.where(models.Backtest.strategy_type == strategy_type)
-    stmt = stmt.limit(limit).offset(offset)
-    return list(db.execute(stmt).scalars().all())
+        stmt = stmt.where(B.strategy_type == strategy_type)
+    if status:
+        stmt = stmt.where(B.status == status)
+    if created_from:
+        stmt = stmt.where(B.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(B.created_at <= created_to)
+    if cursor:
+        stmt = stmt.where(tuple_(B.created_at, B.id) < tuple_(*cursor))
+    elif offset:
+        stmt = stmt.offset(offset)
+    stmt = stmt.limit(limit)
+    return [(r[0], r[1]) for r in db.execute(stmt).all()]
 
 def get_backtest(db: Session, backtest_id: int) -> models.Backtest | None:
     return db.get(models.Backtest, backtest_id)
@@ -59,6 +107,206 @@ def set_backtest_status(db: Session, backtest_id: int, status: str):
     bt.status = status
     db.commit()
 
+# -- FILA DE BACKTESTS (workers) --
+def claim_next_backtest(db: Session, worker_id: str) -> models.Backtest | None:
+    """
+    Reserva o backtest "queued" mais antigo para `worker_id`.
+    Postgres: SELECT ... FOR UPDATE SKIP LOCKED (workers concorrentes pulam linhas já travadas).
+    SQLite (sem FOR UPDATE): o UPDATE condicional em status='queued' garante que só um ganha.
+    """
+    B = models.Backtest
+    for _ in range(5):
+        candidate = db.execute(
+            select(B.id)
+            .where(B.status == "queued")
+            .order_by(B.created_at, B.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if candidate is None:
+            db.rollback()
+            return None
+        res = db.execute(
+            update(B)
+            .where(B.id == candidate, B.status == "queued")
+            .values(
+                status="running",
+                claimed_by=worker_id,
+                heartbeat_at=datetime.utcnow(),
+                attempts=B.attempts + 1,
+            )
+        )
+        db.commit()
+        if res.rowcount == 1:
+            return db.get(B, candidate)
+    return None
+
+def heartbeat_backtest(db: Session, backtest_id: int, worker_id: str) -> bool:
+    """Renova o heartbeat; False se o backtest não pertence mais a este worker (foi re-enfileirado)."""
+    B = models.Backtest
+    res = db.execute(
+        update(B)
+        .where(B.id == backtest_id, B.status == "running", B.claimed_by == worker_id)
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.commit()
+    return res.rowcount == 1
+
+def finish_claimed_backtest(
+    db: Session, backtest_id: int, worker_id: str, status: str, message: str | None = None,
+) -> bool:
+    B = models.Backtest
+    res = db.execute(
+        update(B)
+        .where(B.id == backtest_id, B.claimed_by == worker_id)
+        .values(status=status, heartbeat_at=datetime.utcnow(), error_message=message)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+def requeue_stale_backtests(db: Session, timeout: timedelta, max_attempts: int = 3) -> tuple[int, int]:
+    """
+    Backtests "running" cujo worker parou de enviar heartbeat há mais de `timeout`
+    voltam para a fila (ou viram "error" após `max_attempts`). Retorna (re-enfileirados, falhos).
+    Backtests síncronos da API não têm heartbeat e nunca são tocados.
+    """
+    B = models.Backtest
+    stale = (B.status == "running") & (B.heartbeat_at.is_not(None)) & (B.heartbeat_at < datetime.utcnow() - timeout)
+    failed = db.execute(
+        update(B)
+        .where(stale, B.attempts >= max_attempts)
+        .values(status="error", claimed_by=None, error_message="Worker sem heartbeat; tentativas esgotadas.")
+    ).rowcount
+    requeued = db.execute(
+        update(B).where(stale, B.attempts < max_attempts).values(status="queued", claimed_by=None)
+    ).rowcount
+    db.commit()
+    return requeued, failed
+
+def clear_backtest_results(db: Session, backtest_id: int) -> None:
+    """Remove resultados parciais de uma tentativa anterior (worker que morreu no meio da gravação)."""
+    for model in (models.Metric, models.Trade, models.DailyPosition):
+        db.execute(delete(model).where(model.backtest_id == backtest_id))
+    db.commit()
+
+def save_backtest_profile(db: Session, backtest_id: int, artifact) -> None:
+    """Grava (ou substitui) o artefato de profiling (app.profiling.ProfileArtifact) do backtest."""
+    db.execute(delete(models.BacktestProfile).where(models.BacktestProfile.backtest_id == backtest_id))
+    db.add(models.BacktestProfile(
+        backtest_id=backtest_id,
+        wall_seconds=artifact.wall_seconds,
+        peak_memory_bytes=artifact.peak_memory_bytes,
+        summary=artifact.summary_blob(),
+        pstats=artifact.pstats,
+    ))
+    db.commit()
+
+def get_backtest_profile(db: Session, backtest_id: int) -> models.BacktestProfile | None:
+    return db.execute(
+        select(models.BacktestProfile).where(models.BacktestProfile.backtest_id == backtest_id)
+    ).scalar_one_or_none()
+
+def save_backtest_telemetry(db: Session, backtest_id: int, fields: dict) -> None:
+    """Grava (ou substitui, em re-execuções) a telemetria do backtest (app.telemetry.RunTelemetry.record)."""
+    db.execute(delete(models.BacktestTelemetry).where(models.BacktestTelemetry.backtest_id == backtest_id))
+    db.add(models.BacktestTelemetry(backtest_id=backtest_id, **fields))
+    db.commit()
+
+PERFORMANCE_BUCKETS = ("day", "week", "month", "all")
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Interpolação linear entre vizinhos (mesma convenção do numpy.percentile)."""
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+def _period_key(ts: datetime, bucket: str) -> str:
+    if bucket == "day":
+        return ts.date().isoformat()
+    if bucket == "week":
+        return (ts.date() - timedelta(days=ts.weekday())).isoformat()   # segunda-feira da semana
+    if bucket == "month":
+        return ts.strftime("%Y-%m")
+    return "all"
+
+def performance_stats(
+    db: Session,
+    *,
+    bucket: str = "day",
+    strategy_type: str | None = None,
+    engine: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    include_profiled: bool = False,
+) -> list[dict]:
+    """
+    Throughput e latência por (período, strategy_type, engine) a partir de backtest_telemetry:
+    barras/s (soma de barras / soma do tempo de simulação), p50/p95 do tempo total, médias
+    por fase e maior pico de RSS. Percentis em Python: SQLite não tem percentile_cont.
+    Execuções com profiling ficam de fora, salvo `include_profiled`.
+    """
+    if bucket not in PERFORMANCE_BUCKETS:
+        raise ValueError(f"Bucket inválido: {bucket}. Permitidos: {list(PERFORMANCE_BUCKETS)}")
+    T = models.BacktestTelemetry
+    stmt = select(T.created_at, T.strategy_type, T.engine, T.bars, T.fetch_seconds,
+                  T.simulate_seconds, T.persist_seconds, T.total_seconds, T.peak_rss_bytes)
+    if not include_profiled:
+        stmt = stmt.where(T.profiled.is_(False))
+    if strategy_type:
+        stmt = stmt.where(T.strategy_type == strategy_type)
+    if engine:
+        stmt = stmt.where(T.engine == engine)
+    if created_from:
+        stmt = stmt.where(T.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(T.created_at <= created_to)
+
+    groups: dict[tuple, list] = {}
+    for row in db.execute(stmt.order_by(T.created_at)):
+        groups.setdefault((_period_key(row.created_at, bucket), row.strategy_type, row.engine), []).append(row)
+
+    out = []
+    for (period, strat, eng), rows in groups.items():
+        totals = sorted(r.total_seconds for r in rows)
+        simulate = sum(r.simulate_seconds or 0.0 for r in rows)
+        bars = sum(r.bars for r in rows)
+
+        def _avg(attr):
+            values = [getattr(r, attr) for r in rows if getattr(r, attr) is not None]
+            return sum(values) / len(values) if values else None
+
+        rss = [r.peak_rss_bytes for r in rows if r.peak_rss_bytes is not None]
+        out.append({
+            "period": period,
+            "strategy_type": strat,
+            "engine": eng,
+            "runs": len(rows),
+            "bars": bars,
+            "bars_per_sec": bars / simulate if simulate > 0 else None,
+            "p50_seconds": _percentile(totals, 0.5),
+            "p95_seconds": _percentile(totals, 0.95),
+            "avg_fetch_seconds": _avg("fetch_seconds"),
+            "avg_simulate_seconds": _avg("simulate_seconds"),
+            "avg_persist_seconds": _avg("persist_seconds"),
+            "max_peak_rss_bytes": max(rss) if rss else None,
+        })
+    out.sort(key=lambda g: (g["period"], g["strategy_type"], g["engine"]))
+    return out
+
+def set_backtest_data_source(db: Session, backtest_id: int, source: str | None, stale: bool | None):
+    db.execute(
+        update(models.Backtest)
+        .where(models.Backtest.id == backtest_id)
+        .values(data_source=source, data_stale=stale)
+    )
+    db.commit()
+
+def count_queued_backtests(db: Session) -> int:
+    return db.execute(
+        select(func.count()).select_from(models.Backtest).where(models.Backtest.status == "queued")
+    ).scalar_one()
+
 def save_metrics(db: Session, backtest_id: int, metrics: dict):
     m = models.Metric(
         backtest_id=backtest_id,
@@ -69,18 +317,179 @@ def save_metrics(db: Session, backtest_id: int, metrics: dict):
         avg_trade_return=metrics.get("avg_trade_return"),
     )
     db.add(m)
+    bt = db.get(models.Backtest, backtest_id)
+    if bt:
+        upsert_backtest_summary(db, bt, m)
     db.commit()
 
+# -- RESUMO / LEADERBOARD --
+
+SUMMARY_PARAM_KEYS = ("fast", "slow", "n", "lookback", "thresh", "risk_pct", "atr_mult", "stop_method")
+SUMMARY_METRIC_KEYS = ("total_return", "sharpe", "max_drawdown", "win_rate", "avg_trade_return")
+_EXCHANGE_BY_SUFFIX = {".SA": "B3"}
+
+SUMMARY_REBUILD_BATCH = 1000
+
+def _infer_exchange(db: Session, ticker: str) -> str | None:
+    sym_exchange = db.execute(
+        select(models.Symbol.exchange).where(models.Symbol.ticker == ticker)
+    ).scalar_one_or_none()
+    return _exchange_for(ticker, sym_exchange)
+
+def _exchange_for(ticker: str, sym_exchange: str | None) -> str | None:
+    if sym_exchange:
+        return sym_exchange
+    for suffix, exchange in _EXCHANGE_BY_SUFFIX.items():
+        if ticker.upper().endswith(suffix):
+            return exchange
+    return None
+
+def _summary_values(bt: models.Backtest, metric: models.Metric | None, exchange: str | None) -> dict:
+    """Colunas de backtest_summaries para um backtest + sua última métrica."""
+    try:
+        params = json.loads(bt.strategy_params_json or "{}")
+    except ValueError:
+        params = {}
+    values = {
+        "backtest_id": bt.id,
+        "created_at": bt.created_at or datetime.utcnow(),
+        "ticker": bt.ticker,
+        "exchange": exchange,
+        "strategy_type": bt.strategy_type,
+        "timeframe": bt.timeframe,
+        "start_date": bt.start_date,
+        "end_date": bt.end_date,
+    }
+    for k in SUMMARY_PARAM_KEYS:
+        values[k] = params.get(k)
+    for k in SUMMARY_METRIC_KEYS:
+        values[k] = getattr(metric, k) if metric is not None else None
+    return values
+
+def upsert_backtest_summary(db: Session, bt: models.Backtest, metric: models.Metric | None) -> models.BacktestSummary:
+    """Atualiza (ou cria) a linha de resumo do backtest; não faz commit."""
+    summary = db.execute(
+        select(models.BacktestSummary).where(models.BacktestSummary.backtest_id == bt.id)
+    ).scalar_one_or_none()
+    if summary is None:
+        summary = models.BacktestSummary(backtest_id=bt.id)
+        db.add(summary)
+    for k, v in _summary_values(bt, metric, _infer_exchange(db, bt.ticker)).items():
+        setattr(summary, k, v)
+    return summary
+
+def _summary_upsert_stmt(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(models.BacktestSummary)
+    cols = ("created_at", "ticker", "exchange", "strategy_type", "timeframe", "start_date", "end_date",
+            *SUMMARY_PARAM_KEYS, *SUMMARY_METRIC_KEYS)
+    return stmt.on_conflict_do_update(
+        index_elements=["backtest_id"],
+        set_={c: getattr(stmt.excluded, c) for c in cols},
+    )
+
+def rebuild_backtest_summaries(db: Session, batch_size: int = SUMMARY_REBUILD_BATCH) -> int:
+    """
+    Recria os resumos a partir de backtests + última métrica (backfill).
+
+    Percorre os backtests em páginas keyset de `batch_size`; cada página custa três statements
+    (backtests + métricas, exchanges dos tickers, um INSERT ... ON CONFLICT DO UPDATE em lote)
+    e um commit, independente do tamanho da tabela.
+    """
+    stmt = _summary_upsert_stmt(db)
+    total = 0
+    cursor = None
+    while True:
+        rows = list_backtests(db, ticker=None, strategy_type=None, limit=batch_size, cursor=cursor)
+        if not rows:
+            break
+        if stmt is not None:
+            tickers = {bt.ticker for bt, _ in rows}
+            exchanges = dict(db.execute(
+                select(models.Symbol.ticker, models.Symbol.exchange).where(models.Symbol.ticker.in_(tickers))
+            ).all())
+            db.execute(stmt, [
+                _summary_values(bt, metric, _exchange_for(bt.ticker, exchanges.get(bt.ticker)))
+                for bt, metric in rows
+            ])
+        else:
+            # dialeto sem ON CONFLICT: cai para o upsert linha a linha
+            for bt, metric in rows:
+                upsert_backtest_summary(db, bt, metric)
+        last = rows[-1][0]
+        cursor = (last.created_at, last.id)
+        db.commit()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+def list_leaderboard(
+    db: Session,
+    *,
+    metric: str,
+    descending: bool,
+    limit: int,
+    strategy_type: str | None = None,
+    ticker: str | None = None,
+    exchange: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    start_date_from: datetime | None = None,
+    end_date_to: datetime | None = None,
+) -> list[models.BacktestSummary]:
+    """Top-N por métrica em uma única query indexada sobre backtest_summaries."""
+    if metric not in SUMMARY_METRIC_KEYS:
+        raise ValueError(f"Métrica inválida: {metric}. Permitidas: {list(SUMMARY_METRIC_KEYS)}")
+    S = models.BacktestSummary
+    col = getattr(S, metric)
+    stmt = select(S).where(col.is_not(None))
+    if strategy_type:
+        stmt = stmt.where(S.strategy_type == strategy_type)
+    if ticker:
+        stmt = stmt.where(S.ticker == ticker)
+    if exchange:
+        stmt = stmt.where(S.exchange == exchange)
+    if created_from:
+        stmt = stmt.where(S.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(S.created_at <= created_to)
+    if start_date_from:
+        stmt = stmt.where(S.start_date >= start_date_from)
+    if end_date_to:
+        stmt = stmt.where(S.end_date <= end_date_to)
+    stmt = stmt.order_by(desc(col) if descending else col, desc(S.backtest_id)).limit(limit)
+    return list(db.execute(stmt).scalars().all())
+
+def _as_datetime(value) -> datetime:
+    """ISO string / date / datetime (inclui pandas.Timestamp) -> datetime, sem depender do pandas."""
+    if isinstance(value, datetime):
+        return value.to_pydatetime() if hasattr(value, "to_pydatetime") else value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(str(value))
+
 def save_trades(db: Session, backtest_id: int, trades: list[dict]):
     for t in trades:
         db.add(models.Trade(
             backtest_id=backtest_id,
-            date=pd.to_datetime(t["date"]).to_pydatetime(),
+            date=_as_datetime(t["date"]),
             side=t["side"],
             price=t["price"],
             size=t["size"],
             commission=t.get("commission", 0.0),
             pnl=t.get("pnl", 0.0),
+            open_date=_as_datetime(t["open_date"]) if t.get("open_date") else None,
+            mae=t.get("mae"),
+            mfe=t.get("mfe"),
+            bars_held=t.get("bars_held"),
+            stop_distance=t.get("stop_distance"),
         ))
     db.commit()
 
@@ -88,7 +497,7 @@ def save_daily_positions(db: Session, backtest_id: int, dps: list[dict]):
     for d in dps:
         db.add(models.DailyPosition(
             backtest_id=backtest_id,
-            date=pd.to_datetime(d["date"]).to_pydatetime(),
+            date=_as_datetime(d["date"]),
             position_size=d["position_size"],
             cash=d["cash"],
             equity=d["equity"],
@@ -122,7 +531,9 @@ def get_results(db: Session, backtest_id: int):
         },
         "trades": [{
             "date": t.date.isoformat(), "side": t.side, "price": t.price, "size": t.size,
-            "commission": t.commission, "pnl": t.pnl
+            "commission": t.commission, "pnl": t.pnl,
+            "open_date": t.open_date.isoformat() if t.open_date else None,
+            "mae": t.mae, "mfe": t.mfe, "bars_held": t.bars_held, "stop_distance": t.stop_distance,
         } for t in trades],
         "daily_positions": [{
             "date": d.date.isoformat(), "position_size": d.position_size, "cash": d.cash,
@@ -131,19 +542,229 @@ def get_results(db: Session, backtest_id: int):
         "equity_curve": [{"date": d.date.isoformat(), "equity": d.equity} for d in dps],
     }
 
-def jobrun_start(db: Session, job_name: str, message: str | None = None) -> models.JobRun:
-    jr = models.JobRun(job_name=job_name, status="started", message=message or "")
+RESULT_STREAM_FIELDS = ("position_size", "cash", "equity", "drawdown")
+RESULT_STREAM_SECTIONS = ("metrics", "trades", "daily")
+TRADE_COLUMNS = (
+    "date", "side", "price", "size", "commission", "pnl",
+    "open_date", "mae", "mfe", "bars_held", "stop_distance",
+)
+
+def iter_results_rows(
+    db: Session,
+    backtest_id: int,
+    *,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    fields: tuple[str, ...] = RESULT_STREAM_FIELDS,
+    sections: tuple[str, ...] = RESULT_STREAM_SECTIONS,
+    batch_size: int = 1000,
+) -> Iterator[dict]:
+    """
+    Resultados do backtest linha a linha, direto do cursor (yield_per => cursor no servidor).
+    Não materializa ORM nem listas completas; cada registro traz "type" = metrics|trade|daily.
+    """
+    def _date_range(col):
+        conds = []
+        if date_from:
+            conds.append(col >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            conds.append(col < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        return conds
+
+    if "metrics" in sections:
+        m = db.execute(
+            select(models.Metric)
+            .where(models.Metric.backtest_id == backtest_id)
+            .order_by(desc(models.Metric.id))
+            .limit(1)
+        ).scalar_one_or_none()
+        yield {
+            "type": "metrics",
+            "backtest_id": backtest_id,
+            "total_return": m.total_return if m else 0.0,
+            "sharpe": m.sharpe if m else 0.0,
+            "max_drawdown": m.max_drawdown if m else 0.0,
+            "win_rate": m.win_rate if m else None,
+            "avg_trade_return": m.avg_trade_return if m else None,
+        }
+
+    if "trades" in sections:
+        cols = [getattr(models.Trade, c) for c in TRADE_COLUMNS]
+        stmt = (
+            select(*cols)
+            .where(models.Trade.backtest_id == backtest_id, *_date_range(models.Trade.date))
+            .order_by(models.Trade.date)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in db.execute(stmt):
+            rec = {"type": "trade"}
+            for k, v in zip(TRADE_COLUMNS, row):
+                rec[k] = v.isoformat() if isinstance(v, datetime) else v
+            yield rec
+
+    if "daily" in sections:
+        cols = [models.DailyPosition.date] + [getattr(models.DailyPosition, f) for f in fields]
+        stmt = (
+            select(*cols)
+            .where(models.DailyPosition.backtest_id == backtest_id, *_date_range(models.DailyPosition.date))
+            .order_by(models.DailyPosition.date)
+            .execution_options(yield_per=batch_size)
+        )
+        for row in db.execute(stmt):
+            rec = {"type": "daily", "date": row[0].isoformat()}
+            rec.update(zip(fields, row[1:]))
+            yield rec
+
+def get_results_columns(db: Session, backtest_id: int) -> dict | None:
+    """
+    Resultados em colunas ({"date": [...], "equity": [...]}) via selects de colunas:
+    sem objetos ORM nem dicts por linha; a serialização fica com app.serialization.
+    """
+    bt = db.execute(
+        select(models.Backtest.id, models.Backtest.status).where(models.Backtest.id == backtest_id)
+    ).first()
+    if not bt:
+        return None
+    m = db.execute(
+        select(*[getattr(models.Metric, k) for k in SUMMARY_METRIC_KEYS])
+        .where(models.Metric.backtest_id == backtest_id)
+        .order_by(desc(models.Metric.id))
+        .limit(1)
+    ).first()
+    metrics = dict(zip(SUMMARY_METRIC_KEYS, m)) if m else {
+        "total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0, "win_rate": None, "avg_trade_return": None,
+    }
+
+    def _columns(model, names, order_col):
+        rows = db.execute(
+            select(*[getattr(model, c) for c in names])
+            .where(model.backtest_id == backtest_id)
+            .order_by(order_col)
+        ).all()
+        cols = list(zip(*rows)) if rows else [()] * len(names)
+        return {name: list(col) for name, col in zip(names, cols)}
+
+    daily_names = ("date",) + RESULT_STREAM_FIELDS
+    return {
+        "backtest_id": backtest_id,
+        "status": bt.status,
+        "metrics": metrics,
+        "trades": _columns(models.Trade, TRADE_COLUMNS, models.Trade.date),
+        "daily_positions": _columns(models.DailyPosition, daily_names, models.DailyPosition.date),
+    }
+
+def iter_daily_columns(
+    db: Session, backtest_ids: list[int], *, fields: tuple[str, ...] = RESULT_STREAM_FIELDS, batch_size: int = 5000,
+) -> Iterator[dict[str, list]]:
+    """
+    Posições diárias de vários backtests em uma única query (cursor no servidor),
+    entregues em blocos colunares: um bloco por backtest (ou a cada `batch_size` linhas).
+    """
+    if not backtest_ids:
+        return
+    D = models.DailyPosition
+    names = ("backtest_id", "date") + fields
+    stmt = (
+        select(*[getattr(D, n) for n in names])
+        .where(D.backtest_id.in_(backtest_ids))
+        .order_by(D.backtest_id, D.date)
+        .execution_options(yield_per=batch_size)
+    )
+    cols: dict[str, list] = {n: [] for n in names}
+    current = None
+    for row in db.execute(stmt):
+        if (row[0] != current and cols["backtest_id"]) or len(cols["backtest_id"]) >= batch_size:
+            yield cols
+            cols = {n: [] for n in names}
+        current = row[0]
+        for n, v in zip(names, row):
+            cols[n].append(v)
+    if cols["backtest_id"]:
+        yield cols
+
+def get_equity_series(db: Session, backtest_id: int) -> tuple[list[datetime], list[float]]:
+    """Datas e equity diários do backtest (só as duas colunas, sem carregar ORM)."""
+    dates, equity, _ = get_equity_drawdown_series(db, backtest_id)
+    return dates, equity
+
+def get_equity_drawdown_series(db: Session, backtest_id: int) -> tuple[list[datetime], list[float], list[float]]:
+    rows = db.execute(
+        select(models.DailyPosition.date, models.DailyPosition.equity, models.DailyPosition.drawdown)
+        .where(models.DailyPosition.backtest_id == backtest_id)
+        .order_by(models.DailyPosition.date)
+    ).all()
+    return [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+
+def jobrun_start(
+    db: Session, job_name: str, message: str | None = None, *, trigger: str | None = None, attempt: int = 1,
+) -> models.JobRun:
+    jr = models.JobRun(
+        job_name=job_name, status="started", message=message or "",
+        started_at=datetime.utcnow(), trigger=trigger, attempt=attempt,
+    )
     db.add(jr)
     db.commit()
     db.refresh(jr)
     return jr
 
-def jobrun_finish(db: Session, jr_id: int, status: str, message: str | None = None):
+def jobrun_finish(
+    db: Session, jr_id: int, status: str, message: str | None = None, *, steps: list[dict] | None = None,
+):
     jr = db.query(models.JobRun).filter(models.JobRun.id == jr_id).first()
     if not jr:
         return
     jr.status = status
     jr.finished_at = datetime.utcnow()
+    jr.duration_ms = round((jr.finished_at - jr.started_at).total_seconds() * 1000, 1)
+    if steps is not None:
+        jr.steps_json = json.dumps(steps)
     if message:
         jr.message = (jr.message or "") + ("\n" if jr.message else "") + message
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+def acquire_job_lease(db: Session, job_name: str, slots: int, ttl: timedelta, holder: str) -> int | None:
+    """
+    Toma uma das `slots` vagas do job entre réplicas; retorna a vaga ou None se todas
+    estão com lease válido. Atômico nos dois caminhos: o UPDATE só afeta a linha se o
+    lease expirou (rowcount decide quem ganhou) e o INSERT da vaga nova falha por
+    UniqueConstraint se outra réplica criou a linha antes.
+    """
+    L = models.JobLease
+    for slot in range(slots):
+        now = datetime.utcnow()
+        res = db.execute(
+            update(L)
+            .where(L.job_name == job_name, L.slot == slot, L.lease_expires < now)
+            .values(holder=holder, lease_expires=now + ttl)
+        )
+        db.commit()
+        if res.rowcount == 1:
+            return slot
+        exists = db.execute(select(L.id).where(L.job_name == job_name, L.slot == slot)).first()
+        if exists:
+            continue
+        db.add(L(job_name=job_name, slot=slot, holder=holder, lease_expires=now + ttl))
+        try:
+            db.commit()
+            return slot
+        except IntegrityError:
+            db.rollback()  # outra réplica criou a vaga no mesmo instante
+    return None
+
+def release_job_lease(db: Session, job_name: str, slot: int, holder: str) -> None:
+    """Libera a vaga (só se ainda for nossa: um lease expirado pode ter sido retomado)."""
+    L = models.JobLease
+    db.execute(
+        update(L)
+        .where(L.job_name == job_name, L.slot == slot, L.holder == holder)
+        .values(holder=None, lease_expires=datetime.utcnow())
+    )
+    db.commit()
+
+def list_jobruns(db: Session, job_name: str | None = None, status: str | None = None, limit: int = 50):
+    stmt = select(models.JobRun)
+    if job_name:
+        stmt = stmt.where(models.JobRun.job_name == job_name)
+    if status:
+        stmt = stmt.where(models.JobRun.status == status)
+    return db.execute(stmt.order_by(desc(models.JobRun.started_at), desc(models.JobRun.id)).limit(limit)).scalars().all()
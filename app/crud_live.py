@@ -0,0 +1,118 @@
+# app/crud_live.py
+"""Persistência do modo live/paper: carrega o estado, avança com as barras novas e salva."""
+from __future__ import annotations
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud_prices import get_price_columns
+from app.live_engine import build, bars_from_columns
+
+
+def params_hash(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def get_state(db: Session, state_id: int) -> models.StrategyState | None:
+    return db.get(models.StrategyState, state_id)
+
+
+def find_state(db: Session, ticker: str, strategy_type: str, params: dict) -> models.StrategyState | None:
+    return db.execute(
+        select(models.StrategyState).where(
+            models.StrategyState.ticker == ticker,
+            models.StrategyState.strategy_type == strategy_type,
+            models.StrategyState.params_hash == params_hash(params),
+        )
+    ).scalar_one_or_none()
+
+
+def state_conflicts(
+    st: models.StrategyState, *, initial_cash: float, commission: float, start_date: datetime,
+) -> dict[str, tuple]:
+    """Campos do pedido que diferem do estado já existente: {campo: (guardado, pedido)}."""
+    wanted = {"initial_cash": initial_cash, "commission": commission, "start_date": start_date}
+    out = {}
+    for name, value in wanted.items():
+        stored = getattr(st, name)
+        if stored is not None and stored != value:
+            out[name] = (stored, value)
+    return out
+
+
+def list_states(db: Session, ticker: str | None = None, strategy_type: str | None = None):
+    stmt = select(models.StrategyState)
+    if ticker:
+        stmt = stmt.where(models.StrategyState.ticker == ticker)
+    if strategy_type:
+        stmt = stmt.where(models.StrategyState.strategy_type == strategy_type)
+    return db.execute(stmt.order_by(models.StrategyState.id)).scalars().all()
+
+
+def create_state(
+    db: Session, *, ticker: str, strategy_type: str, params: dict,
+    initial_cash: float = 100000.0, commission: float = 0.0, start_date: datetime | None = None,
+) -> models.StrategyState:
+    strat = build(strategy_type, params, initial_cash=initial_cash, commission=commission)
+    st = models.StrategyState(
+        ticker=ticker,
+        strategy_type=strategy_type,
+        params_hash=params_hash(params),
+        strategy_params_json=json.dumps(params),
+        initial_cash=initial_cash,
+        commission=commission,
+        start_date=start_date,
+        state_json=json.dumps(strat.dump()),
+    )
+    db.add(st)
+    db.commit()
+    db.refresh(st)
+    return st
+
+
+def advance_state(db: Session, st: models.StrategyState, since: datetime | None = None) -> list[dict]:
+    """
+    Alimenta a estratégia só com as barras armazenadas após last_bar_date (ou desde `since`
+    no primeiro avanço) e salva o novo estado. Retorna os eventos gerados.
+    """
+    strat = build(st.strategy_type, json.loads(st.strategy_params_json), json.loads(st.state_json))
+    start = st.last_bar_date + timedelta(seconds=1) if st.last_bar_date else since
+    cols = get_price_columns(db, st.ticker, start, None)
+    bars = bars_from_columns(cols) if cols else []
+    if not bars:
+        return []
+
+    events = strat.run(bars)
+    st.state_json = json.dumps(strat.dump())
+    st.last_bar_date = datetime.fromisoformat(strat.last_date)
+    st.last_signal_json = json.dumps([e for e in events if e["date"] == strat.last_date])
+    st.updated_at = datetime.utcnow()
+    db.commit()
+    return events
+
+
+def advance_states_for_ticker(db: Session, ticker: str) -> int:
+    """Avança todos os estados do ticker (chamado após gravar preços novos). Retorna barras processadas."""
+    n = 0
+    for st in list_states(db, ticker=ticker):
+        before = json.loads(st.state_json).get("bars", 0)
+        advance_state(db, st)
+        n += json.loads(st.state_json).get("bars", 0) - before
+    return n
+
+
+def state_summary(st: models.StrategyState) -> dict:
+    strat = build(st.strategy_type, json.loads(st.strategy_params_json), json.loads(st.state_json))
+    return {
+        "id": st.id,
+        "ticker": st.ticker,
+        "strategy_type": st.strategy_type,
+        "params": json.loads(st.strategy_params_json),
+        "updated_at": st.updated_at.isoformat(),
+        **strat.summary(),
+        "last_signal": json.loads(st.last_signal_json) if st.last_signal_json else [],
+    }
@@ -1,6 +1,7 @@
 # app/crud_prices.py
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, func
 from app import models
 
 def ensure_symbol(db: Session, ticker: str):
@@ -13,16 +14,299 @@ def ensure_symbol(db: Session, ticker: str):
     db.refresh(sym)
     return sym
 
+def ensure_symbols(db: Session, tickers, cache: dict[str, int] | None = None) -> dict[str, int]:
+    """
+    Versão em lote de ensure_symbol: resolve vários tickers com no máximo um SELECT
+    e um INSERT. `cache` (ticker -> symbol_id) é do chamador e vale para uma operação
+    (ex.: uma importação): ids já vistos não voltam ao banco e os novos são gravados nele.
+    """
+    cache = {} if cache is None else cache
+    out: dict[str, int] = {}
+    pending = []
+    for t in dict.fromkeys(tickers):
+        sid = cache.get(t)
+        if sid is None:
+            pending.append(t)
+        else:
+            out[t] = sid
+    if not pending:
+        return out
+
+    rows = db.execute(
+        select(models.Symbol.ticker, models.Symbol.id).where(models.Symbol.ticker.in_(pending))
+    ).all()
+    found = {t: sid for t, sid in rows}
+    new = [models.Symbol(ticker=t) for t in pending if t not in found]
+    if new:
+        db.add_all(new)
+        db.commit()
+        found.update({s.ticker: s.id for s in new})
+
+    cache.update(found)
+    out.update(found)
+    return out
+
+def list_tickers(db: Session) -> list[str]:
+    return list(db.execute(select(models.Symbol.ticker).order_by(models.Symbol.ticker)).scalars())
+
+def _price_upsert_stmt(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(models.Price)
+    return stmt.on_conflict_do_update(
+        index_elements=["symbol_id", "date"],
+        set_={c: getattr(stmt.excluded, c) for c in ("open", "high", "low", "close", "volume")},
+    )
+
+def upsert_price_rows(db: Session, rows: list[dict], commit: bool = True) -> int:
+    """
+    Upsert em lote (INSERT ... ON CONFLICT (symbol_id, date) DO UPDATE) via executemany.
+    Cada dict: symbol_id, date, open, high, low, close, volume.
+    """
+    if not rows:
+        return 0
+    stmt = _price_upsert_stmt(db)
+    if stmt is not None:
+        db.execute(stmt, rows)
+    else:
+        # dialeto sem ON CONFLICT: cai para merge linha a linha
+        for r in rows:
+            existing = db.execute(
+                select(models.Price).where(models.Price.symbol_id == r["symbol_id"], models.Price.date == r["date"])
+            ).scalar_one_or_none()
+            if existing:
+                for k in ("open", "high", "low", "close", "volume"):
+                    setattr(existing, k, r[k])
+            else:
+                db.add(models.Price(**r))
+    if commit:
+        db.commit()
+    return len(rows)
+
+def price_rows_from_df(symbol_id: int, df) -> list[dict]:
+    cols = df[["date", "open", "high", "low", "close", "volume"]]
+    rows = cols.to_dict("records")
+    for r in rows:
+        r["symbol_id"] = symbol_id
+        r["date"] = r["date"].to_pydatetime()
+    return rows
+
 def bulk_upsert_prices(db: Session, symbol_id: int, df):
-    for _, row in df.iterrows():
-        obj = models.Price(
-            symbol_id=symbol_id,
-            date=row["date"],
-            open=row["open"],
-            high=row["high"],
-            low=row["low"],
-            close=row["close"],
-            volume=row["volume"],
+    upsert_price_rows(db, price_rows_from_df(symbol_id, df))
+
+def get_close_series(db: Session, ticker: str, start: datetime, end: datetime) -> tuple[list[datetime], list[float]]:
+    """Fechamentos armazenados para o ticker no intervalo (apenas colunas date/close)."""
+    rows = db.execute(
+        select(models.Price.date, models.Price.close)
+        .join(models.Symbol, models.Symbol.id == models.Price.symbol_id)
+        .where(models.Symbol.ticker == ticker, models.Price.date >= start, models.Price.date <= end)
+        .order_by(models.Price.date)
+    ).all()
+    return [r[0] for r in rows], [r[1] for r in rows]
+
+PRICE_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+def get_price_columns(
+    db: Session, ticker: str, start: datetime | None = None, end: datetime | None = None,
+) -> dict[str, list] | None:
+    """OHLCV armazenado em colunas ({"date": [...], "close": [...]}); None se o ticker não existe."""
+    sym_id = db.execute(select(models.Symbol.id).where(models.Symbol.ticker == ticker)).scalar_one_or_none()
+    if sym_id is None:
+        return None
+    stmt = select(*[getattr(models.Price, c) for c in PRICE_COLUMNS]).where(models.Price.symbol_id == sym_id)
+    if start:
+        stmt = stmt.where(models.Price.date >= start)
+    if end:
+        stmt = stmt.where(models.Price.date <= end)
+    rows = db.execute(stmt.order_by(models.Price.date)).all()
+    cols = list(zip(*rows)) if rows else [()] * len(PRICE_COLUMNS)
+    return {name: list(col) for name, col in zip(PRICE_COLUMNS, cols)}
+
+def get_price_matrices(
+    db: Session,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    tickers: list[str] | None = None,
+    columns: tuple[str, ...] = ("close",),
+):
+    """
+    OHLCV de todo o universo (ou de `tickers`) alinhado em matrizes datas × tickers, com NaN
+    onde o ticker não tem barra. Uma única query; o pivot é vetorizado (np.unique).
+    Retorna (datas datetime64[D], tickers, {coluna: matriz float64}).
+    """
+    import numpy as np
+
+    stmt = select(models.Price.symbol_id, models.Price.date, *[getattr(models.Price, c) for c in columns])
+    if tickers:
+        stmt = stmt.join(models.Symbol, models.Symbol.id == models.Price.symbol_id).where(models.Symbol.ticker.in_(tickers))
+    if start:
+        stmt = stmt.where(models.Price.date >= start)
+    if end:
+        stmt = stmt.where(models.Price.date <= end)
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), [], {c: np.empty((0, 0)) for c in columns}
+
+    sids, dates, *values = zip(*rows)
+    uniq_dates, di = np.unique(np.array(dates, dtype="datetime64[D]"), return_inverse=True)
+    uniq_sids, ti = np.unique(np.array(sids, dtype=np.int64), return_inverse=True)
+    names = dict(db.execute(
+        select(models.Symbol.id, models.Symbol.ticker).where(models.Symbol.id.in_(uniq_sids.tolist()))
+    ).all())
+    matrices = {}
+    for c, col in zip(columns, values):
+        m = np.full((len(uniq_dates), len(uniq_sids)), np.nan)
+        m[di, ti] = np.array(col, dtype=float)
+        matrices[c] = m
+    return uniq_dates, [names[s] for s in uniq_sids.tolist()], matrices
+
+def get_close_matrix(
+    db: Session, start: datetime | None = None, end: datetime | None = None, tickers: list[str] | None = None,
+):
+    """Fechamentos alinhados (datas, tickers, matriz datas × tickers); ver get_price_matrices."""
+    dates, names, matrices = get_price_matrices(db, start, end, tickers)
+    return dates, names, matrices["close"]
+
+def prices_version(db: Session, tickers: list[str] | None = None) -> tuple:
+    """
+    Marca barata de "chegaram barras novas": maior id e maior data em `prices` (ambos
+    indexados), do universo ou só de `tickers`. Muda a cada INSERT de barra nova; não muda
+    em re-upsert de barras existentes.
+    """
+    stmt = select(func.max(models.Price.id), func.max(models.Price.date))
+    if tickers:
+        stmt = stmt.join(models.Symbol, models.Symbol.id == models.Price.symbol_id).where(models.Symbol.ticker.in_(tickers))
+    return tuple(db.execute(stmt).one())
+
+# -- intraday: um blob compactado por símbolo/intervalo/pregão (models.IntradayChunk) --
+INTRADAY_COLUMNS = ("open", "high", "low", "close", "volume")
+
+def _pack_day(offsets, values) -> bytes:
+    """int32 (segundos desde a meia-noite) + float64 em planos de bytes: o zlib comprime bem mais."""
+    import zlib
+    import numpy as np
+    raw = np.ascontiguousarray(values, dtype="<f8")
+    planes = raw.view(np.uint8).reshape(-1, 8).T.tobytes()
+    return zlib.compress(np.asarray(offsets, dtype="<i4").tobytes() + planes, 6)
+
+def _unpack_day(blob: bytes, n: int):
+    import zlib
+    import numpy as np
+    raw = zlib.decompress(blob)
+    offsets = np.frombuffer(raw, "<i4", n)
+    planes = np.frombuffer(raw, np.uint8, offset=4 * n).reshape(8, -1)
+    values = np.ascontiguousarray(planes.T).view("<f8").reshape(len(INTRADAY_COLUMNS), n)
+    return offsets, values
+
+def upsert_intraday_bars(db: Session, symbol_id: int, interval: str, df, commit: bool = True) -> int:
+    """
+    Grava barras intraday (DataFrame normalizado: date, open, high, low, close, volume).
+    Dias já armazenados são mesclados (a barra nova vence no mesmo horário).
+    """
+    import numpy as np
+    if df is None or not len(df):
+        return 0
+    ts = df["date"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    values = np.vstack([df[c].to_numpy(dtype=float) for c in INTRADAY_COLUMNS])
+    day = ts // 86400
+    bounds = np.flatnonzero(np.r_[True, day[1:] != day[:-1], True])
+    days = [datetime(1970, 1, 1) + timedelta(days=int(d)) for d in day[bounds[:-1]]]
+
+    existing = {
+        c.day: c for c in db.execute(
+            select(models.IntradayChunk).where(
+                models.IntradayChunk.symbol_id == symbol_id,
+                models.IntradayChunk.interval == interval,
+                models.IntradayChunk.day.in_(days),
+            )
+        ).scalars()
+    }
+    for k, d in enumerate(days):
+        lo, hi = bounds[k], bounds[k + 1]
+        offsets, vals = ts[lo:hi] - day[lo] * 86400, values[:, lo:hi]
+        chunk = existing.get(d)
+        if chunk is not None:
+            old_off, old_vals = _unpack_day(chunk.data, chunk.n_bars)
+            offsets = np.r_[offsets, old_off]
+            vals = np.hstack([vals, old_vals])
+        # ordena e remove horários repetidos (primeira ocorrência = barra nova)
+        offsets, first = np.unique(offsets, return_index=True)
+        vals = vals[:, first]
+        if chunk is None:
+            db.add(models.IntradayChunk(symbol_id=symbol_id, interval=interval, day=d,
+                                        n_bars=len(offsets), data=_pack_day(offsets, vals)))
+        else:
+            chunk.n_bars, chunk.data = len(offsets), _pack_day(offsets, vals)
+    if commit:
+        db.commit()
+    return len(ts)
+
+def iter_intraday_bars(
+    db: Session, ticker: str, interval: str,
+    start: datetime | None = None, end: datetime | None = None, chunk_days: int = 64,
+):
+    """
+    Barras intraday em blocos de até `chunk_days` pregões (paginação por `day`), como
+    colunas NumPy {"date": datetime64[s], "open": ..., "volume": ...}. Memória limitada
+    ao bloco, não à série inteira.
+    """
+    import numpy as np
+    sym_id = db.execute(select(models.Symbol.id).where(models.Symbol.ticker == ticker)).scalar_one_or_none()
+    if sym_id is None:
+        return
+    lo = np.datetime64(start, "s") if start else None
+    hi = np.datetime64(end, "s") if end else None
+    last_day = datetime(start.year, start.month, start.day) if start else None
+    first = True
+    while True:
+        stmt = select(models.IntradayChunk.day, models.IntradayChunk.n_bars, models.IntradayChunk.data).where(
+            models.IntradayChunk.symbol_id == sym_id, models.IntradayChunk.interval == interval,
         )
-        db.merge(obj)  # merge = upsert-like
-    db.commit()
+        if last_day is not None:
+            stmt = stmt.where(models.IntradayChunk.day >= last_day if first else models.IntradayChunk.day > last_day)
+        if end:
+            stmt = stmt.where(models.IntradayChunk.day <= end)
+        rows = db.execute(stmt.order_by(models.IntradayChunk.day).limit(chunk_days)).all()
+        if not rows:
+            return
+        first, last_day = False, rows[-1][0]
+        dates, values = [], []
+        for d, n, blob in rows:
+            offsets, vals = _unpack_day(blob, n)
+            dates.append(np.datetime64(d, "s") + offsets.astype("timedelta64[s]"))
+            values.append(vals)
+        date = np.concatenate(dates)
+        vals = np.hstack(values)
+        keep = np.ones(len(date), dtype=bool)
+        if lo is not None:
+            keep &= date >= lo
+        if hi is not None:
+            keep &= date <= hi
+        out = {"date": date[keep], **{c: vals[i][keep] for i, c in enumerate(INTRADAY_COLUMNS)}}
+        if len(out["date"]):
+            yield out
+        if len(rows) < chunk_days:
+            return
+
+def get_intraday_columns(
+    db: Session, ticker: str, interval: str, start: datetime | None = None, end: datetime | None = None,
+) -> dict | None:
+    """Série intraday inteira do intervalo (concatenação dos blocos); None sem barras."""
+    import numpy as np
+    blocks = list(iter_intraday_bars(db, ticker, interval, start, end))
+    if not blocks:
+        return None
+    return {k: np.concatenate([b[k] for b in blocks]) for k in blocks[0]}
+
+def stored_intervals(db: Session, ticker: str) -> list[str]:
+    """Intervalos intraday com barras armazenadas para o ticker."""
+    return list(db.execute(
+        select(models.IntradayChunk.interval).distinct()
+        .join(models.Symbol, models.Symbol.id == models.IntradayChunk.symbol_id)
+        .where(models.Symbol.ticker == ticker)
+    ).scalars())
@@ -1,8 +1,15 @@
 # app/db.py
+import functools
+import logging
 import os
 import pathlib
+from typing import Any, Callable
+
+import anyio
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
+
+logger = logging.getLogger("uvicorn.error")
 
 # --------- Flags de modo ---------
 APP_MODE = os.getenv("APP_MODE", "").lower()
@@ -21,13 +28,29 @@ if IS_DEV:
 class Base(DeclarativeBase):
     pass
 
+# --------- Pool (mesma configuração para as engines síncrona e assíncrona) ---------
+def pool_options(url: str) -> dict:
+    """
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (s), DB_POOL_RECYCLE (s, -1 desliga) e
+    DB_POOL_PRE_PING (0/1). SQLite usa o pool padrão do dialeto: só o pre-ping se aplica.
+    """
+    opts: dict[str, Any] = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1"}
+    if not url.startswith("sqlite"):
+        opts.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        )
+    return opts
+
 # --------- Engine / Session ---------
 connect_args = {}
 if DATABASE_URL.startswith("sqlite"):
     # necessário para uso do SQLite com FastAPI (threads)
     connect_args["check_same_thread"] = False
 
-engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args)
+engine = create_engine(DATABASE_URL, future=True, connect_args=connect_args, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 def get_db():
@@ -37,6 +60,83 @@ def get_db():
     finally:
         db.close()
 
+# --------- Engine assíncrona (endpoints de leitura) ---------
+# asyncpg (Postgres) / aiosqlite (dev) são opcionais: sem o driver, ou com ASYNC_DB=0,
+# as leituras voltam para a sessão síncrona no threadpool.
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB", "1") == "1"
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_url(url: str) -> str | None:
+    """URL equivalente com driver assíncrono (ASYNC_DATABASE_URL tem precedência)."""
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    scheme, sep, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+", 1)[0])
+    if not sep or driver is None or rest in ("", ":memory:", "/:memory:"):
+        return None  # SQLite em memória: a engine assíncrona veria outro banco
+    return f"{driver}://{rest}"
+
+_async_engine = None
+_async_sessionmaker = None
+_async_failed = False
+
+def configure_async_engine(async_engine) -> None:
+    """Troca a engine assíncrona (ex.: testes apontando para o mesmo arquivo SQLite); None desliga."""
+    global _async_engine, _async_sessionmaker
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    _async_engine = async_engine
+    _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
+
+def get_async_engine():
+    """Engine assíncrona criada sob demanda; None se desligada ou sem driver instalado."""
+    global _async_failed
+    if _async_engine is not None or _async_failed or not ASYNC_DB_ENABLED:
+        return _async_engine
+    url = async_url(DATABASE_URL)
+    try:
+        if url is None:
+            raise ValueError(f"sem driver assíncrono para {DATABASE_URL.split('://')[0]}")
+        from sqlalchemy.ext.asyncio import create_async_engine
+        configure_async_engine(create_async_engine(url, **pool_options(url)))
+    except (ImportError, ValueError) as e:
+        _async_failed = True
+        logger.warning(f"[DB] leituras assíncronas indisponíveis ({e}); usando o threadpool")
+    return _async_engine
+
+class ThreadReadSession:
+    """Leitura pela sessão síncrona, numa thread do threadpool (fallback)."""
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await anyio.to_thread.run_sync(functools.partial(fn, self.session, *args, **kwargs))
+
+class AsyncReadSession:
+    """
+    Leitura pela engine assíncrona: as funções de crud (código ORM síncrono) rodam via
+    AsyncSession.run_sync e a espera pelo banco não ocupa thread nenhuma.
+    """
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+ReadSession = ThreadReadSession | AsyncReadSession
+
+async def get_read_db():
+    """Dependência dos endpoints de leitura: `await rdb.run(crud.fn, ...)`."""
+    if get_async_engine() is None:
+        db = SessionLocal()
+        try:
+            yield ThreadReadSession(db)
+        finally:
+            db.close()
+        return
+    async with _async_sessionmaker() as session:
+        yield AsyncReadSession(session)
+
 # --------- Utilitário: inicialização DEV ----------
 def init_dev_db():
     """
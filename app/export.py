@@ -0,0 +1,82 @@
+# app/export.py
+"""
+Exportação colunar (Parquet / Arrow IPC) de resultados e preços.
+
+As tabelas são montadas direto das colunas retornadas pelo banco (uma lista por
+coluna -> pa.array), sem dicts por linha. `pyarrow` é opcional: sem ele os
+endpoints de export respondem 501.
+"""
+from __future__ import annotations
+import io
+from typing import Iterable, Iterator
+
+try:  # opcional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do ambiente
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("parquet", "arrow")
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+    "arrow_stream": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def schema_for(names: Iterable[str]):
+    types = {
+        "backtest_id": pa.int64(),
+        "date": pa.timestamp("us"),
+        "open_date": pa.timestamp("us"),
+        "side": pa.string(),
+        "bars_held": pa.int32(),
+    }
+    return pa.schema([(n, types.get(n, pa.float64())) for n in names])
+
+
+def table_from_columns(columns: dict[str, list], schema=None):
+    schema = schema or schema_for(columns)
+    return pa.Table.from_arrays(
+        [pa.array(columns[f.name], type=f.type) for f in schema],
+        schema=schema,
+    )
+
+
+def table_to_bytes(table, fmt: str) -> bytes:
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def iter_arrow_stream(schema, batches: Iterable[dict[str, list]]) -> Iterator[bytes]:
+    """
+    Arrow IPC *stream*: schema + um record batch por item, enviado assim que escrito
+    (memória constante mesmo com milhares de backtests).
+    """
+    buf = io.BytesIO()
+    writer = pa.ipc.new_stream(buf, schema)
+
+    def _drain() -> bytes:
+        data = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return data
+
+    for cols in batches:
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(cols[f.name], type=f.type) for f in schema], schema=schema
+        ))
+        yield _drain()
+    writer.close()
+    yield _drain()
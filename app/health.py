@@ -0,0 +1,158 @@
+# app/health.py
+"""
+Health checks baratos para probes (Kubernetes etc.).
+
+Uma thread em background mede, a cada HEALTH_PROBE_INTERVAL segundos, a latência do
+banco, a ocupação do pool de conexões, a profundidade da fila de backtests e o estado
+do market data (passivo: última chamada real ao Yahoo + circuit breaker). Os endpoints
+só leem o último snapshot: tráfego de probe nunca gera carga no banco ou no Yahoo.
+"""
+from __future__ import annotations
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+# snapshot mais velho que isso (ex.: thread travada no banco) deixa o serviço "not ready"
+MAX_SNAPSHOT_AGE = float(os.getenv("HEALTH_MAX_SNAPSHOT_AGE", str(3 * PROBE_INTERVAL)))
+
+_db_latency = metrics.gauge("health_db_latency_seconds", "Latência do SELECT 1 no último probe")
+_pool_in_use = metrics.gauge("db_pool_checked_out", "Conexões do pool em uso no último probe")
+_queue_depth = metrics.gauge("backtest_queue_depth", "Backtests com status queued no último probe")
+
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    try:  # QueuePool; StaticPool/NullPool não têm contadores
+        size, checked_out, overflow = pool.size(), pool.checkedout(), pool.overflow()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        status.update({
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": overflow,
+            "saturation": round(checked_out / capacity, 3) if capacity else None,
+        })
+    except (AttributeError, TypeError):
+        pass
+    return status
+
+
+def probe_db(engine: Engine) -> dict:
+    t0 = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"ok": True, "latency_ms": round((time.perf_counter() - t0) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def probe_queue(session_factory: Callable[[], Session]) -> dict:
+    from app.crud import count_queued_backtests
+    try:
+        with session_factory() as db:
+            return {"ok": True, "queued": count_queued_backtests(db)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def market_data_status() -> dict:
+    # passivo: sem importar app.services.yahoo (pandas) se ninguém usou o Yahoo ainda
+    yahoo = sys.modules.get("app.services.yahoo")
+    if yahoo is None:
+        return {"circuit": "closed", "last_call": None}
+    return {"circuit": yahoo.breaker.state, "last_call": dict(yahoo.last_call) or None}
+
+
+def collect(engine: Engine, session_factory: Callable[[], Session]) -> dict:
+    db = probe_db(engine)
+    queue = probe_queue(session_factory)
+    pool = pool_status(engine)
+    if db.get("ok"):
+        _db_latency.set(db["latency_ms"] / 1000)
+    if "checked_out" in pool:
+        _pool_in_use.set(pool["checked_out"])
+    if queue.get("ok"):
+        _queue_depth.set(queue["queued"])
+    # engine assíncrona das leituras, se já foi criada (não força a criação aqui)
+    async_engine = getattr(sys.modules.get("app.db"), "_async_engine", None)
+    return {
+        "checked_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "db": db,
+        "pool": pool,
+        "async_pool": pool_status(async_engine.sync_engine) if async_engine is not None else None,
+        "queue": queue,
+        "market_data": market_data_status(),
+    }
+
+
+class HealthProbe:
+    def __init__(self, engine: Engine, session_factory: Callable[[], Session], interval: float = PROBE_INTERVAL):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.interval = interval
+        self._snapshot: dict | None = None
+        self._taken_at: float | None = None
+        self._halt = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> dict:
+        snap = collect(self.engine, self.session_factory)
+        self._snapshot, self._taken_at = snap, time.monotonic()
+        return snap
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:  # o probe nunca derruba o processo
+            logger.warning(f"[HEALTH] probe falhou: {e}")
+
+    def _loop(self):
+        while not self._halt.wait(self.interval):
+            self._safe_refresh()
+
+    def start(self):
+        """Primeiro probe síncrono (readiness já definida ao fim do startup), depois em background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._halt.clear()
+        self._safe_refresh()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="health-probe")
+        self._thread.start()
+
+    def stop(self):
+        self._halt.set()
+
+    def snapshot(self) -> tuple[dict | None, float | None]:
+        """(último snapshot, idade em segundos)."""
+        if self._taken_at is None:
+            return None, None
+        return self._snapshot, time.monotonic() - self._taken_at
+
+    def ready(self) -> bool:
+        snap, age = self.snapshot()
+        return bool(snap and snap["db"].get("ok") and age <= MAX_SNAPSHOT_AGE)
+
+
+_probe: HealthProbe | None = None
+
+
+def get_probe() -> HealthProbe:
+    global _probe
+    if _probe is None:
+        from app.db import engine, SessionLocal
+        _probe = HealthProbe(engine, SessionLocal)
+    return _probe
@@ -0,0 +1,140 @@
+# app/http_cache.py
+"""
+Cache HTTP para respostas imutáveis (backtests finalizados).
+
+- corpo serializado guardado em memória, com limite em bytes (HTTP_CACHE_MAX_BYTES)
+- ETag forte por representação + 304 em If-None-Match
+- gzip (stdlib) ou brotli (se o pacote `brotli` estiver instalado), conforme Accept-Encoding
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+
+import anyio
+from typing import Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+
+from app.cache import LRUCache
+
+try:  # opcional
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MIN_COMPRESS_BYTES = 1024
+
+
+class CachedBody:
+    __slots__ = ("media_type", "etag", "variants")
+
+    def __init__(self, body: bytes, media_type: str, compress: bool = True):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = digest
+        # encoding -> bytes ("identity" sempre presente)
+        self.variants: dict[str, bytes] = {"identity": body}
+        if compress and len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=5)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(v) for v in self.variants.values())
+
+    def etag_for(self, encoding: str) -> str:
+        # ETag forte precisa diferir entre representações (RFC 9110 §8.8.3)
+        return f'"{self.etag}"' if encoding == "identity" else f'"{self.etag}-{encoding}"'
+
+
+body_cache = LRUCache(
+    maxsize=4096,
+    max_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sizeof=lambda e: e.nbytes,
+)
+
+
+def _choose_encoding(request: Request, entry: CachedBody) -> str:
+    accept = request.headers.get("accept-encoding", "").lower()
+    tokens = {t.split(";")[0].strip() for t in accept.split(",") if t.strip()}
+    for enc in ("br", "gzip"):
+        if enc in entry.variants and enc in tokens:
+            return enc
+    return "identity"
+
+
+def _etag_matches(request: Request, entry: CachedBody) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    for tag in inm.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag.split("-", 1)[0] == entry.etag:
+            return True
+    return False
+
+
+def respond(request: Request, entry: CachedBody) -> Response:
+    encoding = _choose_encoding(request, entry)
+    headers = {
+        "ETag": entry.etag_for(encoding),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, entry):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=entry.variants[encoding], media_type=entry.media_type, headers=headers)
+
+
+def _store(request: Request, key: Hashable, built: tuple[bytes, bool], media_type: str, compress: bool) -> Response:
+    body, immutable = built
+    if not immutable:
+        return Response(content=body, media_type=media_type, headers={"Cache-Control": "no-cache"})
+    entry = CachedBody(body, media_type, compress=compress)
+    body_cache.set(key, entry)
+    return respond(request, entry)
+
+
+def cached_response(
+    request: Request,
+    key: Hashable,
+    build: Callable[[], tuple[bytes, bool]],
+    media_type: str = "application/json",
+    compress: bool = True,
+) -> Response:
+    """
+    Serve `key` do cache; em caso de miss chama `build()` -> (corpo, imutável?).
+    Só respostas imutáveis entram no cache e recebem ETag/Cache-Control longos.
+    """
+    entry = body_cache.get(key)
+    if entry is None:
+        return _store(request, key, build(), media_type, compress)
+    return respond(request, entry)
+
+
+async def cached_response_async(
+    request: Request,
+    key: Hashable,
+    build: Callable[[], Awaitable[tuple[bytes, bool]]],
+    media_type: str = "application/json",
+    compress: bool = True,
+) -> Response:
+    """
+    Igual a cached_response, com `build` assíncrono (leitura pela engine assíncrona).
+    No miss, hash e gzip/br do corpo rodam numa thread, fora do event loop.
+    """
+    entry = body_cache.get(key)
+    if entry is None:
+        built = await build()
+        return await anyio.to_thread.run_sync(_store, request, key, built, media_type, compress)
+    return respond(request, entry)
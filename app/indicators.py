@@ -0,0 +1,265 @@
+# app/indicators.py
+"""
+Indicadores e regra de risco compartilhados por todas as estratégias.
+
+Cada indicador tem duas portas de entrada com a mesma aritmética, na mesma ordem:
+- incremental: classe com `update(...)` O(1) por barra e estado serializável em JSON
+  (`dump()` / construtor com `state`), usada pelo modo live e pelo `next()` do Backtrader;
+- em lote: função NumPy sobre a série inteira, usada pelo `once()` do Backtrader e por
+  análises vetorizadas.
+
+As duas produzem exatamente os mesmos valores; barras de aquecimento valem NaN. As funções
+em lote também aceitam matrizes datas × tickers (cada coluna é uma série, ao longo do eixo 0).
+"""
+from __future__ import annotations
+import math
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+
+NAN = float("nan")
+
+
+def _arr(x: Iterable[float]) -> np.ndarray:
+    return np.asarray(x, dtype=float)
+
+
+# ---------------- SMA (soma corrente) ----------------
+class Sma:
+    def __init__(self, period: int, state: dict | None = None):
+        self.period = period
+        s = state or {}
+        self.buf = deque(s.get("buf", []), maxlen=period)
+        self.total = float(s.get("total", 0.0))
+
+    def update(self, x: float) -> float:
+        if len(self.buf) == self.period:
+            self.total -= self.buf[0]
+        self.buf.append(x)
+        self.total += x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.total / self.period if len(self.buf) == self.period else NAN
+
+    def dump(self) -> dict:
+        return {"buf": list(self.buf), "total": self.total}
+
+
+def sma(x: Iterable[float], period: int) -> np.ndarray:
+    x = _arr(x)
+    out = np.full(x.shape, NAN)
+    if len(x) < period:
+        return out
+    # mesma sequência de operações da soma corrente: +x[0..p-1], depois -x[i-p], +x[i]
+    steps = np.empty((period + 2 * (len(x) - period),) + x.shape[1:])
+    steps[:period] = x[:period]
+    steps[period::2] = -x[:-period]
+    steps[period + 1::2] = x[period:]
+    totals = np.cumsum(steps, axis=0)  # acumulação sequencial (não pairwise)
+    out[period - 1] = totals[period - 1]
+    out[period:] = totals[period + 1::2]
+    out[period - 1:] /= period
+    return out
+
+
+# ---------------- ATR de Wilder ----------------
+class WilderAtr:
+    """Média suavizada do true range; semente = média simples dos `period` primeiros TRs."""
+    def __init__(self, period: int, state: dict | None = None):
+        self.period = period
+        s = state or {}
+        self.prev_close = s.get("prev_close")
+        self.atr = s.get("atr")
+        if "seed" in s:  # formato antigo: lista dos TRs de aquecimento
+            self.seed_sum, self.seed_n = float(sum(s["seed"])), len(s["seed"])
+        else:
+            self.seed_sum, self.seed_n = float(s.get("seed_sum", 0.0)), int(s.get("seed_n", 0))
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self.prev_close is not None:
+            tr = max(high, self.prev_close) - min(low, self.prev_close)
+            if self.atr is None:
+                self.seed_sum += tr
+                self.seed_n += 1
+                if self.seed_n == self.period:
+                    self.atr = self.seed_sum / self.period
+            else:
+                self.atr = (self.atr * (self.period - 1) + tr) / self.period
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return NAN if self.atr is None else self.atr
+
+    def dump(self) -> dict:
+        return {"prev_close": self.prev_close, "seed_sum": self.seed_sum, "seed_n": self.seed_n, "atr": self.atr}
+
+
+def true_range(high: Iterable[float], low: Iterable[float], close: Iterable[float]) -> np.ndarray:
+    """TR a partir da 2ª barra (precisa do fechamento anterior); NaN na primeira."""
+    high, low, close = _arr(high), _arr(low), _arr(close)
+    tr = np.full(close.shape, NAN)
+    prev = close[:-1]
+    tr[1:] = np.maximum(high[1:], prev) - np.minimum(low[1:], prev)
+    return tr
+
+
+def wilder_atr(high: Iterable[float], low: Iterable[float], close: Iterable[float], period: int) -> np.ndarray:
+    tr = true_range(high, low, close)
+    out = np.full(tr.shape, NAN)
+    if len(tr) <= period:
+        return out
+    atr = np.cumsum(tr[1:period + 1], axis=0)[-1] / period
+    out[period] = atr
+    # a suavização é uma recorrência (cada valor depende do anterior): laço nas barras,
+    # vetorizado entre colunas
+    for i in range(period + 1, len(tr)):
+        atr = (atr * (period - 1) + tr[i]) / period
+        out[i] = atr
+    return out
+
+
+# ---------------- Highest / Lowest (deque monotônica) ----------------
+class _Extreme:
+    """Máxima/mínima das últimas `period` barras em O(1) amortizado."""
+    _better: staticmethod  # _better(novo, topo): o novo valor domina o topo da deque
+
+    def __init__(self, period: int, state: dict | None = None):
+        self.period = period
+        s = state or {}
+        self.n = 0
+        self.q: deque[tuple[int, float]] = deque()  # (índice, valor), valores monotônicos
+        if "buf" in s:  # formato antigo: janela crua
+            for x in s["buf"]:
+                self.update(x)
+        else:
+            self.n = int(s.get("n", 0))
+            self.q.extend((int(i), v) for i, v in s.get("q", []))
+
+    def update(self, x: float) -> float:
+        while self.q and self._better(x, self.q[-1][1]):
+            self.q.pop()
+        self.q.append((self.n, x))
+        self.n += 1
+        if self.q[0][0] <= self.n - 1 - self.period:
+            self.q.popleft()
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.q[0][1] if self.n >= self.period else NAN
+
+    def dump(self) -> dict:
+        return {"n": self.n, "q": [list(e) for e in self.q]}
+
+
+class Highest(_Extreme):
+    _better = staticmethod(lambda a, b: a >= b)
+
+
+class Lowest(_Extreme):
+    _better = staticmethod(lambda a, b: a <= b)
+
+
+def _rolling(x: Iterable[float], period: int, reduce) -> np.ndarray:
+    x = _arr(x)
+    out = np.full(x.shape, NAN)
+    if len(x) >= period:
+        out[period - 1:] = reduce(np.lib.stride_tricks.sliding_window_view(x, period, axis=0), axis=-1)
+    return out
+
+
+def highest(x: Iterable[float], period: int) -> np.ndarray:
+    return _rolling(x, period, np.max)
+
+
+def lowest(x: Iterable[float], period: int) -> np.ndarray:
+    return _rolling(x, period, np.min)
+
+
+# ---------------- Momentum (buffer circular) ----------------
+class Momentum:
+    """Retorno acumulado em `period` barras: x / x[-period] - 1 (NaN se a base for 0)."""
+    def __init__(self, period: int, state: dict | None = None):
+        self.period = period
+        self.ring = [0.0] * (period + 1)
+        self.n = 0
+        for x in (state or {}).get("buf", []):
+            self._push(x)
+
+    def _push(self, x: float) -> None:
+        self.ring[self.n % len(self.ring)] = x
+        self.n += 1
+
+    def update(self, x: float) -> float:
+        self._push(x)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.n <= self.period:
+            return NAN
+        base = self.ring[self.n % len(self.ring)]  # posição mais antiga = próxima a ser sobrescrita
+        if base == 0:
+            return NAN
+        return self.ring[(self.n - 1) % len(self.ring)] / base - 1.0
+
+    def dump(self) -> dict:
+        size = len(self.ring)
+        k = min(self.n, size)
+        return {"buf": [self.ring[(self.n - k + i) % size] for i in range(k)]}
+
+
+def momentum(x: Iterable[float], period: int) -> np.ndarray:
+    x = _arr(x)
+    out = np.full(x.shape, NAN)
+    if len(x) > period:
+        base = x[:-period]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period:] = np.where(base != 0, x[period:] / np.where(base != 0, base, 1.0) - 1.0, NAN)
+    return out
+
+
+# ---------------- risco ----------------
+def size_and_stop(
+    price: float,
+    *,
+    stop_method: str,
+    atr: float | None,
+    alt_stop: float | None,
+    atr_mult: float,
+    risk_pct: float,
+    equity: float,
+    cash: float,
+    lot_size: int = 1,
+) -> tuple[int, float | None]:
+    """
+    Stop (preço - atr_mult * ATR, ou o stop alternativo da estratégia) e tamanho da posição
+    limitado por risco (equity * risk_pct / risco por ação) e pelo caixa, arredondado por lote.
+    (0, None) quando não há stop válido; (0, stop) quando o tamanho não chega a um lote.
+    """
+    if stop_method == "atr":
+        if atr is None or math.isnan(atr) or atr <= 0:
+            return 0, None
+        stop_price = price - float(atr_mult) * float(atr)
+    else:
+        if alt_stop is None or math.isnan(alt_stop) or alt_stop <= 0:
+            return 0, None
+        stop_price = float(alt_stop)
+
+    risk_per_share = max(price - stop_price, 0.0)
+    if risk_per_share <= 0:
+        return 0, stop_price
+
+    size_risk = int(equity * float(risk_pct) // risk_per_share)
+    size_cash = int(cash // price)
+    size = max(0, min(size_risk, size_cash))
+
+    lot = int(lot_size or 1)
+    if size < lot:
+        return 0, stop_price
+    return (size // lot) * lot, stop_price
@@ -0,0 +1,190 @@
+# app/jobs/backtest_worker.py
+"""
+Worker da fila de backtests.
+
+Backtests enfileirados (status "queued", via POST /backtests/enqueue) são reservados
+com SELECT ... FOR UPDATE SKIP LOCKED, executados e gravados. Qualquer número de
+processos/hosts pode drenar a fila em paralelo: capacidade cresce adicionando nós.
+
+Enquanto roda, o worker renova `heartbeat_at`; backtests de workers mortos
+(sem heartbeat há mais de `stale_after` s) voltam para a fila.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.telemetry import RunTelemetry
+from app.db import SessionLocal
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ClaimLost(RuntimeError):
+    """O backtest foi re-enfileirado (heartbeat expirado) e pertence a outro worker."""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_engine(bt: models.Backtest, db: Session | None = None) -> dict:
+    from app.backtest_engine import run_backtest
+    return run_backtest(
+        bt.ticker,
+        bt.start_date.strftime("%Y-%m-%d"),
+        bt.end_date.strftime("%Y-%m-%d"),
+        bt.strategy_type,
+        json.loads(bt.strategy_params_json or "{}"),
+        bt.initial_cash,
+        bt.commission,
+        db=db,
+        timeframe=bt.timeframe or "1d",
+    )
+
+
+def save_backtest_results(db: Session, backtest_id: int, result: dict) -> None:
+    crud.save_metrics(db, backtest_id, result["metrics"])
+    crud.save_trades(db, backtest_id, result["trades"])
+    crud.save_daily_positions(db, backtest_id, result["daily_positions"])
+    src = result.get("data_source") or {}
+    crud.set_backtest_data_source(db, backtest_id, src.get("source"), src.get("stale"))
+
+
+def execute_backtest(db: Session, bt: models.Backtest, profiled: bool = False) -> dict:
+    """
+    Roda o backtest e grava métricas, trades, posições e a telemetria da execução
+    (`profiled`: chamado sob app.profiling; a telemetria fica marcada e fora do relatório).
+    """
+    with RunTelemetry(bt.strategy_type, timeframe=bt.timeframe, profiled=profiled) as tel:
+        result = run_engine(bt, db)
+        tel.absorb(result)
+        with tel.phase("persist"):
+            save_backtest_results(db, bt.id, result)
+    crud.save_backtest_telemetry(db, bt.id, tel.record())
+    return result
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, session_factory: Callable[[], Session], backtest_id: int, worker_id: str, interval: float):
+        super().__init__(daemon=True, name=f"heartbeat-{backtest_id}")
+        self.session_factory = session_factory
+        self.backtest_id = backtest_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self.lost = False
+        self._halt = threading.Event()
+
+    def run(self):
+        # sessão própria: a sessão do worker está ocupada com o backtest
+        db = self.session_factory()
+        try:
+            while not self._halt.wait(self.interval):
+                try:
+                    if not crud.heartbeat_backtest(db, self.backtest_id, self.worker_id):
+                        self.lost = True
+                        return
+                except Exception as e:  # banco indisponível: tenta de novo no próximo ciclo
+                    db.rollback()
+                    logger.warning(f"[WORKER] heartbeat falhou para {self.backtest_id}: {e}")
+        finally:
+            db.close()
+
+    def stop(self):
+        self._halt.set()
+        self.join(timeout=self.interval + 1)
+
+
+def process_one(
+    db: Session,
+    session_factory: Callable[[], Session],
+    worker_id: str,
+    heartbeat_interval: float = 10.0,
+    profile: bool = False,
+) -> int | None:
+    """
+    Reserva e executa um backtest. Retorna o id processado ou None se a fila estiver vazia.
+    Com `profile` (ou profile_requested no backtest), a simulação roda sob app.profiling e
+    o artefato fica em backtest_profiles.
+    """
+    bt = crud.claim_next_backtest(db, worker_id)
+    if bt is None:
+        return None
+    profile = profile or bool(bt.profile_requested)
+    if bt.attempts > 1:
+        crud.clear_backtest_results(db, bt.id)
+
+    hb = _Heartbeat(session_factory, bt.id, worker_id, heartbeat_interval)
+    hb.start()
+    try:
+        with RunTelemetry(bt.strategy_type, timeframe=bt.timeframe, profiled=profile) as tel:
+            if profile:
+                from app.profiling import profile_call
+                result, artifact = profile_call(run_engine, bt, db)
+            else:
+                result = run_engine(bt, db)
+            tel.absorb(result)
+            # confirma a posse antes de gravar: se o heartbeat expirou, outro worker já pegou o backtest
+            if hb.lost or not crud.heartbeat_backtest(db, bt.id, worker_id):
+                raise ClaimLost(f"backtest {bt.id} re-enfileirado durante a execução")
+            with tel.phase("persist"):
+                save_backtest_results(db, bt.id, result)
+        crud.save_backtest_telemetry(db, bt.id, tel.record())
+        if profile:
+            crud.save_backtest_profile(db, bt.id, artifact)
+        crud.finish_claimed_backtest(db, bt.id, worker_id, "finished")
+        logger.info(f"[WORKER] {worker_id} finalizou backtest {bt.id}")
+    except ClaimLost as e:
+        db.rollback()
+        logger.warning(f"[WORKER] {e}")
+    except Exception as e:
+        db.rollback()
+        crud.finish_claimed_backtest(db, bt.id, worker_id, "error", message=str(e))
+        logger.error(f"[WORKER] backtest {bt.id} falhou: {e}")
+    finally:
+        hb.stop()
+    return bt.id
+
+
+def run_worker(
+    session_factory: Callable[[], Session] = SessionLocal,
+    *,
+    worker_id: str | None = None,
+    poll_interval: float = 2.0,
+    heartbeat_interval: float = 10.0,
+    stale_after: float = 60.0,
+    max_attempts: int = 3,
+    max_jobs: int | None = None,
+    stop_when_empty: bool = False,
+    stop_event: threading.Event | None = None,
+    profile: bool = False,
+) -> int:
+    """Loop do worker. Retorna quantos backtests foram processados."""
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    db = session_factory()
+    logger.info(f"[WORKER] {worker_id} iniciado")
+    try:
+        while not stop_event.is_set() and (max_jobs is None or processed < max_jobs):
+            requeued, failed = crud.requeue_stale_backtests(db, timedelta(seconds=stale_after), max_attempts)
+            if requeued or failed:
+                logger.warning(f"[WORKER] abandonados: {requeued} re-enfileirados, {failed} com erro")
+
+            if process_one(db, session_factory, worker_id, heartbeat_interval, profile=profile) is not None:
+                processed += 1
+                continue
+            if stop_when_empty:
+                break
+            stop_event.wait(poll_interval)
+    finally:
+        db.close()
+        logger.info(f"[WORKER] {worker_id} encerrado ({processed} backtests)")
+    return processed
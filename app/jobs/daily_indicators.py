@@ -1,28 +1,56 @@
 from __future__ import annotations
+import os
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-import pandas as pd
-from app.crud import jobrun_start, jobrun_finish
-from app.services.yahoo import fetch_prices
-# se tiver tabela symbols e indicators, importe seus CRUDs aqui
+from app.crud_prices import ensure_symbol, bulk_upsert_prices, list_tickers, upsert_intraday_bars
+from app.crud_live import advance_states_for_ticker
+from app.jobs.runs import JobContext, tracked_run
+from app.services import yahoo
 
-def run_daily_indicators(db: Session, tickers: list[str]):
-    jr = jobrun_start(db, "daily_indicators", message=f"tickers={tickers}")
-    try:
-        # Exemplo simples: só atualiza OHLCV “do último mês”.
-        end = datetime.utcnow().date()
-        start = (end - timedelta(days=40)).strftime("%Y-%m-%d")
-        end_s = end.strftime("%Y-%m-%d")
+LOOKBACK_DAYS = 40
+# intervalos intraday coletados junto (ex.: "5m,1h"); o Yahoo só guarda ~60 dias deles
+INTRADAY_INTERVALS = [i.strip() for i in os.getenv("DAILY_INTRADAY_INTERVALS", "").split(",") if i.strip()]
+INTRADAY_LOOKBACK_DAYS = 5
 
-        updated = []
-        for t in tickers:
-            df = fetch_prices(t, start, end_s)
-            # TODO: salvar em prices (e recalcular indicadores p/ indicators)
-            # Ex.: save_prices(db, t, df) ; recalc_indicators(db, t, df)
+def daily_indicators(db: Session, ctx: JobContext, tickers: list[str] | None = None):
+    """
+    Corpo do job: baixa o OHLCV recente de cada ticker e grava em `prices`.
+    Sem `tickers`, usa todos os tickers cadastrados em `symbols`.
+    """
+    tickers = tickers or list_tickers(db)
+    end = datetime.utcnow().date()
+    start = (end - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    end_s = end.strftime("%Y-%m-%d")
+
+    updated, failed = [], []
+    for t in tickers:
+        try:
+            with ctx.step(f"fetch:{t}"):
+                df = yahoo.fetch_prices(t, start, end_s)
+            with ctx.step(f"upsert:{t}"):
+                bulk_upsert_prices(db, ensure_symbol(db, t).id, df)
+            for interval in INTRADAY_INTERVALS:
+                with ctx.step(f"intraday:{t}:{interval}"):
+                    intra = yahoo.fetch_prices(
+                        t, (end - timedelta(days=INTRADAY_LOOKBACK_DAYS)).strftime("%Y-%m-%d"), end_s, interval=interval,
+                    )
+                    upsert_intraday_bars(db, ensure_symbol(db, t).id, interval, intra)
+            # estados live/paper do ticker avançam só com as barras novas
+            with ctx.step(f"live:{t}"):
+                advance_states_for_ticker(db, t)
             updated.append((t, len(df)))
+        except Exception as e:
+            # um ticker ruim não derruba os demais
+            db.rollback()
+            failed.append(f"{t}: {e}")
+
+    ctx.note("Atualizados: " + ", ".join([f"{t}({n})" for t, n in updated]))
+    if failed:
+        ctx.note("Falhas: " + "; ".join(failed))
+        if not updated:
+            raise RuntimeError("Nenhum ticker atualizado")
+    # TODO: recalcular indicadores p/ indicators
 
-        msg = "Atualizados: " + ", ".join([f"{t}({n})" for t, n in updated])
-        jobrun_finish(db, jr.id, status="ok", message=msg)
-    except Exception as e:
-        jobrun_finish(db, jr.id, status="error", message=str(e))
-        raise
+def run_daily_indicators(db: Session, tickers: list[str] | None = None, trigger: str = "cli"):
+    with tracked_run(db, "daily_indicators", message=f"tickers={tickers or 'symbols'}", trigger=trigger) as ctx:
+        daily_indicators(db, ctx, tickers)
@@ -1,26 +1,32 @@
 # app/jobs/health_check.py
 from __future__ import annotations
-import time
+import os
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.crud import jobrun_start, jobrun_finish
-import yfinance as yf
+from app.jobs.runs import JobContext, tracked_run
+from app import health
 
-def run_health_check(db: Session):
-    jr = jobrun_start(db, "health_check")
-    try:
-        # DB check
-        t0 = time.time()
-        db.execute(text("SELECT 1"))
-        db_latency_ms = (time.time() - t0) * 1000
+PING_TICKER = os.getenv("HEALTH_PING_TICKER", "AAPL")
 
-        # Yahoo latency
-        t1 = time.time()
-        _ = yf.download("AAPL", period="1d", interval="1d", progress=False, auto_adjust=True)
-        ylat_ms = (time.time() - t1) * 1000
+def health_check(db: Session, ctx: JobContext):
+    """
+    Checagem ativa (rotina agendada, não probe): mesmo snapshot dos endpoints /health/*
+    + um download mínimo do Yahoo pelo circuit breaker.
+    """
+    with ctx.step("db"):
+        snap = health.collect(db.get_bind(), lambda: Session(bind=db.get_bind()))
+        if not snap["db"]["ok"]:
+            raise RuntimeError(f"DB indisponível: {snap['db'].get('error')}")
+    msg = f"DB ok ({snap['db']['latency_ms']:.1f} ms)"
+    if snap["queue"].get("ok"):
+        msg += f"; fila={snap['queue']['queued']}"
+    ctx.note(msg)
 
-        msg = f"DB ok ({db_latency_ms:.1f} ms); Yahoo ok ({ylat_ms:.1f} ms)"
-        jobrun_finish(db, jr.id, status="ok", message=msg)
-    except Exception as e:
-        jobrun_finish(db, jr.id, status="error", message=str(e))
-        raise
+    # Yahoo latency
+    from app.services import yahoo
+    with ctx.step("yahoo"):
+        ylat_ms = yahoo.ping(PING_TICKER)
+    ctx.note(f"Yahoo ok ({ylat_ms:.1f} ms)")
+
+def run_health_check(db: Session, trigger: str = "cli"):
+    with tracked_run(db, "health_check", trigger=trigger) as ctx:
+        health_check(db, ctx)
@@ -0,0 +1,52 @@
+# app/jobs/runs.py
+"""
+Registro de execuções de jobs em `job_runs`: status, duração e tempo por etapa.
+
+    with tracked_run(db, "daily_indicators") as ctx:
+        with ctx.step("fetch:PETR4.SA"):
+            ...
+"""
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from app.crud import jobrun_start, jobrun_finish
+
+
+class JobContext:
+    def __init__(self, db: Session, run_id: int):
+        self.db = db
+        self.run_id = run_id
+        self.steps: list[dict] = []
+        self.notes: list[str] = []
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.steps.append({"name": name, "ms": round((time.perf_counter() - t0) * 1000, 1), "ok": ok})
+
+    def note(self, message: str) -> None:
+        self.notes.append(message)
+
+
+@contextmanager
+def tracked_run(
+    db: Session, job_name: str, message: str | None = None, *, trigger: str | None = None, attempt: int = 1,
+) -> Iterator[JobContext]:
+    jr = jobrun_start(db, job_name, message=message, trigger=trigger, attempt=attempt)
+    ctx = JobContext(db, jr.id)
+    try:
+        yield ctx
+    except Exception as e:
+        db.rollback()
+        jobrun_finish(db, jr.id, status="error", message="; ".join(ctx.notes + [str(e)]), steps=ctx.steps)
+        raise
+    jobrun_finish(db, jr.id, status="ok", message="; ".join(ctx.notes) or None, steps=ctx.steps)
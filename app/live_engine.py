@@ -0,0 +1,308 @@
+# app/live_engine.py
+"""
+Modo live / paper trading incremental.
+
+Reimplementa a lógica das estratégias (SMA Cross, Donchian, Momentum) como máquinas de
+estado serializáveis em JSON: o estado dos indicadores (app.indicators), a posição, o stop
+e a ordem pendente ficam salvos em `strategy_states`, e cada execução processa só as
+barras novas desde `last_bar_date` — O(barras novas) por ticker, sem replay no Backtrader.
+
+Semântica igual à do backtest: o sinal é avaliado no fechamento da barra, a ordem a
+mercado executa na abertura da barra seguinte e o stop passa a valer a partir da barra
+após a execução da compra (gap abaixo do stop executa na abertura).
+"""
+from __future__ import annotations
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Iterable
+
+from app import indicators
+
+
+# ---------------- estratégias ----------------
+class LiveStrategy(ABC):
+    """
+    Base: carteira, ordens pendentes, stop e sizing por risco (mesmas regras das estratégias bt).
+    Os ganchos de indicadores/sinais são abstratos: subclasse incompleta falha ao instanciar
+    (build), não na primeira barra.
+    """
+    strategy_type = ""
+
+    def __init__(self, params: dict, state: dict | None = None, initial_cash: float = 100000.0, commission: float = 0.0):
+        self.p = params
+        s = state or {}
+        self.cash = float(s.get("cash", initial_cash))
+        self.commission = float(s.get("commission", commission))
+        self.position = float(s.get("position", 0.0))
+        self.entry_price = s.get("entry_price")
+        self.stop_price = s.get("stop_price")          # stop ativo
+        self.pending = s.get("pending")                # {"side": "buy"|"sell", "size": ..., "stop": ...}
+        self.bars = int(s.get("bars", 0))
+        self.last_date = s.get("last_date")
+        self.last_close = s.get("last_close")
+        self.realized_pnl = float(s.get("realized_pnl", 0.0))
+        self.closed_trades = int(s.get("closed_trades", 0))
+        self._init_indicators(s.get("ind", {}))
+
+    # -- subclasses --
+    @abstractmethod
+    def _init_indicators(self, ind: dict) -> None:
+        ...
+
+    @abstractmethod
+    def _dump_indicators(self) -> dict:
+        ...
+
+    @abstractmethod
+    def _update_indicators(self, bar: dict) -> None:
+        ...
+
+    @abstractmethod
+    def _ready(self) -> bool:
+        ...
+
+    @abstractmethod
+    def _entry_signal(self, bar: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def _exit_signal(self, bar: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def _alt_stop(self) -> float | None:
+        """Stop quando stop_method != "atr"."""
+
+    # -- risco --
+    def _calc_size_and_stop(self, price: float) -> tuple[int, float | None]:
+        return indicators.size_and_stop(
+            price,
+            stop_method=self.p.get("stop_method", "atr"),
+            atr=self.atr.value,
+            alt_stop=self._alt_stop(),
+            atr_mult=self.p["atr_mult"],
+            risk_pct=self.p["risk_pct"],
+            equity=self.cash + self.position * price,
+            cash=self.cash,
+            lot_size=self.p.get("lot_size", 1),
+        )
+
+    # -- execução --
+    def _fill(self, side: str, size: float, price: float, date: str, reason: str) -> dict:
+        fee = abs(size * price) * self.commission
+        if side == "buy":
+            self.cash -= size * price + fee
+            self.position += size
+            self.entry_price = price
+        else:
+            self.cash += size * price - fee
+            self.realized_pnl += (price - (self.entry_price or price)) * size
+            self.position -= size
+            self.closed_trades += 1
+            self.entry_price = None
+            self.stop_price = None
+        return {"date": date, "event": "fill", "side": side, "size": size, "price": price, "reason": reason}
+
+    def step(self, bar: dict) -> list[dict]:
+        """Processa uma barra {"date","open","high","low","close"}; retorna os eventos gerados."""
+        events: list[dict] = []
+        date = bar["date"]
+        bar = {"date": date, **{k: float(bar[k]) for k in ("open", "high", "low", "close")}}
+
+        # 1) ordens do fechamento anterior executam na abertura; stop ativo é checado na barra
+        stop_armed = self.stop_price is not None and self.position > 0
+        if self.pending:
+            order, self.pending = self.pending, None
+            if order["side"] == "buy":
+                events.append(self._fill("buy", order["size"], bar["open"], date, "entry"))
+                self.stop_price = order.get("stop")      # vale a partir da próxima barra
+            elif self.position > 0:
+                events.append(self._fill("sell", self.position, bar["open"], date, "exit"))
+                stop_armed = False
+        if stop_armed and self.position > 0 and bar["low"] <= self.stop_price:
+            price = min(bar["open"], self.stop_price)
+            events.append(self._fill("sell", self.position, price, date, "stop"))
+
+        # 2) indicadores e 3) decisão no fechamento
+        self._update_indicators(bar)
+        self.bars += 1
+        self.last_date = date
+        self.last_close = bar["close"]
+        if self._ready():
+            if self.position <= 0:
+                if self._entry_signal(bar):
+                    size, stop = self._calc_size_and_stop(bar["close"])
+                    if size > 0 and stop is not None:
+                        self.pending = {"side": "buy", "size": size, "stop": stop}
+                        events.append({"date": date, "event": "signal", "side": "buy", "size": size, "stop": stop})
+            elif self._exit_signal(bar):
+                self.stop_price = None                   # cancela o stop junto com a saída
+                self.pending = {"side": "sell", "size": self.position}
+                events.append({"date": date, "event": "signal", "side": "sell", "size": self.position})
+        return events
+
+    def run(self, bars: Iterable[dict]) -> list[dict]:
+        events: list[dict] = []
+        for bar in bars:
+            if self.last_date is not None and bar["date"] <= self.last_date:
+                continue  # barra já processada
+            events.extend(self.step(bar))
+        return events
+
+    def dump(self) -> dict:
+        return {
+            "cash": self.cash,
+            "commission": self.commission,
+            "position": self.position,
+            "entry_price": self.entry_price,
+            "stop_price": self.stop_price,
+            "pending": self.pending,
+            "bars": self.bars,
+            "last_date": self.last_date,
+            "last_close": self.last_close,
+            "realized_pnl": self.realized_pnl,
+            "closed_trades": self.closed_trades,
+            "ind": self._dump_indicators(),
+        }
+
+    def summary(self) -> dict:
+        equity = self.cash + self.position * (self.last_close or 0.0)
+        return {
+            "last_date": self.last_date,
+            "bars": self.bars,
+            "position": self.position,
+            "cash": round(self.cash, 2),
+            "equity": round(equity, 2),
+            "stop_price": self.stop_price,
+            "pending_order": self.pending,
+            "realized_pnl": round(self.realized_pnl, 2),
+            "closed_trades": self.closed_trades,
+        }
+
+
+class LiveSmaCross(LiveStrategy):
+    strategy_type = "sma_cross"
+
+    def _init_indicators(self, ind: dict) -> None:
+        self.fast = indicators.Sma(int(self.p["fast"]), ind.get("fast"))
+        self.slow = indicators.Sma(int(self.p["slow"]), ind.get("slow"))
+        self.atr = indicators.WilderAtr(int(self.p["atr_period"]), ind.get("atr"))
+        self.prev_sign = ind.get("prev_sign")   # último sinal não nulo de fast - slow
+        self.cross = ind.get("cross", 0)
+
+    def _dump_indicators(self) -> dict:
+        return {"fast": self.fast.dump(), "slow": self.slow.dump(), "atr": self.atr.dump(),
+                "prev_sign": self.prev_sign, "cross": self.cross}
+
+    def _update_indicators(self, bar: dict) -> None:
+        f, s = self.fast.update(bar["close"]), self.slow.update(bar["close"])
+        self.atr.update(bar["high"], bar["low"], bar["close"])
+        self.cross = 0
+        if math.isnan(f) or math.isnan(s):
+            return
+        diff = f - s
+        sign = 1 if diff > 0 else (-1 if diff < 0 else 0)
+        if sign and self.prev_sign is not None and sign != self.prev_sign:
+            self.cross = sign
+        if sign:
+            self.prev_sign = sign
+        elif self.prev_sign is None:
+            self.prev_sign = 0
+
+    def _ready(self) -> bool:
+        return not (math.isnan(self.slow.value) or math.isnan(self.fast.value))
+
+    def _entry_signal(self, bar: dict) -> bool:
+        return self.cross > 0
+
+    def _exit_signal(self, bar: dict) -> bool:
+        return self.cross < 0
+
+    def _alt_stop(self) -> float | None:
+        return self.slow.value
+
+
+class LiveDonchian(LiveStrategy):
+    strategy_type = "donchian"
+
+    def _init_indicators(self, ind: dict) -> None:
+        n = int(self.p["n"])
+        self.high = indicators.Highest(n, ind.get("high"))
+        self.low = indicators.Lowest(n, ind.get("low"))
+        self.atr = indicators.WilderAtr(int(self.p["atr_period"]), ind.get("atr"))
+        self.prev_high = ind.get("prev_high")   # banda superior da barra anterior
+
+    def _dump_indicators(self) -> dict:
+        return {"high": self.high.dump(), "low": self.low.dump(), "atr": self.atr.dump(),
+                "prev_high": self.prev_high}
+
+    def _update_indicators(self, bar: dict) -> None:
+        cur = self.high.value
+        self.prev_high = None if math.isnan(cur) else cur
+        self.high.update(bar["high"])
+        self.low.update(bar["low"])
+        self.atr.update(bar["high"], bar["low"], bar["close"])
+
+    def _ready(self) -> bool:
+        return not (math.isnan(self.high.value) or math.isnan(self.low.value))
+
+    def _entry_signal(self, bar: dict) -> bool:
+        confirm = self.p.get("confirm_break", True) and self.bars > int(self.p["n"])
+        ref = self.prev_high if confirm and self.prev_high is not None else self.high.value
+        return bar["close"] > ref
+
+    def _exit_signal(self, bar: dict) -> bool:
+        return bar["close"] < self.low.value
+
+    def _alt_stop(self) -> float | None:
+        return self.low.value
+
+
+class LiveMomentum(LiveStrategy):
+    strategy_type = "momentum"
+
+    def _init_indicators(self, ind: dict) -> None:
+        self.mom = indicators.Momentum(int(self.p["lookback"]), ind.get("mom"))
+        self.atr = indicators.WilderAtr(int(self.p["atr_period"]), ind.get("atr"))
+        self.ma = indicators.Sma(int(self.p["ma_period"]), ind.get("ma"))
+
+    def _dump_indicators(self) -> dict:
+        return {"mom": self.mom.dump(), "atr": self.atr.dump(), "ma": self.ma.dump()}
+
+    def _update_indicators(self, bar: dict) -> None:
+        self.mom.update(bar["close"])
+        self.atr.update(bar["high"], bar["low"], bar["close"])
+        self.ma.update(bar["close"])
+
+    def _ready(self) -> bool:
+        return not math.isnan(self.mom.value)
+
+    def _entry_signal(self, bar: dict) -> bool:
+        return self.bars > int(self.p["lookback"]) and self.mom.value > float(self.p["thresh"])
+
+    def _exit_signal(self, bar: dict) -> bool:
+        return self.mom.value <= 0.0
+
+    def _alt_stop(self) -> float | None:
+        return self.ma.value
+
+
+LIVE_STRATEGIES: dict[str, type[LiveStrategy]] = {
+    cls.strategy_type: cls for cls in (LiveSmaCross, LiveDonchian, LiveMomentum)
+}
+
+
+def build(strategy_type: str, params: dict, state: dict | None = None, **kwargs: Any) -> LiveStrategy:
+    try:
+        cls = LIVE_STRATEGIES[strategy_type]
+    except KeyError:
+        raise ValueError(f"Estratégia sem modo live: {strategy_type}")
+    return cls(params, state, **kwargs)
+
+
+def bars_from_columns(cols: dict[str, list]) -> list[dict]:
+    """Colunas de get_price_columns -> barras com data ISO (chave de ordenação no estado)."""
+    return [
+        {"date": d.strftime("%Y-%m-%d"), "open": o, "high": h, "low": l, "close": c}
+        for d, o, h, l, c in zip(cols["date"], cols["open"], cols["high"], cols["low"], cols["close"])
+    ]
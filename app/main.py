@@ -1,63 +1,123 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
+# Mantenha este módulo leve: pandas/numpy, backtrader, yfinance, matplotlib e pyarrow
+# são importados dentro dos handlers que os usam (ver bin/check_startup.py).
+import json
+import os
+import secrets
+from datetime import date, datetime, timedelta
+from itertools import islice
+import anyio
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from app.db import engine, Base, get_db, init_dev_db
-from app import schemas, crud, models
+from app.db import engine, Base, get_db, get_read_db, ReadSession, init_dev_db, IS_DEV
+from app import schemas, crud, models, http_cache, serialization, admission, metrics, health, scheduler, timeframes, sql_stats
 from app.strategies import REGISTRY, validate_and_normalize_params
-from app.services.yahoo import fetch_prices
-from app.crud_prices import ensure_symbol, bulk_upsert_prices
-from app.backtest_engine import run_backtest as bt_run
+from app.crud_prices import ensure_symbol, bulk_upsert_prices, get_close_series, get_price_columns
+from app.cache import LRUCache
 from app.ui import router as ui_router
-from app.jobs.daily_indicators import run_daily_indicators
-from app.jobs.health_check import run_health_check
 
-from app.models import (
-    Symbol, Price, Indicator, Backtest, Trade, DailyPosition, Metric, JobRun
-)
-from app.crud import (
-    create_backtest_record, set_backtest_status,
-    save_metrics, save_trades, save_daily_positions, get_results
-)
-
-# só depois de importar os modelos, crie as tabelas
-Base.metadata.create_all(bind=engine)
+from app.crud import create_backtest_record, set_backtest_status
 
 app = FastAPI(title="Trading Algorítmico API - Estrutura")
 
+# statements/tempo de banco por requisição (headers X-DB-* em dev ou com SQL_STATS_HEADERS=1)
+sql_stats.install()
+app.add_middleware(sql_stats.SQLStatsMiddleware,
+                   headers=os.getenv("SQL_STATS_HEADERS", "1" if IS_DEV else "0") == "1")
+
 @app.on_event("startup")
 def on_startup():
-    init_dev_db()
-    from app.models import (
-        Symbol, Price, Indicator, Backtest, Trade, DailyPosition, Metric, JobRun
-    )
-    Base.metadata.create_all(bind=engine)
+    # schema criado uma única vez, no startup (fora do caminho de importação)
+    if IS_DEV:
+        init_dev_db()
+    else:
+        Base.metadata.create_all(bind=engine)
+    health.get_probe().start()
+    if scheduler.enabled():
+        scheduler.get_scheduler().start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    health.get_probe().stop()
+    scheduler.get_scheduler().stop()
 
 # -- data visualization -- 
 app.include_router(ui_router) # http://127.0.0.1:8000/ui/backtests/<ID>
 
 # -------------- HEALTH --------------
+# Todos leem o snapshot da thread de probe (app/health.py): nenhum faz I/O por requisição.
+@app.get("/health/live")
+async def health_live():
+    """Liveness: o processo responde. Sem I/O."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: último probe do banco ok e recente; 503 caso contrário."""
+    probe = health.get_probe()
+    snap, age = probe.snapshot()
+    body = {
+        "status": "ready" if probe.ready() else "not_ready",
+        "db": snap["db"] if snap else None,
+        "pool": snap["pool"] if snap else None,
+        "age_seconds": round(age, 1) if age is not None else None,
+    }
+    return JSONResponse(body, status_code=200 if body["status"] == "ready" else 503)
+
+@app.get("/health/deep")
+async def health_deep():
+    """Último snapshot completo: latência do DB, pool, fila de backtests e market data."""
+    snap, age = health.get_probe().snapshot()
+    if snap is None:
+        return JSONResponse({"status": "pending", "detail": "Nenhum probe concluído ainda"}, status_code=503)
+    return {**snap, "age_seconds": round(age, 1)}
+
 @app.get("/health", response_model=schemas.HealthResponse)
-def health(db: Session = Depends(get_db)):
-    # Checagem simples de conexão com o DB
-    try:
-        db.execute("(SELECT 1)")
-        return schemas.HealthResponse(status="ok", db="connected")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def health_summary():
+    # compatível com o formato antigo, mas servido do snapshot
+    probe = health.get_probe()
+    snap, _ = probe.snapshot()
+    if not probe.ready():
+        raise HTTPException(status_code=503, detail=(snap or {}).get("db", {}).get("error") or "not ready")
+    return schemas.HealthResponse(status="ok", db="connected", market_data=snap["market_data"]["circuit"])
+
+
+# -------------- METRICS --------------
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE)
 
 
 # -- BACKTEST RUN --
 
+# operações administrativas (profiling) exigem o header X-Admin-Token; sem ADMIN_TOKEN ficam desligadas
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    if not ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Operação restrita a administradores (X-Admin-Token)")
+
 @app.post("/backtests/run", response_model=schemas.RunBacktestResponse)
-def run_backtest(req: schemas.RunBacktestRequest, db: Session = Depends(get_db)):
+async def run_backtest(
+    req: schemas.RunBacktestRequest,
+    db: Session = Depends(get_db),
+    x_admin_token: str | None = Header(default=None),
+):
+    if req.profile:
+        require_admin(x_admin_token)
+    # roda no limiter próprio de backtests (429 + Retry-After com a fila cheia)
+    return await admission.BACKTEST.run(_run_backtest_sync, req, db)
+
+def _create_backtest(req: schemas.RunBacktestRequest, db: Session) -> models.Backtest:
     # valida e normaliza parâmetros da estratégia (se você estiver usando o registry)
     try:
         normalized_params = validate_and_normalize_params(req.strategy_type, req.strategy_params)
+        timeframe = timeframes.normalize(req.timeframe)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # cria o registro do backtest com status "running"
-    bt = create_backtest_record(
+    return create_backtest_record(
         db,
         ticker=req.ticker,
         start_date=req.start_date,
@@ -66,66 +126,262 @@ def run_backtest(req: schemas.RunBacktestRequest, db: Session = Depends(get_db))
         strategy_params=normalized_params,
         initial_cash=req.initial_cash,
         commission=req.commission,
-        timeframe=req.timeframe,
+        timeframe=timeframe,
+        profile_requested=req.profile,
     )
+
+def _run_backtest_sync(req: schemas.RunBacktestRequest, db: Session):
+    # cria o registro do backtest com status "running"
+    bt = _create_backtest(req, db)
     set_backtest_status(db, bt.id, "running")
 
     # roda, persiste e finaliza
+    from app.jobs.backtest_worker import execute_backtest
     try:
-        result = bt_run(
-            req.ticker, req.start_date, req.end_date,
-            req.strategy_type, normalized_params,
-            req.initial_cash, req.commission
-        )
-        save_metrics(db, bt.id, result["metrics"])
-        save_trades(db, bt.id, result["trades"])
-        save_daily_positions(db, bt.id, result["daily_positions"])
+        if req.profile:
+            from app import profiling
+            result, artifact = profiling.profile_call(execute_backtest, db, bt, profiled=True)
+            crud.save_backtest_profile(db, bt.id, artifact)
+        else:
+            result = execute_backtest(db, bt)
         set_backtest_status(db, bt.id, "finished")
-        return schemas.RunBacktestResponse(id=bt.id, status="finished")
+        src = result.get("data_source") or {}
+        return schemas.RunBacktestResponse(
+            id=bt.id, status="finished", data_source=src.get("source"), stale=src.get("stale"),
+            profile_url=f"/backtests/{bt.id}/profile" if req.profile else None,
+        )
 
     except KeyError as ke:
+        db.rollback()
         set_backtest_status(db, bt.id, "error")
         raise HTTPException(status_code=400, detail=f"Coluna ausente no DataFrame: {ke}. Verifique o pré-processamento do fetch_prices.")
     except Exception as e:
+        db.rollback()
         set_backtest_status(db, bt.id, "error")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/backtests/enqueue", response_model=schemas.RunBacktestResponse, status_code=202)
+def enqueue_backtest(
+    req: schemas.RunBacktestRequest,
+    db: Session = Depends(get_db),
+    x_admin_token: str | None = Header(default=None),
+):
+    """
+    Enfileira o backtest (status "queued") para os workers (bin/run_backtest_worker.py).
+    Acompanhe por GET /backtests?status=... ou GET /backtests/{id}/results.
+    Com profile=true (admin), o worker que pegar o backtest roda com profiling.
+    """
+    if req.profile:
+        require_admin(x_admin_token)
+    bt = _create_backtest(req, db)
+    set_backtest_status(db, bt.id, "queued")
+    return schemas.RunBacktestResponse(
+        id=bt.id, status="queued", profile_url=f"/backtests/{bt.id}/profile" if req.profile else None,
+    )
+
 
 
 # -- RESULTADOS BACKTEST -- 
-@app.get("/backtests/{backtest_id}/results", response_model=schemas.BacktestResults)
-def get_backtest_results(backtest_id: int, db: Session = Depends(get_db)):
-    res = get_results(db, backtest_id)
-    if not res:
+# sem response_model: o corpo já sai serializado e ?layout=columnar tem outro formato
+@app.get("/backtests/{backtest_id}/results", responses={200: {"model": schemas.BacktestResultsResponse}})
+async def get_backtest_results(
+    backtest_id: int,
+    request: Request,
+    layout: str = Query(default="rows", pattern="^(rows|columnar)$",
+                        description="rows (padrão) ou columnar: {\"date\": [...], \"equity\": [...]}"),
+    rdb: ReadSession = Depends(get_read_db),
+):
+    """
+    Resultados completos. Serializados direto das colunas do banco (orjson), sem
+    validação Pydantic por linha. Backtests finalizados são imutáveis: o corpo fica
+    em cache, com ETag forte (304 em If-None-Match) e compressão gzip/br.
+    Leitura pela engine assíncrona (ver app.db.get_read_db); montagem do payload,
+    orjson e compressão rodam numa thread, para um backtest grande não travar o loop.
+    No loop fica só o fetch via run_sync, que traz tuplas de colunas (sem objetos ORM).
+    """
+    def _encode(cols: dict) -> bytes:
+        return serialization.dumps(serialization.results_payload(cols, layout))
+
+    async def _build():
+        cols = await rdb.run(crud.get_results_columns, backtest_id)
+        if not cols:
+            raise HTTPException(status_code=404, detail="Backtest não encontrado")
+        body = await anyio.to_thread.run_sync(_encode, cols)
+        return body, cols["status"] == "finished"
+
+    return await http_cache.cached_response_async(request, ("results", backtest_id, layout), _build)
+
+def _parse_csv_param(raw: str | None, allowed: tuple[str, ...], name: str) -> tuple[str, ...]:
+    if not raw:
+        return allowed
+    items = tuple(dict.fromkeys(x.strip() for x in raw.split(",") if x.strip()))
+    unknown = [x for x in items if x not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"{name} inválido(s): {unknown}. Permitidos: {list(allowed)}")
+    return items
+
+@app.get("/backtests/{backtest_id}/results/stream")
+def stream_backtest_results(
+    backtest_id: int,
+    date_from: date | None = Query(default=None, alias="from"),
+    date_to: date | None = Query(default=None, alias="to"),
+    fields: str | None = Query(default=None, description="Colunas diárias: position_size,cash,equity,drawdown"),
+    include: str | None = Query(default=None, description="Seções: metrics,trades,daily"),
+    db: Session = Depends(get_db),
+):
+    """
+    Resultados em NDJSON (uma linha JSON por registro), lidos do cursor do banco
+    conforme o cliente consome: memória do servidor constante para backtests longos.
+    """
+    if not crud.get_backtest(db, backtest_id):
+        raise HTTPException(status_code=404, detail="Backtest não encontrado")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' deve ser anterior ou igual a 'to'")
+    field_list = _parse_csv_param(fields, crud.RESULT_STREAM_FIELDS, "fields")
+    sections = _parse_csv_param(include, crud.RESULT_STREAM_SECTIONS, "include")
+
+    rows = crud.iter_results_rows(
+        db, backtest_id,
+        date_from=date_from, date_to=date_to,
+        fields=field_list, sections=sections,
+    )
+
+    def _lines():
+        # agrupa linhas em blocos para não emitir um chunk HTTP por registro
+        while True:
+            chunk = list(islice(rows, 500))
+            if not chunk:
+                break
+            yield "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in chunk)
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+# -- ANALYTICS ROLANTES --
+@app.get("/backtests/{backtest_id}/rolling", response_model=schemas.RollingResults)
+def get_backtest_rolling(
+    backtest_id: int,
+    window: int = Query(default=63, ge=2, le=2520),
+    max_points: int = Query(default=1000, ge=10, le=10000),
+    db: Session = Depends(get_db),
+):
+    """
+    Sharpe, volatilidade e drawdown rolantes sobre a equity salva, anualizados pelo timeframe do backtest.
+    A série é reduzida para no máximo `max_points` pontos (uso em gráficos).
+    """
+    from app import analytics
+    from app.backtest_engine import _stamp
+    bt = crud.get_backtest(db, backtest_id)
+    if not bt:
         raise HTTPException(status_code=404, detail="Backtest não encontrado")
 
-    return schemas.BacktestResults(
+    tf = bt.timeframe or "1d"
+    dates, equity = crud.get_equity_series(db, backtest_id)
+    series = analytics.rolling_metrics(equity, window, timeframes.periods_per_year(tf, dates))
+    idx = analytics.downsample_indices(len(dates), max_points)
+    sharpe = analytics.nan_to_none(series["sharpe"][idx])
+    vol = analytics.nan_to_none(series["volatility"][idx])
+    dd = analytics.nan_to_none(series["drawdown"][idx])
+    intraday = timeframes.is_intraday(tf)
+
+    return schemas.RollingResults(
+        backtest_id=backtest_id,
+        window=window,
+        total_points=len(dates),
+        points=[
+            schemas.RollingPoint(date=_stamp(dates[i], intraday), sharpe=sharpe[k], volatility=vol[k], drawdown=dd[k])
+            for k, i in enumerate(idx)
+        ],
+    )
+
+# -- SÉRIES PARA GRÁFICOS (LTTB) --
+_series_cache = LRUCache(maxsize=512)  # (backtest_id, points) -> ChartSeries
+
+@app.get("/backtests/{backtest_id}/series", response_model=schemas.ChartSeries)
+def get_backtest_series(
+    backtest_id: int,
+    points: int = Query(default=1000, ge=3, le=5000),
+    db: Session = Depends(get_db),
+):
+    """
+    Equity, drawdown e preço reduzidos por LTTB para `points` pontos por curva.
+    Backtests finalizados não mudam, então o resultado fica em cache por (id, points).
+    """
+    key = (backtest_id, points)
+    cached = _series_cache.get(key)
+    if cached is not None:
+        return cached
+
+    bt = crud.get_backtest(db, backtest_id)
+    if not bt:
+        raise HTTPException(status_code=404, detail="Backtest não encontrado")
+
+    from app import analytics
+    from app.backtest_engine import _stamp
+
+    intraday = timeframes.is_intraday(bt.timeframe or "1d")
+    dates, equity, drawdown = crud.get_equity_drawdown_series(db, backtest_id)
+    if intraday:
+        from app.services import market_data
+        pdf = market_data.load_local_intraday(
+            db, bt.ticker, bt.start_date.date().isoformat(), bt.end_date.date().isoformat(), bt.timeframe,
+        )
+        pdates, closes = list(pdf["date"].dt.to_pydatetime()), pdf["close"].astype(float).tolist()
+    else:
+        pdates, closes = get_close_series(db, bt.ticker, bt.start_date, bt.end_date)
+
+    def _pts(ds, vs):
+        return [schemas.SeriesPoint(date=_stamp(d, intraday), value=v) for d, v in analytics.lttb_series(ds, vs, points)]
+
+    out = schemas.ChartSeries(
         backtest_id=backtest_id,
-        metrics=res["metrics"],
-        trades=res["trades"],
-        daily_positions=res["daily_positions"],
-        equity_curve=res["equity_curve"],
+        points=points,
+        total_points=len(dates),
+        equity=_pts(dates, equity),
+        drawdown=_pts(dates, drawdown),
+        price=_pts(pdates, closes),
     )
+    if bt.status == "finished":
+        _series_cache.set(key, out)
+    return out
 
 #-- LIST BACKTEST -- 
 @app.get("/backtests")
-def list_backtests(
+async def list_backtests(
+    response: Response,
     ticker: str | None = Query(default=None),
     strategy_type: str | None = Query(default=None),
+    status: str | None = Query(default=None),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="Valor de X-Next-Cursor da página anterior"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
+    rdb: ReadSession = Depends(get_read_db),
 ):
     """
-    Lista backtests com filtros e paginação.
+    Lista backtests com filtros e paginação, já com o resumo da última métrica.
+    Use `cursor` (keyset em created_at/id) para paginar; o próximo cursor vem no header X-Next-Cursor.
+    Leitura pela engine assíncrona (ver app.db.get_read_db).
     """
-    rows = crud.list_backtests(
-        db,
+    try:
+        keyset = crud.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = await rdb.run(
+        crud.list_backtests,
         ticker=ticker,
         strategy_type=strategy_type,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=keyset,
         limit=limit,
         offset=offset,
     )
+    if len(rows) == limit:
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = crud.encode_cursor(last.created_at, last.id)
     return [
         {
             "id": r.id,
@@ -133,30 +389,188 @@ def list_backtests(
             "ticker": r.ticker,
             "strategy_type": r.strategy_type,
             "status": r.status,
+            "metrics": {
+                "total_return": m.total_return,
+                "sharpe": m.sharpe,
+                "max_drawdown": m.max_drawdown,
+                "win_rate": m.win_rate,
+                "avg_trade_return": m.avg_trade_return,
+            } if m else None,
         }
-        for r in rows
+        for r, m in rows
     ]
 
 
-# -- UPDATE INDICATORS -- 
-@app.post("/data/indicators/update")
-def update_indicators(req: schemas.UpdateIndicatorsRequest):
+# -- EXPORT (PARQUET / ARROW) --
+def _require_export():
+    from app import export
+    if not export.available():
+        raise HTTPException(status_code=501, detail="Export indisponível: instale o pacote 'pyarrow'.")
+    return export
+
+@app.get("/backtests/export")
+def export_backtests_bulk(
+    ids: str | None = Query(default=None, description="Lista de ids separados por vírgula"),
+    ticker: str | None = Query(default=None),
+    strategy_type: str | None = Query(default=None),
+    status: str | None = Query(default="finished"),
+    limit: int = Query(default=1000, ge=1, le=100_000),
+    db: Session = Depends(get_db),
+):
+    """
+    Curvas diárias de vários backtests em um único Arrow IPC stream (um record batch por
+    backtest), lidas de uma só query com cursor no servidor.
+    """
+    export = _require_export()
+    if ids:
+        try:
+            bt_ids = [int(x) for x in ids.split(",") if x.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros")
+    else:
+        rows = crud.list_backtests(db, ticker=ticker, strategy_type=strategy_type, status=status, limit=limit)
+        bt_ids = [bt.id for bt, _ in rows]
+
+    schema = export.schema_for(("backtest_id", "date") + crud.RESULT_STREAM_FIELDS)
+    return StreamingResponse(
+        export.iter_arrow_stream(schema, crud.iter_daily_columns(db, bt_ids)),
+        media_type=export.MEDIA_TYPES["arrow_stream"],
+        headers={"Content-Disposition": 'attachment; filename="backtests.arrows"'},
+    )
+
+@app.get("/backtests/{backtest_id}/export")
+def export_backtest(
+    backtest_id: int,
+    request: Request,
+    format: str = Query(default="parquet", pattern="^(parquet|arrow)$"),
+    table: str = Query(default="daily", pattern="^(daily|trades)$"),
+    db: Session = Depends(get_db),
+):
+    """Posições diárias (ou trades) de um backtest em Parquet ou Arrow IPC (arquivo)."""
+    export = _require_export()
+
+    def _build():
+        cols = crud.get_results_columns(db, backtest_id)
+        if not cols:
+            raise HTTPException(status_code=404, detail="Backtest não encontrado")
+        data = cols["daily_positions"] if table == "daily" else cols["trades"]
+        body = export.table_to_bytes(export.table_from_columns(data), format)
+        return body, cols["status"] == "finished"
+
+    resp = http_cache.cached_response(
+        request, ("export", backtest_id, table, format), _build,
+        media_type=export.MEDIA_TYPES[format],
+        compress=(format != "parquet"),  # parquet já sai comprimido (zstd)
+    )
+    resp.headers["Content-Disposition"] = (
+        f'attachment; filename="backtest_{backtest_id}_{table}.{export.EXTENSIONS[format]}"'
+    )
+    return resp
+
+@app.get("/backtests/{backtest_id}/profile", dependencies=[Depends(require_admin)])
+def get_backtest_profile(
+    backtest_id: int,
+    format: str = Query(default="json", pattern="^(json|pstats)$"),
+    db: Session = Depends(get_db),
+):
     """
-    Só estrutura por enquanto. 
-    #TODO - Fazer implementação no futuro
+    Artefato de profiling (admin): JSON com árvore de chamadas, maiores alocações e pico de
+    memória, ou o dump do pstats (`python -m pstats backtest_1.pstats`, snakeviz).
     """
+    prof = crud.get_backtest_profile(db, backtest_id)
+    if prof is None:
+        raise HTTPException(status_code=404, detail="Backtest sem profiling (rode com profile=true)")
+    if format == "pstats":
+        return Response(
+            content=prof.pstats, media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="backtest_{backtest_id}.pstats"'},
+        )
+    from app import profiling
     return {
-        "status": "accepted",
-        "ticker": req.ticker,
-        "start_date": req.start_date,
-        "end_date": req.end_date,
-        "message": "Atualização agendada (stub).",
+        "backtest_id": backtest_id,
+        "created_at": prof.created_at.isoformat(),
+        **profiling.load_summary(prof.summary),
     }
 
+@app.get("/prices/{ticker}/export")
+def export_prices(
+    ticker: str,
+    format: str = Query(default="parquet", pattern="^(parquet|arrow)$"),
+    start: datetime | None = Query(default=None),
+    end: datetime | None = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    """OHLCV armazenado do ticker em Parquet ou Arrow IPC."""
+    export = _require_export()
+    cols = get_price_columns(db, ticker, start, end)
+    if cols is None:
+        raise HTTPException(status_code=404, detail="Ticker não encontrado")
+    body = export.table_to_bytes(export.table_from_columns(cols), format)
+    return Response(
+        content=body,
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{ticker}.{export.EXTENSIONS[format]}"'},
+    )
+
+# -- LEADERBOARD --
+@app.get("/leaderboard", response_model=list[schemas.LeaderboardItem])
+def leaderboard(
+    metric: str = Query(default="sharpe"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    strategy_type: str | None = Query(default=None),
+    ticker: str | None = Query(default=None),
+    exchange: str | None = Query(default=None, description="Ex.: B3"),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
+    start_date_from: datetime | None = Query(default=None),
+    end_date_to: datetime | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Top-N backtests por métrica (ex.: top 20 Sharpe de momentum na B3 no último trimestre),
+    lido da tabela de resumo em uma única query.
+    """
+    try:
+        rows = crud.list_leaderboard(
+            db,
+            metric=metric,
+            descending=(order == "desc"),
+            limit=limit,
+            strategy_type=strategy_type,
+            ticker=ticker,
+            exchange=exchange,
+            created_from=created_from,
+            created_to=created_to,
+            start_date_from=start_date_from,
+            end_date_to=end_date_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [
+        schemas.LeaderboardItem(
+            rank=i,
+            backtest_id=r.backtest_id,
+            created_at=r.created_at.isoformat(),
+            ticker=r.ticker,
+            exchange=r.exchange,
+            strategy_type=r.strategy_type,
+            timeframe=r.timeframe,
+            start_date=r.start_date.date().isoformat(),
+            end_date=r.end_date.date().isoformat(),
+            params={k: getattr(r, k) for k in crud.SUMMARY_PARAM_KEYS if getattr(r, k) is not None},
+            metrics=schemas.ResultMetrics(**{
+                k: getattr(r, k) for k in crud.SUMMARY_METRIC_KEYS if getattr(r, k) is not None
+            }),
+        )
+        for i, r in enumerate(rows, start=1)
+    ]
+
 #endpoint para listar as estratégias
 
 @app.get("/strategies")
-def list_strategies():
+async def list_strategies():
+    # leitura leve: roda no event loop, sem disputar threads com endpoints pesados
     return [
         {
             "type": key,
@@ -167,30 +581,301 @@ def list_strategies():
         for key, meta in REGISTRY.items()
     ]
 
+# -- TELEMETRIA DE EXECUÇÃO (ver app/telemetry.py) --
+@app.get("/stats/performance", response_model=list[schemas.PerformanceStatsItem])
+def performance_stats(
+    bucket: str = Query(default="day", pattern="^(day|week|month|all)$"),
+    strategy_type: str | None = Query(default=None),
+    engine: str | None = Query(default=None, description="Ex.: backtrader"),
+    created_from: datetime | None = Query(default=None, description="Padrão: últimos 30 dias"),
+    created_to: datetime | None = Query(default=None),
+    include_profiled: bool = Query(default=False, description="Inclui execuções com profiling (tempos inflados)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Barras/s e latência p50/p95 por strategy_type e engine ao longo do tempo (planejamento
+    de capacidade; regressões aparecem como queda de barras/s entre períodos).
+    """
+    if created_from is None:
+        created_from = datetime.utcnow() - timedelta(days=30)
+    return crud.performance_stats(
+        db, bucket=bucket, strategy_type=strategy_type, engine=engine,
+        created_from=created_from, created_to=created_to, include_profiled=include_profiled,
+    )
+
+# -- PORTFÓLIO: momentum cross-sectional (ver app/cross_sectional.py) --
+@app.post("/portfolio/momentum", response_model=schemas.MomentumRotationResponse)
+async def run_momentum_rotation(req: schemas.MomentumRotationRequest, db: Session = Depends(get_db)):
+    """
+    Rotação por momentum sobre todo o universo de `symbols` (ou `tickers`): ranking pelo
+    retorno de lookback, top-K com pesos iguais, rebalanceado em `rebalance`. Usa só os
+    preços armazenados; o resultado vira um backtest (ticker "UNIVERSE", strategy_type
+    "xs_momentum") consultável em /backtests/{id}/results.
+    """
+    return await admission.BACKTEST.run(_run_momentum_rotation_sync, req, db)
+
+def _run_momentum_rotation_sync(req: schemas.MomentumRotationRequest, db: Session):
+    import numpy as np
+    from datetime import timedelta
+    from app import cross_sectional
+    from app.crud_prices import get_close_matrix
+
+    from app.telemetry import RunTelemetry
+
+    start, end = datetime.fromisoformat(req.start_date), datetime.fromisoformat(req.end_date)
+    # histórico antes do início para o primeiro ranking (~1,5 dia corrido por pregão)
+    history = timedelta(days=int(req.lookback * 1.5) + 10)
+    with RunTelemetry("xs_momentum", engine=cross_sectional.ENGINE, timeframe="1d") as tel:
+        with tel.phase("fetch"):
+            dates, tickers, close = get_close_matrix(db, start - history, end, req.tickers)
+        if not tickers:
+            raise HTTPException(status_code=400, detail="Sem preços armazenados para o universo/período")
+        params = req.model_dump(include={"lookback", "skip", "top_k", "rebalance", "tickers"})
+        try:
+            with tel.phase("simulate"):
+                result = cross_sectional.momentum_rotation(
+                    dates, tickers, close,
+                    lookback=req.lookback, skip=req.skip, top_k=req.top_k, rebalance=req.rebalance,
+                    commission=req.commission, initial_cash=req.initial_cash, start=np.datetime64(start.date()),
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        tel.bars = int(close.size)   # pregões x tickers
+        with tel.phase("persist"):
+            bt = create_backtest_record(
+                db, ticker="UNIVERSE", start_date=req.start_date, end_date=req.end_date,
+                strategy_type="xs_momentum", strategy_params=params,
+                initial_cash=req.initial_cash, commission=req.commission, timeframe="1d",
+            )
+            crud.save_metrics(db, bt.id, result["metrics"])
+            crud.save_daily_positions(db, bt.id, result["daily_positions"])
+    crud.save_backtest_telemetry(db, bt.id, tel.record())
+    set_backtest_status(db, bt.id, "finished")
+    return schemas.MomentumRotationResponse(
+        id=bt.id, status="finished", metrics=result["metrics"],
+        **{k: result[k] for k in ("n_tickers", "rebalances", "avg_turnover", "last_rebalance", "holdings")},
+    )
+
+# -- SCREENER: sinal da última barra para o universo (ver app/screener.py) --
+@app.get("/screener")
+async def run_screener(
+    strategy: str = Query(..., description="Estratégia do REGISTRY"),
+    params: str | None = Query(default=None, description='JSON sobre os padrões, ex.: {"n": 55}'),
+    backtest_id: int | None = Query(default=None, description="Usa os parâmetros salvos deste backtest"),
+    tickers: str | None = Query(default=None, description="Lista separada por vírgula (padrão: todo o universo)"),
+    signal: str | None = Query(default=None, pattern="^(entry|exit|any)$", description="Filtra os resultados"),
+    db: Session = Depends(get_db),
+):
+    """
+    Quais símbolos disparam entrada/saída na última barra armazenada, com os parâmetros
+    padrão da estratégia, os de um backtest salvo (`backtest_id`) ou `params`. Avaliação
+    vetorizada sobre o universo inteiro; o resultado fica em cache até chegarem barras novas.
+    """
+    if strategy not in REGISTRY:
+        raise HTTPException(status_code=400, detail=f"Estratégia desconhecida: {strategy}")
+    raw: dict = {}
+    if backtest_id is not None:
+        bt = crud.get_backtest(db, backtest_id)
+        if not bt:
+            raise HTTPException(status_code=404, detail="Backtest not found")
+        if bt.strategy_type != strategy:
+            raise HTTPException(status_code=400, detail=f"Backtest {backtest_id} é de {bt.strategy_type}")
+        raw.update(json.loads(bt.strategy_params_json or "{}"))
+    if params:
+        try:
+            raw.update(json.loads(params))
+        except (ValueError, TypeError, AttributeError):
+            raise HTTPException(status_code=400, detail="params deve ser um objeto JSON")
+    try:
+        normalized = validate_and_normalize_params(strategy, raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    universe = [t.strip() for t in tickers.split(",") if t.strip()] if tickers else None
+    return await admission.DATA.run(_run_screener_sync, strategy, normalized, universe, signal, db)
+
+def _run_screener_sync(strategy: str, params: dict, tickers: list[str] | None, signal: str | None, db: Session):
+    from app import screener
+    out = screener.screen(db, strategy, params, tickers)
+    if signal:
+        out["results"] = [r for r in out["results"] if r["signal"] and signal in ("any", r["signal"])]
+    return out
+
+# -- UPDATE INDICATORS --
 @app.post("/data/indicators/update")
-def update_indicators(req: schemas.UpdateIndicatorsRequest, db: Session = Depends(get_db)):
+async def update_indicators(req: schemas.UpdateIndicatorsRequest, db: Session = Depends(get_db)):
+    return await admission.DATA.run(_update_indicators_sync, req, db)
+
+def _update_indicators_sync(req: schemas.UpdateIndicatorsRequest, db: Session):
+    from app.services.resilience import CircuitOpenError
     try:
+        timeframe = timeframes.normalize(req.timeframe)
+        if timeframe in timeframes.RESAMPLED:
+            raise ValueError(f"{timeframe} é reamostrado dos preços diários: atualize com timeframe 1d")
+        from app.services.yahoo import fetch_prices
+        from app.crud_prices import upsert_intraday_bars
         symbol = ensure_symbol(db, req.ticker)
-        df = fetch_prices(req.ticker, req.start_date, req.end_date)
-        bulk_upsert_prices(db, symbol.id, df)
+        if timeframe == "1d":
+            df = fetch_prices(req.ticker, req.start_date, req.end_date)
+            bulk_upsert_prices(db, symbol.id, df)
+        else:
+            df = fetch_prices(req.ticker, req.start_date, req.end_date, interval=timeframe)
+            upsert_intraday_bars(db, symbol.id, timeframe, df)
         return {
             "status": "ok",
             "rows": len(df),
             "ticker": req.ticker,
+            "timeframe": timeframe,
         }
+    except CircuitOpenError as e:
+        # provedor fora do ar: falha rápida, sem segurar a vaga do gate
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-# -- possibilidade de rodar os jobs manualmente    
-    
-@app.post("/jobs/daily_indicators")
-def jobs_daily_indicators(tickers: list[str], background: BackgroundTasks, db: Session = Depends(get_db)):
-    # dispara async (não trava o request)
-    background.add_task(run_daily_indicators, db, tickers)
-    return {"status": "accepted", "job": "daily_indicators", "tickers": tickers}
+@app.post("/data/prices/import")
+async def import_prices(
+    file: UploadFile = File(..., description="CSV ou Parquet com date/open/high/low/close[/volume][/ticker]"),
+    ticker: str | None = Form(default=None, description="Ticker do arquivo, se não houver coluna ticker/symbol"),
+    format: str | None = Form(default=None, description="csv | parquet (padrão: pela extensão)"),
+    chunksize: int = Form(default=50_000, ge=1_000, le=1_000_000),
+    db: Session = Depends(get_db),
+):
+    """
+    Importação em massa de OHLCV de arquivos de fornecedores. O upload é lido em blocos
+    (memória constante), normalizado como no fetch do Yahoo e gravado por upsert.
+    """
+    from app.services import price_import
+    try:
+        fmt = price_import.detect_format(file.filename, format)
+        return await admission.DATA.run(
+            price_import.import_prices, db, file.file, fmt=fmt, default_ticker=ticker, chunksize=chunksize
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+# -- LIVE / PAPER TRADING (estado incremental; ver app/live_engine.py) --
+@app.post("/live/states")
+async def create_live_state(req: schemas.LiveStateRequest, db: Session = Depends(get_db)):
+    """
+    Cria (ou reaproveita) o estado live de ticker+estratégia+parâmetros e aquece os
+    indicadores com os preços desde `start_date`. Depois disso, cada avanço processa só
+    as barras novas (POST /live/states/{id}/advance ou o job daily_indicators).
+    Reaproveitar com initial_cash, commission ou start_date diferentes do estado existente -> 409.
+    """
+    return await admission.DATA.run(_create_live_state_sync, req, db)
+
+def _create_live_state_sync(req: schemas.LiveStateRequest, db: Session):
+    from app import crud_live
+    try:
+        params = validate_and_normalize_params(req.strategy_type, req.strategy_params)
+        start = datetime.fromisoformat(req.start_date)
+        st = crud_live.find_state(db, req.ticker, req.strategy_type, params)
+        if st is not None:
+            conflicts = crud_live.state_conflicts(
+                st, initial_cash=req.initial_cash, commission=req.commission, start_date=start,
+            )
+            if conflicts:
+                diff = ", ".join(f"{k}: {a} (existente) != {b}" for k, (a, b) in conflicts.items())
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Estado {st.id} já existe para ticker+estratégia+parâmetros com outros valores ({diff})",
+                )
+        else:
+            cols = get_price_columns(db, req.ticker, start, None)
+            if not cols or not cols["date"]:
+                from app.services import market_data
+                prices = market_data.load_prices(req.ticker, req.start_date, date.today().isoformat(), db=db)
+                bulk_upsert_prices(db, ensure_symbol(db, req.ticker).id, prices.df)
+            ensure_symbol(db, req.ticker)  # entra no universo do daily_indicators
+            st = crud_live.create_state(
+                db, ticker=req.ticker, strategy_type=req.strategy_type, params=params,
+                initial_cash=req.initial_cash, commission=req.commission, start_date=start,
+            )
+            crud_live.advance_state(db, st, since=start)
+        return crud_live.state_summary(st)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/live/states")
+def list_live_states(
+    ticker: str | None = Query(default=None),
+    strategy_type: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    from app import crud_live
+    return [crud_live.state_summary(st) for st in crud_live.list_states(db, ticker, strategy_type)]
+
+@app.get("/live/states/{state_id}")
+def get_live_state(state_id: int, db: Session = Depends(get_db)):
+    from app import crud_live
+    st = crud_live.get_state(db, state_id)
+    if not st:
+        raise HTTPException(status_code=404, detail="Estado não encontrado")
+    return crud_live.state_summary(st)
+
+@app.post("/live/states/{state_id}/advance")
+def advance_live_state(state_id: int, db: Session = Depends(get_db)):
+    """Processa as barras armazenadas após a última barra vista; retorna os eventos gerados."""
+    from app import crud_live
+    st = crud_live.get_state(db, state_id)
+    if not st:
+        raise HTTPException(status_code=404, detail="Estado não encontrado")
+    events = crud_live.advance_state(db, st)
+    return {**crud_live.state_summary(st), "events": events}
+
+
+# -- JOBS (agendador em processo; ver app/scheduler.py) --
+def _trigger_job(name: str, params: dict | None = None) -> dict:
+    try:
+        scheduler.get_scheduler().trigger(name, params)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job desconhecido: {name}")
+    except scheduler.JobBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "accepted", "job": name, "params": params or {}}
+
+@app.get("/jobs")
+async def list_jobs():
+    """Jobs registrados, agenda e próxima execução."""
+    return [job.describe() for job in scheduler.get_scheduler().jobs.values()]
+
+@app.get("/jobs/runs", response_model=list[schemas.JobRunItem])
+def list_job_runs(
+    job_name: str | None = Query(default=None),
+    status: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Histórico de execuções com duração e tempo por etapa."""
+    return [
+        schemas.JobRunItem(
+            id=r.id,
+            job_name=r.job_name,
+            status=r.status,
+            trigger=r.trigger,
+            attempt=r.attempt,
+            started_at=r.started_at.isoformat(),
+            finished_at=r.finished_at.isoformat() if r.finished_at else None,
+            duration_ms=r.duration_ms,
+            message=r.message,
+            steps=json.loads(r.steps_json) if r.steps_json else [],
+        )
+        for r in crud.list_jobruns(db, job_name=job_name, status=status, limit=limit)
+    ]
+
+@app.post("/jobs/{job_name}/trigger", status_code=202)
+def trigger_job(job_name: str, req: schemas.JobTriggerRequest | None = None):
+    """Executa o job agora, em background, com sessão própria (409 se já estiver rodando)."""
+    return _trigger_job(job_name, req.params if req else None)
 
-@app.post("/jobs/health_check")
-def jobs_health_check(background: BackgroundTasks, db: Session = Depends(get_db)):
-    background.add_task(run_health_check, db)
-    return {"status": "accepted", "job": "health_check"}
+# atalhos antigos
+@app.post("/jobs/daily_indicators", status_code=202)
+def jobs_daily_indicators(tickers: list[str] | None = None):
+    return _trigger_job("daily_indicators", {"tickers": tickers} if tickers else None)
 
+@app.post("/jobs/health_check", status_code=202)
+def jobs_health_check():
+    return _trigger_job("health_check")
@@ -0,0 +1,151 @@
+# app/metrics.py
+"""
+Métricas em processo no formato texto do Prometheus (exposto em GET /metrics).
+
+Registro mínimo, sem dependências: contadores, gauges (valor fixo ou callback lido
+no scrape) e histogramas de buckets fixos. Labels são kwargs.
+"""
+from __future__ import annotations
+import threading
+from typing import Callable
+
+_registry: dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, k, v) for k, v in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+        return lines
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._callbacks: dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = float(value)
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        """Valor calculado no momento do scrape (ex.: profundidade de fila)."""
+        with self._lock:
+            self._callbacks[tuple(sorted(labels.items()))] = fn
+
+    def value(self, **labels) -> float:
+        key = tuple(sorted(labels.items()))
+        fn = self._callbacks.get(key)
+        return float(fn()) if fn else super().value(**labels)
+
+    def _samples(self):
+        samples = super()._samples()
+        for key, fn in list(self._callbacks.items()):
+            try:
+                samples.append((self.name, key, float(fn())))
+            except Exception:
+                continue
+        return samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] | None = None):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets or self.DEFAULT_BUCKETS)
+        self._hist: dict[tuple, list] = {}  # labels -> [contagens por bucket..., soma, total]
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            h = self._hist.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def _samples(self):
+        out = []
+        with self._lock:
+            for key, h in self._hist.items():
+                for i, b in enumerate(self.buckets):
+                    out.append((f"{self.name}_bucket", key + (("le", f"{b:g}"),), h[i]))
+                out.append((f"{self.name}_bucket", key + (("le", "+Inf"),), h[-1]))
+                out.append((f"{self.name}_sum", key, h[-2]))
+                out.append((f"{self.name}_count", key, h[-1]))
+        return out
+
+
+def _get_or_create(cls, name: str, help: str, **kwargs):
+    with _registry_lock:
+        m = _registry.get(name)
+        if m is None:
+            m = cls(name, help, **kwargs)
+            _registry[name] = m
+        return m
+
+
+def counter(name: str, help: str) -> Counter:
+    return _get_or_create(Counter, name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _get_or_create(Gauge, name, help)
+
+
+def histogram(name: str, help: str, buckets: tuple[float, ...] | None = None) -> Histogram:
+    return _get_or_create(Histogram, name, help, buckets=buckets)
+
+
+def render_latest() -> str:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines: list[str] = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
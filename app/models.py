@@ -4,8 +4,8 @@ from app.db import Base
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import (
-    String, Integer, DateTime, Float, ForeignKey,
-    UniqueConstraint, Index, Text, func
+    String, Integer, BigInteger, DateTime, Float, Boolean, ForeignKey,
+    UniqueConstraint, Index, Text, LargeBinary, func
 )
 class Symbol(Base):
     __tablename__ = "symbols"
@@ -33,6 +33,25 @@ class Price(Base):
         Index("ix_prices_symbol_date", "symbol_id", "date"),
     )
 
+
+class IntradayChunk(Base):
+    """
+    Barras intraday compactadas: um registro por símbolo/intervalo/pregão, com as colunas
+    do dia num blob (segundos desde a meia-noite em int32 + OHLCV float64 por planos de
+    bytes, zlib). Ver crud_prices.upsert_intraday_bars / iter_intraday_bars.
+    """
+    __tablename__ = "intraday_chunks"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    symbol_id: Mapped[int] = mapped_column(ForeignKey("symbols.id", ondelete="CASCADE"))
+    interval: Mapped[str] = mapped_column(String(5))        # "1m", "5m", ..., "1h"
+    day: Mapped[datetime] = mapped_column(DateTime)         # pregão (meia-noite)
+    n_bars: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+    __table_args__ = (
+        UniqueConstraint("symbol_id", "interval", "day", name="uq_intraday_chunks_symbol_interval_day"),
+    )
+
 __table_args__ = (
         UniqueConstraint("symbol_id", "date", name="uq_prices_symbol_date"),
         Index("ix_prices_symbol_date", "symbol_id", "date"),
@@ -57,19 +76,42 @@ class Backtest(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
-    ticker: Mapped[str] = mapped_column(String(40), index=True)
+    ticker: Mapped[str] = mapped_column(String(40))
     start_date: Mapped[datetime] = mapped_column(DateTime)
     end_date: Mapped[datetime] = mapped_column(DateTime)
-    strategy_type: Mapped[str] = mapped_column(String(40), index=True)
+    strategy_type: Mapped[str] = mapped_column(String(40))
 
     strategy_params_json: Mapped[str | None] = mapped_column(Text, nullable=True)
     initial_cash: Mapped[float] = mapped_column(Float, default=100000.0)
     commission: Mapped[float] = mapped_column(Float, default=0.0)
-    status: Mapped[str] = mapped_column(String(20), default="created", index=True)
+    status: Mapped[str] = mapped_column(String(20), default="created")
 
     # Campo extra que incluímos no projeto (ok manter):
     timeframe: Mapped[str | None] = mapped_column(String(10), nullable=True)
 
+    # fila distribuída (status "queued" -> "running" -> "finished"/"error"); ver app/jobs/backtest_worker.py
+    claimed_by: Mapped[str | None] = mapped_column(String(100), nullable=True)   # host:pid do worker
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # origem do OHLCV usado: "yahoo" ou "local" (fallback com o Yahoo indisponível)
+    data_source: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    data_stale: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+
+    # profile=true (admin) em /backtests/run ou /backtests/enqueue; o worker honra o pedido
+    profile_requested: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    # índices compostos para a listagem paginada por (created_at, id) com filtros;
+    # substituem os índices simples de ticker/strategy_type/status (mesma coluna líder)
+    __table_args__ = (
+        Index("ix_backtests_created_id", "created_at", "id"),
+        Index("ix_backtests_ticker_created_id", "ticker", "created_at", "id"),
+        Index("ix_backtests_strategy_created_id", "strategy_type", "created_at", "id"),
+        Index("ix_backtests_status_created_id", "status", "created_at", "id"),
+        Index("ix_backtests_ticker_strategy_created_id", "ticker", "strategy_type", "created_at", "id"),
+    )
+
 class Trade(Base):
     __tablename__ = "trades"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -81,6 +123,13 @@ class Trade(Base):
     commission: Mapped[float] = mapped_column(Float, default=0.0)
     pnl: Mapped[float] = mapped_column(Float, default=0.0)
 
+    # excursões do trade (calculadas a partir do OHLC entre abertura e fechamento)
+    open_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    mae: Mapped[float | None] = mapped_column(Float, nullable=True)            # max adverse excursion (fração da entrada)
+    mfe: Mapped[float | None] = mapped_column(Float, nullable=True)            # max favorable excursion (fração da entrada)
+    bars_held: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    stop_distance: Mapped[float | None] = mapped_column(Float, nullable=True)  # |entrada - stop| em preço
+
 class DailyPosition(Base):
     __tablename__ = "daily_positions"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -105,6 +154,117 @@ class Metric(Base):
     win_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
     avg_trade_return: Mapped[float | None] = mapped_column(Float, nullable=True)
 
+    __table_args__ = (
+        Index("ix_metrics_bt_id", "backtest_id", "id"),  # última métrica por backtest
+    )
+
+class BacktestProfile(Base):
+    """
+    Artefato de profiling de um backtest (POST /backtests/run com profile=true ou
+    `run_backtest_worker.py --profile`). Ver app/profiling.py.
+    """
+    __tablename__ = "backtest_profiles"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    backtest_id: Mapped[int] = mapped_column(ForeignKey("backtests.id", ondelete="CASCADE"), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    wall_seconds: Mapped[float] = mapped_column(Float)
+    peak_memory_bytes: Mapped[int] = mapped_column(BigInteger)
+    summary: Mapped[bytes] = mapped_column(LargeBinary)   # JSON (árvore de chamadas, alocações), zlib
+    pstats: Mapped[bytes] = mapped_column(LargeBinary)    # dump do pstats
+
+class BacktestTelemetry(Base):
+    """
+    Telemetria da execução de um backtest (fases, tamanho, pico de RSS, engine); ver
+    app/telemetry.py. strategy_type é copiado do backtest para agregar sem join.
+    """
+    __tablename__ = "backtest_telemetry"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    backtest_id: Mapped[int] = mapped_column(ForeignKey("backtests.id", ondelete="CASCADE"), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    strategy_type: Mapped[str] = mapped_column(String(40))
+    engine: Mapped[str] = mapped_column(String(40))
+    timeframe: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    bars: Mapped[int] = mapped_column(Integer)
+    trades: Mapped[int] = mapped_column(Integer)
+    fetch_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    simulate_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    persist_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+    total_seconds: Mapped[float] = mapped_column(Float)
+    peak_rss_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    profiled: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)  # fora do relatório
+
+    __table_args__ = (
+        Index("ix_backtest_telemetry_created", "created_at"),   # janelas de GET /stats/performance
+    )
+
+class BacktestSummary(Base):
+    """
+    Linha desnormalizada por backtest (parâmetros-chave + última métrica) para rankings.
+    Mantida por crud.save_metrics; nunca editar à mão.
+    """
+    __tablename__ = "backtest_summaries"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    backtest_id: Mapped[int] = mapped_column(ForeignKey("backtests.id", ondelete="CASCADE"), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    ticker: Mapped[str] = mapped_column(String(40))
+    exchange: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    strategy_type: Mapped[str] = mapped_column(String(40))
+    timeframe: Mapped[str | None] = mapped_column(String(10), nullable=True)
+    start_date: Mapped[datetime] = mapped_column(DateTime)
+    end_date: Mapped[datetime] = mapped_column(DateTime)
+
+    # parâmetros extraídos de strategy_params_json (None quando não se aplica à estratégia)
+    fast: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    slow: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    n: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    lookback: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    thresh: Mapped[float | None] = mapped_column(Float, nullable=True)
+    risk_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
+    atr_mult: Mapped[float | None] = mapped_column(Float, nullable=True)
+    stop_method: Mapped[str | None] = mapped_column(String(20), nullable=True)
+
+    total_return: Mapped[float | None] = mapped_column(Float, nullable=True)
+    sharpe: Mapped[float | None] = mapped_column(Float, nullable=True)
+    max_drawdown: Mapped[float | None] = mapped_column(Float, nullable=True)
+    win_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
+    avg_trade_return: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_bt_summaries_strategy_sharpe", "strategy_type", "sharpe"),
+        Index("ix_bt_summaries_strategy_return", "strategy_type", "total_return"),
+        Index("ix_bt_summaries_exchange_strategy_created", "exchange", "strategy_type", "created_at"),
+        Index("ix_bt_summaries_ticker_strategy", "ticker", "strategy_type"),
+        Index("ix_bt_summaries_sharpe", "sharpe"),
+    )
+
+class StrategyState(Base):
+    """
+    Estado persistido do modo live/paper (app/live_engine.py): indicadores, posição,
+    stop e ordem pendente. Avança só com as barras novas desde last_bar_date.
+    """
+    __tablename__ = "strategy_states"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    ticker: Mapped[str] = mapped_column(String(40))
+    strategy_type: Mapped[str] = mapped_column(String(40))
+    params_hash: Mapped[str] = mapped_column(String(64))
+    strategy_params_json: Mapped[str] = mapped_column(Text)
+    initial_cash: Mapped[float] = mapped_column(Float, default=100000.0)
+    commission: Mapped[float] = mapped_column(Float, default=0.0)
+    start_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # início do aquecimento
+
+    state_json: Mapped[str] = mapped_column(Text)
+    last_bar_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_signal_json: Mapped[str | None] = mapped_column(Text, nullable=True)  # eventos da última barra
+
+    __table_args__ = (
+        UniqueConstraint("ticker", "strategy_type", "params_hash", name="uq_strategy_states_key"),
+        Index("ix_strategy_states_ticker", "ticker"),
+    )
+
 class JobRun(Base):
     __tablename__ = "job_runs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -112,4 +272,30 @@ class JobRun(Base):
     started_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     status: Mapped[str] = mapped_column(String(20), default="started")  # started|ok|error
-    message: Mapped[str | None] = mapped_column(Text, nullable=True)
\ No newline at end of file
+    message: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    trigger: Mapped[str | None] = mapped_column(String(20), nullable=True)   # schedule|manual|cli
+    attempt: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    duration_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    steps_json: Mapped[str | None] = mapped_column(Text, nullable=True)     # [{"name": ..., "ms": ..., "ok": ...}]
+
+    __table_args__ = (
+        Index("ix_job_runs_name_started", "job_name", "started_at"),
+    )
+
+class JobLease(Base):
+    """
+    Lease de execução agendada entre réplicas: uma linha por (job, vaga de concorrência).
+    Tomada com UPDATE condicional em lease_expires (ou INSERT da linha, único por
+    job/vaga); ver crud.acquire_job_lease.
+    """
+    __tablename__ = "job_leases"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_name: Mapped[str] = mapped_column(String(100))
+    slot: Mapped[int] = mapped_column(Integer)
+    holder: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    lease_expires: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("job_name", "slot", name="uq_job_leases_job_slot"),
+    )
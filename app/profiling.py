@@ -0,0 +1,134 @@
+# app/profiling.py
+"""
+Profiling sob demanda de um backtest: cProfile (determinístico, stdlib) + tracemalloc.
+
+`profile_call(fn, ...)` devolve o resultado de `fn` e um `ProfileArtifact` com:
+- árvore de chamadas: funções por tempo acumulado, cada uma com as chamadas mais caras;
+- relatório texto do pstats;
+- maiores alocações (arquivo:linha) e pico de memória rastreado;
+- o dump binário do pstats (abre com `python -m pstats`, snakeviz etc.).
+
+Só um profiling por processo de cada vez: cProfile e tracemalloc são globais (no 3.12
+um segundo profiler ativo falha) e tracemalloc deixa todas as threads mais lentas.
+"""
+from __future__ import annotations
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable
+
+TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "60"))
+TOP_CALLEES = 8
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 5
+
+_lock = threading.Lock()
+
+
+@dataclass
+class ProfileArtifact:
+    wall_seconds: float
+    peak_memory_bytes: int
+    summary: dict      # árvore de chamadas, relatório e alocações (JSON)
+    pstats: bytes      # mesmo formato de pstats.Stats.dump_stats
+
+    def summary_blob(self) -> bytes:
+        return zlib.compress(json.dumps(self.summary).encode(), 6)
+
+
+def load_summary(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def _func_name(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in
+    return f"{os.path.relpath(filename) if not filename.startswith('<') else filename}:{line}({name})"
+
+
+def _call_tree(stats: pstats.Stats) -> list[dict]:
+    """Funções por tempo acumulado; `callees` = quem ela chama, também por tempo acumulado."""
+    raw = stats.stats  # func -> (cc, nc, tottime, cumtime, callers)
+    callees: dict[tuple, list[tuple[tuple, float, int]]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, (_, nc, _, ct) in callers.items():
+            callees.setdefault(caller, []).append((func, ct, nc))
+    ranked = sorted(raw.items(), key=lambda kv: -kv[1][3])[:TOP_FUNCTIONS]
+    return [{
+        "function": _func_name(func),
+        "calls": nc,
+        "primitive_calls": cc,
+        "tottime": round(tt, 6),
+        "cumtime": round(ct, 6),
+        "callees": [
+            {"function": _func_name(f), "calls": n, "cumtime": round(c, 6)}
+            for f, c, n in sorted(callees.get(func, []), key=lambda x: -x[1])[:TOP_CALLEES]
+        ],
+    } for func, (cc, nc, tt, ct, _) in ranked]
+
+
+def _report(stats: pstats.Stats, limit: int = 40) -> str:
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> list[dict]:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [{
+        "location": f"{os.path.relpath(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+        "size_bytes": s.size,
+        "count": s.count,
+        "traceback": [f"{os.path.relpath(f.filename)}:{f.lineno}" for f in s.traceback],
+    } for s in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]]
+
+
+def profile_call(fn: Callable[..., Any], *args, **kwargs) -> tuple[Any, ProfileArtifact]:
+    """
+    Executa `fn(*args, **kwargs)` sob cProfile + tracemalloc. Exceções de `fn` propagam
+    normalmente (sem artefato). As alocações listadas são as vivas ao fim da execução
+    (ex.: o DataFrame de resultados); o pico cobre toda a execução.
+    """
+    with _lock:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        t0 = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+            wall = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    stats = pstats.Stats(profiler)
+    summary = {
+        "wall_seconds": round(wall, 4),
+        "peak_memory_bytes": peak,
+        "profiled_seconds": round(stats.total_tt, 4),
+        "call_tree": _call_tree(stats),
+        "top_allocations": _top_allocations(snapshot),
+        "report": _report(stats),
+    }
+    return result, ProfileArtifact(wall, peak, summary, marshal.dumps(stats.stats))
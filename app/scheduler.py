@@ -0,0 +1,293 @@
+# app/scheduler.py
+"""
+Agendador de jobs em processo.
+
+Cada job registrado tem agenda cron (5 campos, UTC), limite de concorrência, jitter,
+retries com backoff e sessão de banco própria por execução (nunca a sessão de um
+request). Execuções sobrepostas são evitadas no processo (semáforo) e, nas agendadas,
+entre réplicas (lease atômico em `job_leases`, uma vaga por unidade de concorrência).
+Cada tentativa vira uma linha em `job_runs` com duração e tempo por etapa.
+
+Opt-in: SCHEDULER_ENABLED=1 no processo da API (cada worker do uvicorn e cada réplica
+rodaria o seu agendador), ou isolado via bin/run_scheduler.py.
+"""
+from __future__ import annotations
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app import metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+_runs = metrics.counter("job_runs_total", "Execuções de jobs por status")
+_duration = metrics.histogram("job_duration_seconds", "Duração das execuções de jobs")
+
+
+class CronSchedule:
+    """minuto hora dia-do-mês mês dia-da-semana (0/7 = domingo). Aceita *, */n, a-b, a-b/n e listas."""
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Expressão cron inválida (5 campos): {expr!r}")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(p, lo, hi) for p, (lo, hi) in zip(parts, self.FIELDS)
+        )
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        self._dom_any, self._dow_any = parts[2] == "*", parts[4] == "*"
+
+    @staticmethod
+    def _parse(field: str, lo: int, hi: int) -> frozenset[int]:
+        out: set[int] = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, raw_step = part.split("/", 1)
+                step = int(raw_step)
+            if part == "*":
+                a, b = lo, hi
+            elif "-" in part:
+                a, b = (int(x) for x in part.split("-", 1))
+            else:
+                a = int(part)
+                b = hi if step > 1 else a
+            if step < 1 or a < lo or b > hi or a > b:
+                raise ValueError(f"Campo cron fora do intervalo {lo}-{hi}: {field!r}")
+            out.update(range(a, b + 1, step))
+        return frozenset(out)
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.weekdays
+        # regra do cron: com os dois campos restritos, basta um casar
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, dt: datetime) -> datetime:
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Agenda sem próxima execução: {self.expr!r}")
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],          # func(db, ctx, **params)
+        schedule: str | None,
+        *,
+        max_concurrency: int = 1,
+        jitter: float = 0.0,               # atraso aleatório (s) antes de execuções agendadas
+        retries: int = 0,
+        retry_delay: float = 30.0,
+        lease: float = 3600.0,             # validade (s) do lease entre réplicas; maior que a execução mais longa
+        params: dict | None = None,
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = CronSchedule(schedule) if schedule else None
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.params = params or {}
+        self.next_run: datetime | None = None
+        self.running = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "schedule": self.schedule.expr if self.schedule else None,
+            "next_run": self.next_run.isoformat(timespec="seconds") if self.next_run else None,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "retries": self.retries,
+            "jitter": self.jitter,
+        }
+
+
+class JobBusy(RuntimeError):
+    pass
+
+
+class Scheduler:
+    def __init__(self, session_factory: Callable[[], Session], max_workers: int = 4, sleep: Callable[[float], Any] = time.sleep):
+        self.session_factory = session_factory
+        self.jobs: dict[str, Job] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._halt = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._sleep = sleep
+
+    def register(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        if job.schedule:
+            job.next_run = job.schedule.next_after(datetime.utcnow())
+        return job
+
+    # -- execução --
+    def _acquire_lease(self, job: Job) -> tuple[int, str] | None:
+        """Vaga do job entre réplicas (None: todas ocupadas por execuções em andamento)."""
+        from app.crud import acquire_job_lease
+        holder = f"{uuid.uuid4().hex[:12]}:{os.getpid()}"
+        db = self.session_factory()
+        try:
+            slot = acquire_job_lease(db, job.name, job.max_concurrency, timedelta(seconds=job.lease), holder)
+        finally:
+            db.close()
+        return (slot, holder) if slot is not None else None
+
+    def _release_lease(self, job: Job, lease: tuple[int, str]) -> None:
+        from app.crud import release_job_lease
+        db = self.session_factory()
+        try:
+            release_job_lease(db, job.name, *lease)
+        except Exception as e:  # o lease expira sozinho
+            logger.warning(f"[SCHED] falha ao liberar lease de {job.name}: {e}")
+        finally:
+            db.close()
+
+    def _execute(self, job: Job, trigger: str, params: dict) -> str:
+        from app.jobs.runs import tracked_run
+        status = "error"
+        lease = None
+        try:
+            if trigger == "schedule" and job.jitter:
+                self._sleep(random.uniform(0, job.jitter))
+            if trigger == "schedule":
+                lease = self._acquire_lease(job)
+                if lease is None:
+                    logger.info(f"[SCHED] {job.name} já em execução em outra réplica; pulando")
+                    status = "skipped"
+                    return status
+            for attempt in range(1, job.retries + 2):
+                db = self.session_factory()
+                t0 = time.perf_counter()
+                try:
+                    with tracked_run(db, job.name, message=f"params={params}" if params else None,
+                                     trigger=trigger, attempt=attempt) as ctx:
+                        job.func(db, ctx, **params)
+                    status = "ok"
+                    break
+                except Exception as e:
+                    logger.warning(f"[SCHED] {job.name} tentativa {attempt} falhou: {e}")
+                    if attempt <= job.retries:
+                        # backoff exponencial com jitter (metade fixa + metade aleatória)
+                        delay = min(job.retry_delay * 2 ** (attempt - 1), job.retry_delay * 8)
+                        self._sleep(delay / 2 + random.uniform(0, delay / 2))
+                finally:
+                    _duration.observe(time.perf_counter() - t0, job=job.name)
+                    db.close()
+        finally:
+            if lease is not None:
+                self._release_lease(job, lease)
+            job.running -= 1
+            job._slots.release()
+            _runs.inc(job=job.name, status=status)
+        return status
+
+    def trigger(self, name: str, params: dict | None = None, trigger: str = "manual") -> Future:
+        """Dispara o job agora (em background). JobBusy se já houver `max_concurrency` execuções."""
+        job = self.jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        if not job._slots.acquire(blocking=False):
+            raise JobBusy(f"Job '{name}' já está em execução")
+        job.running += 1
+        return self._executor.submit(self._execute, job, trigger, {**job.params, **(params or {})})
+
+    # -- loop de agenda --
+    def run_pending(self, now: datetime | None = None) -> list[str]:
+        now = now or datetime.utcnow()
+        fired = []
+        for job in self.jobs.values():
+            if job.next_run is None or job.next_run > now:
+                continue
+            job.next_run = job.schedule.next_after(now)
+            try:
+                self.trigger(job.name, trigger="schedule")
+                fired.append(job.name)
+            except JobBusy:
+                logger.info(f"[SCHED] {job.name} ainda em execução; execução agendada pulada")
+                _runs.inc(job=job.name, status="skipped")
+        return fired
+
+    def _loop(self):
+        while not self._halt.is_set():
+            self.run_pending()
+            upcoming = [j.next_run for j in self.jobs.values() if j.next_run]
+            wait = (min(upcoming) - datetime.utcnow()).total_seconds() if upcoming else 60
+            self._halt.wait(min(max(wait, 0.5), 60))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._halt.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="scheduler")
+        self._thread.start()
+        logger.info(f"[SCHED] iniciado com {list(self.jobs)}")
+
+    def stop(self, wait: bool = False):
+        self._halt.set()
+        if wait:
+            self._executor.shutdown(wait=True)
+
+
+def default_jobs() -> list[Job]:
+    from app.jobs.daily_indicators import daily_indicators
+    from app.jobs.health_check import health_check
+    return [
+        Job(
+            "daily_indicators", daily_indicators,
+            os.getenv("JOB_DAILY_INDICATORS_CRON", "30 22 * * 1-5"),  # após o fechamento da B3 (UTC)
+            jitter=60, retries=2, retry_delay=60, lease=4 * 3600,
+        ),
+        Job(
+            "health_check", health_check,
+            os.getenv("JOB_HEALTH_CHECK_CRON", "*/15 * * * *"),
+            jitter=30, retries=0, lease=300,
+        ),
+    ]
+
+
+_scheduler: Scheduler | None = None
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        from app.db import SessionLocal
+        _scheduler = Scheduler(SessionLocal)
+        for job in default_jobs():
+            _scheduler.register(job)
+    return _scheduler
+
+
+def enabled() -> bool:
+    """Opt-in: só o processo com SCHEDULER_ENABLED=1 agenda jobs."""
+    return os.getenv("SCHEDULER_ENABLED", "0") == "1"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, RootModel
+from typing import Any, Dict, List, Literal, Optional, Union
 
 
 # -- REQUESTS --
@@ -13,11 +13,32 @@ class RunBacktestRequest(BaseModel):
     initial_cash: float = Field(default = 100000.0, example = 100000.0)
     commission: float = Field(default=0.0, example = 0.0)
     timeframe: Optional[str] = Field(default="1d", example="1d")
+    profile: bool = Field(default=False, example=False)  # cProfile + tracemalloc (admin); ver GET /backtests/{id}/profile
+
+class LiveStateRequest(BaseModel):
+    ticker: str = Field(..., example="PETR4.SA")
+    strategy_type: str = Field(..., example="donchian")
+    strategy_params: Optional[Dict[str, Any]] = Field(default=None, example={"n": 20})
+    start_date: str = Field(..., example="2023-01-01")  # início do aquecimento dos indicadores
+    initial_cash: float = Field(default=100000.0)
+    commission: float = Field(default=0.0)
+
+class MomentumRotationRequest(BaseModel):
+    start_date: str = Field(..., example="2015-01-01")
+    end_date: str = Field(..., example="2024-12-31")
+    tickers: Optional[List[str]] = Field(default=None, example=None)  # padrão: todos os symbols
+    lookback: int = Field(default=126, ge=2, example=252)
+    skip: int = Field(default=0, ge=0, example=21)       # barras recentes ignoradas no retorno (12-1)
+    top_k: int = Field(default=10, ge=1, example=20)
+    rebalance: str = Field(default="M", example="M")     # W, M, Q, Y ou número de barras
+    initial_cash: float = Field(default=100000.0)
+    commission: float = Field(default=0.0)
 
 class UpdateIndicatorsRequest(BaseModel):
     ticker: str
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    timeframe: Optional[str] = Field(default="1d", example="5m")  # intraday vai para intraday_chunks
 
 
 # -- RESPONSES -- 
@@ -25,6 +46,9 @@ class UpdateIndicatorsRequest(BaseModel):
 class RunBacktestResponse(BaseModel):
     id: int
     status: str = Field(example="created")
+    data_source: Optional[str] = Field(default=None, example="yahoo")  # "local" = Yahoo indisponível
+    stale: Optional[bool] = None  # dado local defasado em relação ao end_date
+    profile_url: Optional[str] = None  # com profile=true
 
 class BackTestListItem(BaseModel):
     id:int
@@ -40,6 +64,16 @@ class ResultMetrics(BaseModel):
     win_rate: Optional[float]=None
     avg_trade_return: Optional[float]=None
 
+class MomentumRotationResponse(BaseModel):
+    id: int
+    status: str = Field(example="finished")
+    metrics: ResultMetrics
+    n_tickers: int
+    rebalances: int
+    avg_turnover: float                      # soma de |Δpeso| média por rebalanceamento
+    last_rebalance: Optional[str] = None
+    holdings: Dict[str, float] = Field(default_factory=dict, example={"PETR4.SA": 0.1})  # pesos no último rebalanceamento
+
 class Trade(BaseModel):
     date:str
     side:str
@@ -47,6 +81,11 @@ class Trade(BaseModel):
     size:float
     commission:Optional[float] = 0.0
     pnl:Optional[float] = 0.0
+    open_date: Optional[str] = None
+    mae: Optional[float] = None
+    mfe: Optional[float] = None
+    bars_held: Optional[int] = None
+    stop_distance: Optional[float] = None
 
 class DailyPosition(BaseModel):
     date: str
@@ -66,7 +105,110 @@ class BacktestResults(BaseModel):
     daily_positions: List[DailyPosition]
     equity_curve: List[EquityPoint]
 
+class TradeColumns(BaseModel):
+    """Trades em colunas: uma lista por campo de Trade, alinhadas por índice."""
+    date: List[str]
+    side: List[str]
+    price: List[float]
+    size: List[float]
+    commission: List[Optional[float]]
+    pnl: List[Optional[float]]
+    open_date: List[Optional[str]]
+    mae: List[Optional[float]]
+    mfe: List[Optional[float]]
+    bars_held: List[Optional[int]]
+    stop_distance: List[Optional[float]]
+
+class DailyPositionColumns(BaseModel):
+    date: List[str]
+    position_size: List[float]
+    cash: List[float]
+    equity: List[float]
+    drawdown: List[float]
+
+class BacktestResultsColumnar(BaseModel):
+    """GET /backtests/{id}/results?layout=columnar (sem equity_curve: está em daily_positions.equity)."""
+    backtest_id: int
+    layout: Literal["columnar"]
+    metrics: ResultMetrics
+    trades: TradeColumns
+    daily_positions: DailyPositionColumns
+
+def _one_of(schema: dict) -> None:
+    # os formatos são mutuamente exclusivos (layout / trades lista x objeto)
+    schema["oneOf"] = schema.pop("anyOf")
+
+class BacktestResultsResponse(RootModel[Union[BacktestResults, BacktestResultsColumnar]]):
+    """Documentação de /results: layout=rows -> BacktestResults, layout=columnar -> BacktestResultsColumnar."""
+    model_config = ConfigDict(json_schema_extra=_one_of)
+
+class RollingPoint(BaseModel):
+    date: str
+    sharpe: Optional[float] = None
+    volatility: Optional[float] = None
+    drawdown: Optional[float] = None
+
+class RollingResults(BaseModel):
+    backtest_id: int
+    window: int
+    total_points: int
+    points: List[RollingPoint]
+
+class SeriesPoint(BaseModel):
+    date: str
+    value: float
+
+class ChartSeries(BaseModel):
+    backtest_id: int
+    points: int
+    total_points: int
+    equity: List[SeriesPoint]
+    drawdown: List[SeriesPoint]
+    price: List[SeriesPoint]
+
+class LeaderboardItem(BaseModel):
+    rank: int
+    backtest_id: int
+    created_at: str
+    ticker: str
+    exchange: Optional[str] = None
+    strategy_type: str
+    timeframe: Optional[str] = None
+    start_date: str
+    end_date: str
+    params: Dict[str, Any]
+    metrics: ResultMetrics
+
+class PerformanceStatsItem(BaseModel):
+    period: str                          # dia, segunda-feira da semana, "YYYY-MM" ou "all"
+    strategy_type: str
+    engine: str
+    runs: int
+    bars: int
+    bars_per_sec: Optional[float] = None
+    p50_seconds: float
+    p95_seconds: float
+    avg_fetch_seconds: Optional[float] = None
+    avg_simulate_seconds: Optional[float] = None
+    avg_persist_seconds: Optional[float] = None
+    max_peak_rss_bytes: Optional[int] = None
+
 # -- HEALTH --
 class HealthResponse(BaseModel):
     status: str
-    db: str
\ No newline at end of file
+    db: str
+    market_data: Optional[str] = None  # estado do circuit breaker do Yahoo
+class JobTriggerRequest(BaseModel):
+    params: Dict[str, Any] = Field(default_factory=dict, example={"tickers": ["PETR4.SA", "VALE3.SA"]})
+
+class JobRunItem(BaseModel):
+    id: int
+    job_name: str
+    status: str
+    trigger: Optional[str] = None
+    attempt: int = 1
+    started_at: str
+    finished_at: Optional[str] = None
+    duration_ms: Optional[float] = None
+    message: Optional[str] = None
+    steps: List[Dict[str, Any]] = []
@@ -0,0 +1,185 @@
+# app/screener.py
+"""
+Screener de sinais do universo: quais símbolos disparam entrada/saída na última barra.
+
+Carrega só a janela de aquecimento necessária do OHLCV armazenado como matrizes
+datas × tickers e avalia a regra de cada estratégia do REGISTRY para todos os tickers de
+uma vez (funções em lote de app.indicators ao longo do eixo 0). As regras são as mesmas
+do backtest/modo live: sinal no fechamento da última barra; o stop é o que a ordem de
+entrada usaria (ATR ou stop alternativo da estratégia).
+
+O resultado fica em cache até chegarem barras novas (crud_prices.prices_version).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import Callable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app import indicators
+from app.cache import LRUCache
+from app.cross_sectional import forward_fill
+from app.crud_prices import get_price_matrices, prices_version
+
+# ATR de Wilder depende da semente: ~10 períodos de histórico a mais deixam o erro < 1e-4
+ATR_CONVERGENCE = 10
+
+_cache = LRUCache(maxsize=64)  # (estratégia, params, tickers) -> (versão dos preços, resultado)
+# locks por faixa (hash da chave): memória fixa, por mais chaves distintas que cheguem
+LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+WARMUP: dict[str, Callable[[dict], int]] = {
+    "sma_cross": lambda p: p["slow"] + 1,
+    "donchian": lambda p: p["n"] + 1,
+    "momentum": lambda p: max(p["lookback"] + 1, p["ma_period"] if p.get("stop_method") == "ma" else 0),
+}
+
+
+def warmup_bars(strategy_type: str, p: dict) -> int:
+    """Barras necessárias para o sinal da última barra (e o ATR convergido, se usado)."""
+    atr = p["atr_period"] * ATR_CONVERGENCE if p.get("stop_method", "atr") == "atr" else 0
+    return WARMUP[strategy_type](p) + atr + 2
+
+
+def _atr(m: dict, p: dict) -> np.ndarray | None:
+    if p.get("stop_method", "atr") != "atr":
+        return None
+    return indicators.wilder_atr(m["high"], m["low"], m["close"], p["atr_period"])[-1]
+
+
+def _sma_cross(m: dict, p: dict) -> dict:
+    close = m["close"]
+    fast, slow = indicators.sma(close, p["fast"]), indicators.sma(close, p["slow"])
+    sign = np.sign(fast - slow)
+    # cruzamento = sinal atual diferente do último sinal não nulo anterior (como o CrossOver)
+    prev = forward_fill(np.where(sign[:-1] == 0, np.nan, sign[:-1]))[-1]
+    return {
+        "entry": (sign[-1] > 0) & (prev < 0),
+        "exit": (sign[-1] < 0) & (prev > 0),
+        "alt_stop": slow[-1],
+        "values": {"fast": fast[-1], "slow": slow[-1]},
+    }
+
+
+def _donchian(m: dict, p: dict) -> dict:
+    close = m["close"][-1]
+    high = indicators.highest(m["high"], p["n"])
+    low = indicators.lowest(m["low"], p["n"])[-1]
+    ref = high[-2] if p.get("confirm_break", True) else high[-1]
+    return {
+        "entry": close > ref,
+        "exit": close < low,
+        "alt_stop": low,
+        "values": {"upper": ref, "lower": low},
+    }
+
+
+def _momentum(m: dict, p: dict) -> dict:
+    mom = indicators.momentum(m["close"], p["lookback"])[-1]
+    ma = indicators.sma(m["close"], p["ma_period"])[-1] if p.get("stop_method") == "ma" else None
+    return {
+        "entry": mom > p["thresh"],
+        "exit": mom <= 0.0,
+        "alt_stop": ma,
+        "values": {"momentum": mom},
+    }
+
+
+SIGNALS: dict[str, Callable[[dict, dict], dict]] = {
+    "sma_cross": _sma_cross,
+    "donchian": _donchian,
+    "momentum": _momentum,
+}
+
+
+def _num(x) -> float | None:
+    x = float(x)
+    return x if math.isfinite(x) else None
+
+
+def evaluate(strategy_type: str, params: dict, dates: np.ndarray, tickers: list[str], m: dict) -> list[dict]:
+    """Sinal da última barra para todas as colunas das matrizes OHLC (já alinhadas)."""
+    if strategy_type not in SIGNALS:
+        raise ValueError(f"Estratégia sem screener: {strategy_type}")
+    raw_close = m["close"]
+    filled = {k: forward_fill(v) for k, v in m.items()}
+    sig = SIGNALS[strategy_type](filled, params)
+
+    close = filled["close"][-1]
+    atr = _atr(filled, params)
+    if atr is not None:
+        stop = close - params["atr_mult"] * atr
+    else:
+        stop = sig["alt_stop"] if sig["alt_stop"] is not None else np.full(close.shape, np.nan)
+    with np.errstate(invalid="ignore"):
+        stop = np.where((stop > 0) & (stop < close), stop, np.nan)
+    # ticker sem barra na data mais recente do universo: não sinaliza em cima de preço velho
+    fresh = ~np.isnan(raw_close[-1])
+    last_idx = len(raw_close) - 1 - np.argmax(~np.isnan(raw_close[::-1]), axis=0)
+
+    out = []
+    for j, t in enumerate(tickers):
+        signal = None
+        if fresh[j]:
+            signal = "entry" if sig["entry"][j] else ("exit" if sig["exit"][j] else None)
+        out.append({
+            "ticker": t,
+            "date": str(dates[last_idx[j]]),
+            "close": _num(close[j]),
+            "signal": signal,
+            "stale": not bool(fresh[j]),
+            "stop": _num(stop[j]) if signal == "entry" else None,
+            **{k: _num(v[j]) for k, v in sig["values"].items()},
+        })
+    return out
+
+
+def _key_lock(key: tuple) -> threading.Lock:
+    return _locks[hash(key) % LOCK_STRIPES]
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def screen(db: Session, strategy_type: str, params: dict, tickers: list[str] | None = None) -> dict:
+    """Resultado do screener (do cache, se nenhuma barra nova chegou desde o último cálculo)."""
+    # chave de tamanho fixo: a lista de tickers vem da query string
+    key = (strategy_type, _digest(params), _digest(sorted(tickers)) if tickers else None)
+    version = prices_version(db, tickers)
+    with _key_lock(key):  # requisições simultâneas calculam uma vez só
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == version:
+            return {**hit[1], "cached": True}
+
+        t0 = time.perf_counter()
+        last = version[1]
+        results: list[dict] = []
+        as_of = None
+        if last is not None:
+            window = warmup_bars(strategy_type, params)
+            start = last - timedelta(days=int(window * 1.5) + 10)  # ~1,5 dia corrido por pregão
+            dates, names, m = get_price_matrices(db, start, None, tickers, ("high", "low", "close"))
+            if names:
+                results = evaluate(strategy_type, params, dates[-window:], names, {k: v[-window:] for k, v in m.items()})
+                as_of = str(dates[-1])
+        out = {
+            "strategy": strategy_type,
+            "params": params,
+            "as_of": as_of,
+            "universe": len(results),
+            "entries": sum(r["signal"] == "entry" for r in results),
+            "exits": sum(r["signal"] == "exit" for r in results),
+            "computed_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "results": results,
+        }
+        _cache.set(key, (version, out))
+        return {**out, "cached": False}
@@ -0,0 +1,60 @@
+# app/serialization.py
+"""
+Serialização rápida de payloads grandes (sem passar pelo Pydantic).
+
+Usa orjson quando instalado (datetime/numpy nativos); senão cai para json da stdlib.
+Os dados já vêm do banco/engine, então não há validação aqui.
+"""
+from __future__ import annotations
+import json
+from datetime import date, datetime
+from typing import Any
+
+try:  # opcional
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+RESULT_LAYOUTS = ("rows", "columnar")
+
+
+def _default(obj: Any):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # numpy
+        return obj.tolist()
+    raise TypeError(f"Tipo não serializável: {type(obj)!r}")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def results_payload(cols: dict, layout: str = "rows") -> dict:
+    """
+    Monta o payload de /results a partir das colunas de crud.get_results_columns.
+
+    - rows: mesmo formato de schemas.BacktestResults (compatível com clientes atuais)
+    - columnar: {"date": [...], "equity": [...], ...}, sem a curva de equity duplicada
+    """
+    trades, daily = cols["trades"], cols["daily_positions"]
+    if layout == "columnar":
+        return {
+            "backtest_id": cols["backtest_id"],
+            "layout": "columnar",
+            "metrics": cols["metrics"],
+            "trades": trades,
+            "daily_positions": daily,
+        }
+
+    tkeys, dkeys = list(trades), list(daily)
+    daily_rows = [dict(zip(dkeys, r)) for r in zip(*daily.values())]
+    return {
+        "backtest_id": cols["backtest_id"],
+        "metrics": cols["metrics"],
+        "trades": [dict(zip(tkeys, r)) for r in zip(*trades.values())],
+        "daily_positions": daily_rows,
+        "equity_curve": [{"date": d, "equity": e} for d, e in zip(daily["date"], daily["equity"])],
+    }
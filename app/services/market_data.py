@@ -0,0 +1,155 @@
+# app/services/market_data.py
+"""
+Ponto único de leitura de OHLCV para backtests.
+
+Tenta o Yahoo (com timeout/retry/circuit breaker, ver app.services.yahoo); se o provedor
+estiver indisponível, usa os preços já armazenados em `prices` e marca a origem
+("local") e se o dado está defasado em relação ao fim pedido.
+
+Timeframes (app.timeframes): intraday segue o mesmo caminho (Yahoo, depois as barras
+armazenadas do intervalo ou reamostradas de um intervalo menor); "1wk"/"1mo" são
+reamostrados dos diários armazenados, com cache por timeframe até chegarem barras novas.
+"""
+from __future__ import annotations
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app import metrics, timeframes
+from app.cache import LRUCache
+from app.services import yahoo
+from app.services.resilience import CircuitOpenError
+
+logger = logging.getLogger("uvicorn.error")
+
+# tolerância antes de considerar o dado local defasado (fins de semana/feriados)
+STALE_AFTER_DAYS = int(os.getenv("MARKET_DATA_STALE_DAYS", "4"))
+UNAVAILABLE_ERRORS = (CircuitOpenError, yahoo.MarketDataError, TimeoutError, ConnectionError, OSError)
+
+_fallbacks = metrics.counter("market_data_fallback_total", "Leituras servidas pelos preços armazenados")
+
+# (ticker, timeframe, start, end) -> (prices_version do ticker, DataFrame reamostrado)
+_resampled = LRUCache(
+    maxsize=256,
+    max_bytes=int(os.getenv("RESAMPLE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sizeof=lambda v: int(v[1].memory_usage(index=False).sum()),
+)
+
+
+class PriceData(NamedTuple):
+    df: pd.DataFrame
+    source: str                   # "yahoo" | "local"
+    stale: bool
+    last_date: datetime | None
+
+
+@contextmanager
+def _session(db: Session | None):
+    if db is not None:
+        yield db
+        return
+    from app.db import SessionLocal
+    own = SessionLocal()
+    try:
+        yield own
+    finally:
+        own.close()
+
+
+def _frame(cols: dict | None) -> pd.DataFrame:
+    if not cols or not len(cols["date"]):
+        return pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume"])
+    df = pd.DataFrame(cols)
+    df["date"] = df["date"].astype("datetime64[ns]")
+    return df
+
+
+def load_local_prices(db: Session, ticker: str, start: str, end: str) -> pd.DataFrame:
+    from app.crud_prices import get_price_columns
+    return _frame(get_price_columns(db, ticker, datetime.fromisoformat(start), datetime.fromisoformat(end)))
+
+
+def load_local_intraday(db: Session, ticker: str, start: str, end: str, timeframe: str) -> pd.DataFrame:
+    """Barras armazenadas do intervalo; sem elas, reamostra o maior intervalo menor disponível."""
+    from app.crud_prices import get_intraday_columns, stored_intervals
+    lo, hi = datetime.fromisoformat(start), datetime.fromisoformat(end) + timedelta(days=1)
+    stored = stored_intervals(db, ticker)
+    for interval in [timeframe, *timeframes.finer_intervals(timeframe)]:
+        if interval in stored:
+            cols = get_intraday_columns(db, ticker, interval, lo, hi)
+            if cols and interval != timeframe:
+                cols = timeframes.resample_ohlcv(cols, timeframe)
+            return _frame(cols)
+    return _frame(None)
+
+
+def is_stale(last_date: datetime | None, end: str, today: datetime | None = None) -> bool:
+    if last_date is None:
+        return True
+    target = min(datetime.fromisoformat(end), today or datetime.utcnow())
+    return last_date < target - timedelta(days=STALE_AFTER_DAYS)
+
+
+def _resample_df(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    cols = {c: df[c].to_numpy() for c in ("open", "high", "low", "close", "volume")}
+    cols["date"] = pd.to_datetime(df["date"]).to_numpy()
+    return _frame(timeframes.resample_ohlcv(cols, timeframe))
+
+
+def load_resampled(ticker: str, start: str, end: str, timeframe: str, db: Session | None = None) -> PriceData:
+    """
+    "1wk"/"1mo" a partir dos diários armazenados (cache por timeframe, invalidado por
+    prices_version do ticker). Sem diários armazenados ou com eles defasados, reamostra o
+    diário de load_prices (Yahoo ou fallback), sem cache.
+    """
+    from app.crud_prices import prices_version
+    with _session(db) as s:
+        version = prices_version(s, [ticker])
+        last = version[1]
+        if last is not None and not is_stale(last, end):
+            key = (ticker, timeframe, start, end)
+            hit = _resampled.get(key)
+            if hit is not None and hit[0] == version:
+                return PriceData(hit[1], "local", False, last)
+            daily = load_local_prices(s, ticker, start, end)
+            # só usa o armazenado se cobrir o início pedido (senão o período sairia truncado)
+            covers = not daily.empty and daily["date"].iloc[0] <= datetime.fromisoformat(start) + timedelta(days=STALE_AFTER_DAYS)
+            if covers:
+                df = _resample_df(daily, timeframe)
+                _resampled.set(key, (version, df))
+                return PriceData(df, "local", False, last)
+    daily = load_prices(ticker, start, end, db=db)
+    return daily._replace(df=_resample_df(daily.df, timeframe))
+
+
+def load_prices(ticker: str, start: str, end: str, db: Session | None = None, timeframe: str = "1d") -> PriceData:
+    timeframe = timeframes.normalize(timeframe)
+    if timeframe in timeframes.RESAMPLED:
+        return load_resampled(ticker, start, end, timeframe, db=db)
+    try:
+        if timeframe == "1d":
+            df = yahoo.fetch_prices(ticker, start, end)
+        else:
+            df = yahoo.fetch_prices(ticker, start, end, interval=timeframe)
+        last = df["date"].max().to_pydatetime() if not df.empty else None
+        return PriceData(df, "yahoo", False, last)
+    except UNAVAILABLE_ERRORS as e:
+        logger.warning(f"[MARKET_DATA] Yahoo indisponível para {ticker} ({e}); usando preços armazenados")
+        unavailable = e
+
+    with _session(db) as s:
+        if timeframe == "1d":
+            df = load_local_prices(s, ticker, start, end)
+        else:
+            df = load_local_intraday(s, ticker, start, end, timeframe)
+    if df.empty:
+        raise ValueError(f"Yahoo indisponível e sem preços armazenados para {ticker}: {unavailable}")
+
+    _fallbacks.inc(source="local")
+    last = df["date"].max().to_pydatetime()
+    return PriceData(df, "local", is_stale(last, end), last)
@@ -0,0 +1,130 @@
+# app/services/resilience.py
+"""
+Primitivas de resiliência para chamadas externas (Yahoo): timeout por chamada,
+retry com backoff exponencial + jitter e circuit breaker.
+"""
+from __future__ import annotations
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable
+
+# threads dedicadas: uma chamada travada não prende o chamador além do timeout
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ext-call")
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito '{name}' aberto: falhando rápido por mais {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def call_with_timeout(func: Callable[..., Any], timeout: float, *args, **kwargs) -> Any:
+    """Executa `func` com prazo máximo; TimeoutError se não terminar a tempo."""
+    future = _executor.submit(func, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise TimeoutError(f"Chamada excedeu {timeout:.1f}s")
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter: uniforme em [0, min(cap, base * 2^attempt)]."""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def retry_call(
+    func: Callable[[], Any],
+    *,
+    retries: int,
+    retry_on: tuple[type[BaseException], ...],
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Any:
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except retry_on:
+            if attempt == retries:
+                raise
+            sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class CircuitBreaker:
+    """
+    closed -> (N falhas seguidas) -> open -> (reset_timeout) -> half_open -> 1 chamada de teste:
+    sucesso fecha o circuito, falha reabre.
+    """
+    STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def _before_call(self) -> None:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            remaining = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+        raise CircuitOpenError(self.name, remaining)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def call(self, func: Callable[..., Any], *args,
+             failure_on: tuple[type[BaseException], ...] = (Exception,), **kwargs) -> Any:
+        """Só exceções em `failure_on` contam como falha (ex.: ticker inexistente não abre o circuito)."""
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except failure_on:
+            self.record_failure()
+            raise
+        except Exception:  # serviço respondeu (ex.: sem dados): conta como sucesso
+            self.record_success()
+            raise
+        self.record_success()
+        return result
@@ -1,7 +1,13 @@
 # app/services/yahoo.py
-import yfinance as yf
+import os
+import time
+from datetime import datetime, timedelta
+
 import pandas as pd
 
+from app import metrics
+from app.services.resilience import CircuitBreaker, CircuitOpenError, call_with_timeout, retry_call
+
 OHLCV = {"open", "high", "low", "close", "volume"}
 
 def _flatten_multiindex_columns(cols) -> list[str]:
@@ -25,36 +31,199 @@ def _flatten_multiindex_columns(cols) -> list[str]:
             flat.append(str(c).strip().lower())
     return flat
 
-def fetch_prices(ticker: str, start: str, end: str) -> pd.DataFrame:
-    df = yf.download(
-        ticker,
-        start=start,
-        end=end,
-        interval="1d",
-        auto_adjust=True,   
-        progress=False,
-        group_by="column",  
-    )
-    if df is None or df.empty:
-        raise ValueError(f"Nenhum dado retornado para {ticker}")
+# nomes alternativos comuns em dumps de fornecedores
+COLUMN_ALIASES = {
+    "datetime": "date", "timestamp": "date", "time": "date",
+    "vol": "volume", "adj_close": "close_adj",
+}
 
+def normalize_ohlcv(df: pd.DataFrame, label: str = "") -> pd.DataFrame:
+    """
+    Normaliza um DataFrame OHLCV (Yahoo ou arquivo) para as colunas
+    date, open, high, low, close, volume; datas naive, ordenadas, sem close nulo.
+    A data pode vir no índice (Yahoo) ou numa coluna date/datetime/timestamp.
+    """
     if isinstance(df.columns, pd.MultiIndex):
-        flat = _flatten_multiindex_columns(df.columns)
-        df.columns = flat
+        df.columns = _flatten_multiindex_columns(df.columns)
     else:
         df.columns = [str(c).strip().lower() for c in df.columns]
+    df.columns = [COLUMN_ALIASES.get(c, c) for c in df.columns]
+
+    if "date" not in df.columns:
+        # só o índice de datas do Yahoo vira coluna; um RangeIndex viraria 1970-01-01
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError(
+                f"coluna de data ausente para {label} (date/datetime/timestamp). "
+                f"Colunas recebidas: {list(df.columns)}"
+            )
+        df.index.name = "date"
+        df = df.reset_index()
 
     if "volume" not in df.columns:
         df["volume"] = 0.0
 
     missing = [c for c in ["open", "high", "low", "close", "volume"] if c not in df.columns]
     if missing:
-        raise ValueError(f"Coluna(s) {missing} ausentes para {ticker}. Colunas recebidas: {list(df.columns)}")
+        raise ValueError(f"Coluna(s) {missing} ausentes para {label}. Colunas recebidas: {list(df.columns)}")
 
-    df.index.name = "date"
-    df = df.reset_index()
-    df["date"] = pd.to_datetime(df["date"])
+    dates = pd.to_datetime(df["date"])
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    df["date"] = dates
 
     df = df[["date", "open", "high", "low", "close", "volume"]].dropna(subset=["close"])
+    # datas repetidas (ex.: dumps concatenados) quebrariam o upsert em lote: fica a última
+    df = df.drop_duplicates(subset="date", keep="last")
     df = df.sort_values("date").reset_index(drop=True)
     return df
+
+# -- resiliência: timeout por chamada, retry com backoff + jitter, circuit breaker --
+YAHOO_TIMEOUT = float(os.getenv("YAHOO_TIMEOUT", "10"))
+YAHOO_RETRIES = int(os.getenv("YAHOO_RETRIES", "2"))
+breaker = CircuitBreaker(
+    "yahoo",
+    failure_threshold=int(os.getenv("YAHOO_CB_FAILURES", "5")),
+    reset_timeout=float(os.getenv("YAHOO_CB_RESET", "30")),
+)
+
+_fetch_seconds = metrics.histogram("yahoo_fetch_seconds", "Duração das chamadas ao Yahoo")
+_fetch_failures = metrics.counter("yahoo_fetch_failures_total", "Falhas transitórias (timeout/throttling/rede) do Yahoo")
+metrics.gauge("market_data_circuit_state", "Circuit breaker de market data (0=closed, 1=half_open, 2=open)") \
+    .set_function(lambda: CircuitBreaker.STATES[breaker.state], source="yahoo")
+
+
+# última chamada real ao Yahoo (lida pelo health check, sem gerar tráfego extra)
+last_call: dict = {}
+
+
+def _record_call(t0: float, error: Exception | None = None) -> float:
+    elapsed = time.perf_counter() - t0
+    _fetch_seconds.observe(elapsed, source="yahoo")
+    last_call.update({
+        "at": datetime.utcnow().isoformat(timespec="seconds"),
+        "latency_ms": round(elapsed * 1000, 1),
+        "ok": error is None,
+        "error": str(error) if error else None,
+    })
+    return elapsed
+
+
+class MarketDataError(RuntimeError):
+    """Falha transitória do provedor (timeout, throttling, rede): conta para o circuit breaker."""
+
+
+# erros "de dado" do yfinance (ticker/período sem cotação) não indicam indisponibilidade
+_NO_DATA_HINTS = ("delisted", "no data found", "no price data", "symbol may be", "invalid")
+
+
+def _download(ticker: str, start: str, end: str, interval: str = "1d") -> pd.DataFrame:
+    import yfinance as yf  # pesado: só carrega quando há download
+    df = yf.download(
+        ticker,
+        start=start,
+        end=end,
+        interval=interval,
+        auto_adjust=True,   
+        progress=False,
+        group_by="column",  
+        threads=False,
+        timeout=YAHOO_TIMEOUT,
+    )
+    if df is None or df.empty:
+        # yf.download engole exceções e devolve vazio; o motivo fica em shared._ERRORS
+        errors = getattr(getattr(yf, "shared", None), "_ERRORS", None) or {}
+        err = str(errors.get(ticker) or errors.get(ticker.upper()) or "")
+        if err and not any(h in err.lower() for h in _NO_DATA_HINTS):
+            raise MarketDataError(f"Yahoo falhou para {ticker}: {err}")
+        raise ValueError(f"Nenhum dado retornado para {ticker}")
+    return df
+
+
+TRANSIENT_ERRORS = (MarketDataError, TimeoutError, ConnectionError, OSError)
+
+
+def _attempt(ticker: str, start: str, end: str, interval: str = "1d") -> pd.DataFrame:
+    t0 = time.perf_counter()
+    try:
+        df = breaker.call(
+            call_with_timeout, _download, YAHOO_TIMEOUT * 1.5, ticker, start, end, interval,
+            failure_on=TRANSIENT_ERRORS,
+        )
+    except CircuitOpenError:
+        raise
+    except TRANSIENT_ERRORS as e:
+        _fetch_failures.inc(source="yahoo")
+        _record_call(t0, e)
+        raise
+    _record_call(t0)
+    return df
+
+
+def _ping_download(ticker: str) -> None:
+    import yfinance as yf
+    df = yf.download(ticker, period="5d", interval="1d", progress=False, auto_adjust=True,
+                     threads=False, timeout=YAHOO_TIMEOUT)
+    if df is None or df.empty:
+        raise MarketDataError(f"Yahoo sem resposta para {ticker}")
+
+
+def ping(ticker: str = "AAPL") -> float:
+    """Latência (ms) de um download mínimo, pelo mesmo timeout/circuit breaker do fetch."""
+    t0 = time.perf_counter()
+    try:
+        breaker.call(call_with_timeout, _ping_download, YAHOO_TIMEOUT * 1.5, ticker, failure_on=TRANSIENT_ERRORS)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        _record_call(t0, e)
+        raise
+    return _record_call(t0) * 1000
+
+
+# o Yahoo limita o período por requisição intraday: 1m em janelas de 7 dias, demais em ~60
+INTRADAY_WINDOW_DAYS = {"1m": 7}
+INTRADAY_DEFAULT_WINDOW = 59
+
+
+def _windows(start: str | None, end: str | None, days: int) -> list[tuple[str, str]]:
+    end_d = datetime.fromisoformat(end) if end else datetime.utcnow()
+    start_d = datetime.fromisoformat(start) if start else end_d - timedelta(days=days)
+    out = []
+    while start_d < end_d:
+        stop = min(start_d + timedelta(days=days), end_d)
+        out.append((start_d.strftime("%Y-%m-%d"), stop.strftime("%Y-%m-%d")))
+        start_d = stop
+    return out
+
+
+def fetch_prices(ticker: str, start: str, end: str, interval: str = "1d") -> pd.DataFrame:
+    """
+    OHLCV do Yahoo (diário por padrão; intraday em janelas, ver INTRADAY_WINDOW_DAYS).
+    Falhas transitórias são repetidas (YAHOO_RETRIES, backoff com jitter); com o circuito
+    aberto levanta CircuitOpenError imediatamente (ver app.services.market_data para o
+    fallback com preços armazenados).
+    """
+    if interval == "1d":
+        windows = [(start, end)]
+    else:
+        windows = _windows(start, end, INTRADAY_WINDOW_DAYS.get(interval, INTRADAY_DEFAULT_WINDOW))
+    frames = []
+    for s, e in windows:
+        try:
+            df = retry_call(
+                lambda: _attempt(ticker, s, e, interval),
+                retries=YAHOO_RETRIES,
+                retry_on=TRANSIENT_ERRORS,
+            )
+        except ValueError:
+            if len(windows) == 1:
+                raise
+            continue  # janela sem pregão (feriados/fim de semana)
+        df.index.name = "date"
+        frames.append(normalize_ohlcv(df, ticker))
+    if not frames:
+        raise ValueError(f"Nenhum dado retornado para {ticker} ({interval})")
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates(subset="date", keep="last").sort_values("date").reset_index(drop=True)
@@ -0,0 +1,189 @@
+# app/sql_stats.py
+"""
+Instrumentação de SQL por requisição via eventos da engine do SQLAlchemy.
+
+O middleware abre um `QueryStats` num contextvar; os eventos before/after_cursor_execute
+(registrados na classe Engine: cobrem a engine síncrona, a `sync_engine` da assíncrona e
+as engines dos testes) somam número de statements, tempo no banco e os mais lentos.
+O contexto acompanha a requisição no threadpool (anyio copia o contexto) e no greenlet
+de AsyncSession.run_sync.
+
+- Statements acima de SQL_SLOW_MS (padrão 200) são logados com os parâmetros.
+- A mesma forma de statement (texto parametrizado) repetida SQL_N_PLUS_ONE vezes
+  (padrão 10) numa requisição é sinalizada como N+1 (log + métrica), uma vez por forma.
+- Totais vão para /metrics; com SQL_STATS_HEADERS=1 (padrão em APP_MODE=dev) também
+  para os headers X-DB-Queries, X-DB-Time-Ms e X-DB-Slowest-Ms.
+"""
+from __future__ import annotations
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))
+N_PLUS_ONE = int(os.getenv("SQL_N_PLUS_ONE", "10"))
+KEEP_SLOWEST = 3
+PARAMS_REPR_MAX = 500
+
+_queries = metrics.histogram(
+    "sql_queries_per_request", "Statements SQL por requisição",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000),
+)
+_db_seconds = metrics.histogram("sql_request_db_seconds", "Tempo no banco por requisição")
+_slow = metrics.counter("sql_slow_queries_total", "Statements acima de SQL_SLOW_MS")
+_n_plus_one = metrics.counter("sql_n_plus_one_total", "Formas de statement repetidas (N+1) por rota")
+
+
+class QueryStats:
+    """Acumulador de uma requisição (ou de qualquer bloco via `track()`)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: list[tuple[float, str]] = []   # (segundos, statement), maior primeiro
+        self.shapes: Counter[str] = Counter()
+        self.flagged: set[str] = set()
+        self._lock = threading.Lock()                # run_in_threadpool + tarefas em paralelo
+
+    def record(self, statement: str, seconds: float) -> bool:
+        """Soma um statement; True se a forma acabou de cruzar o limite de N+1."""
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if len(self.slowest) < KEEP_SLOWEST or seconds > self.slowest[-1][0]:
+                self.slowest.append((seconds, statement))
+                self.slowest.sort(key=lambda x: -x[0])
+                del self.slowest[KEEP_SLOWEST:]
+            self.shapes[statement] += 1
+            if self.shapes[statement] >= N_PLUS_ONE and statement not in self.flagged:
+                self.flagged.add(statement)
+                return True
+            return False
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 2),
+            "slowest": [{"ms": round(s * 1000, 2), "statement": _short(st)} for s, st in self.slowest],
+            "repeated": {_short(st): n for st, n in self.shapes.items() if n >= N_PLUS_ONE},
+        }
+
+
+_current: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("sql_stats", default=None)
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+class track:
+    """`with sql_stats.track() as st:` mede os statements do bloco (jobs, testes, scripts)."""
+
+    def __enter__(self) -> QueryStats:
+        self.stats = QueryStats()
+        self._token = _current.set(self.stats)
+        return self.stats
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+
+
+def _short(statement: str, limit: int = 200) -> str:
+    s = " ".join(statement.split())
+    return s if len(s) <= limit else s[:limit] + "..."
+
+
+def _params_repr(params) -> str:
+    r = repr(params)
+    return r if len(r) <= PARAMS_REPR_MAX else r[:PARAMS_REPR_MAX] + "..."
+
+
+# --------- Eventos da engine ---------
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_stats_t0", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_stats_t0")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if elapsed * 1000 >= SLOW_MS:
+        _slow.inc()
+        logger.warning(f"[SQL] lento {elapsed * 1000:.1f}ms: {_short(statement, 1000)} params={_params_repr(parameters)}")
+    stats = _current.get()
+    if stats is not None and stats.record(statement, elapsed):
+        logger.warning(f"[SQL] possível N+1: statement repetido {N_PLUS_ONE}x na mesma requisição: {_short(statement)}")
+
+
+def _on_error(exception_context):
+    # statement com erro não chega ao after_cursor_execute: descarta o início pendente
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_stats_t0"):
+        conn.info["sql_stats_t0"].pop()
+
+
+_installed = False
+
+
+def install() -> None:
+    """Registra os eventos (idempotente)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before)
+    event.listen(Engine, "after_cursor_execute", _after)
+    event.listen(Engine, "handle_error", _on_error)
+    _installed = True
+
+
+# --------- Middleware ASGI ---------
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class SQLStatsMiddleware:
+    """Abre um QueryStats por requisição HTTP e publica os totais (métricas e, opcionalmente, headers)."""
+
+    def __init__(self, app, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def _send(message):
+            if self.headers and message["type"] == "http.response.start":
+                # totais até o início da resposta (streams ainda podem consultar depois)
+                slowest = stats.slowest[0][0] * 1000 if stats.slowest else 0.0
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+                    (b"x-db-slowest-ms", f"{slowest:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            route = _route_label(scope)
+            _queries.observe(stats.count, route=route)
+            _db_seconds.observe(stats.seconds, route=route)
+            if stats.flagged:
+                _n_plus_one.inc(len(stats.flagged), route=route)
+                logger.warning(f"[SQL] {scope.get('method')} {route}: {stats.count} statements, "
+                               f"{stats.seconds * 1000:.1f}ms no banco, repetidos: {stats.summary()['repeated']}")
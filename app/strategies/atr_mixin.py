@@ -1,9 +1,29 @@
 # app/strategies/atr_mixin.py
+from app.indicators import size_and_stop
+from app.strategies.bt_indicators import Atr
+
+
 class AtrRiskMixin:
     """
-    Mixin opcional para controle por ATR. Aqui só a interface (sem implementação).
-    #TODO dimensionamento de posição pelo ATR e gatilho de stop.
+    Stop e dimensionamento de posição por risco, comuns às estratégias bt.
+    A regra fica em app.indicators.size_and_stop (a mesma usada pelo modo live);
+    cada estratégia só informa o stop alternativo (`_alt_stop`) para stop_method != "atr".
     """
-    def setup_atr_risk(self, atr_period: int, risk_fraction: float):
-        """ #TODO Preparar indicadores/variáveis internas de risco (stub)."""
-        pass
+    def setup_atr_risk(self):
+        self.atr = Atr(self.data, period=self.p.atr_period) if self.p.stop_method == "atr" else None
+
+    def _alt_stop(self):
+        return None
+
+    def _calc_size_and_stop(self):
+        return size_and_stop(
+            float(self.data.close[0]),
+            stop_method=self.p.stop_method,
+            atr=float(self.atr[0]) if self.atr is not None else None,
+            alt_stop=self._alt_stop(),
+            atr_mult=self.p.atr_mult,
+            risk_pct=self.p.risk_pct,
+            equity=float(self.broker.getvalue()),
+            cash=float(self.broker.get_cash()),
+            lot_size=self.p.lot_size,
+        )
@@ -0,0 +1,113 @@
+# app/strategies/bt_indicators.py
+"""
+Indicadores Backtrader sobre app.indicators.
+
+`once()` (modo runonce, padrão do Cerebro) calcula a série inteira com as funções NumPy;
+`next()` (runonce=False / dados ao vivo) alimenta a versão incremental barra a barra.
+As duas dão os mesmos valores, então o resultado do backtest não depende do modo.
+"""
+from array import array
+
+import backtrader as bt
+import numpy as np
+
+from app import indicators as ind
+
+
+def _src(line, end: int) -> np.ndarray:
+    # cópia: uma view viva sobre o array.array impediria o Backtrader de redimensioná-lo
+    return np.frombuffer(line.array, dtype=float, count=end).copy()
+
+
+def _fill(line, start: int, end: int, values: np.ndarray) -> None:
+    line.array[start:end] = array("d", values[start:end].tolist())
+
+
+class Sma(bt.Indicator):
+    lines = ("sma",)
+    params = (("period", 20),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._stream = ind.Sma(self.p.period)
+
+    def prenext(self):
+        self.lines.sma[0] = self._stream.update(self.data[0])
+
+    next = prenext
+
+    def once(self, start, end):
+        _fill(self.lines.sma, start, end, ind.sma(_src(self.data, end), self.p.period))
+
+
+class Atr(bt.Indicator):
+    """ATR de Wilder (mesma definição do bt.ind.ATR)."""
+    lines = ("atr",)
+    params = (("period", 14),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period + 1)
+        self._stream = ind.WilderAtr(self.p.period)
+
+    def prenext(self):
+        d = self.data
+        self.lines.atr[0] = self._stream.update(d.high[0], d.low[0], d.close[0])
+
+    next = prenext
+
+    def once(self, start, end):
+        d = self.data
+        values = ind.wilder_atr(_src(d.high, end), _src(d.low, end), _src(d.close, end), self.p.period)
+        _fill(self.lines.atr, start, end, values)
+
+
+class Highest(bt.Indicator):
+    lines = ("highest",)
+    params = (("period", 20),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._stream = ind.Highest(self.p.period)
+
+    def prenext(self):
+        self.lines.highest[0] = self._stream.update(self.data[0])
+
+    next = prenext
+
+    def once(self, start, end):
+        _fill(self.lines.highest, start, end, ind.highest(_src(self.data, end), self.p.period))
+
+
+class Lowest(bt.Indicator):
+    lines = ("lowest",)
+    params = (("period", 20),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period)
+        self._stream = ind.Lowest(self.p.period)
+
+    def prenext(self):
+        self.lines.lowest[0] = self._stream.update(self.data[0])
+
+    next = prenext
+
+    def once(self, start, end):
+        _fill(self.lines.lowest, start, end, ind.lowest(_src(self.data, end), self.p.period))
+
+
+class Momentum(bt.Indicator):
+    """close / close[-period] - 1 (equivale ao bt.ind.PercentChange)."""
+    lines = ("momentum",)
+    params = (("period", 60),)
+
+    def __init__(self):
+        self.addminperiod(self.p.period + 1)
+        self._stream = ind.Momentum(self.p.period)
+
+    def prenext(self):
+        self.lines.momentum[0] = self._stream.update(self.data[0])
+
+    next = prenext
+
+    def once(self, start, end):
+        _fill(self.lines.momentum, start, end, ind.momentum(_src(self.data, end), self.p.period))
@@ -1,7 +1,10 @@
 
 import backtrader as bt
 
-class DonchianBreakout(bt.Strategy):
+from app.strategies import bt_indicators as ind
+from app.strategies.atr_mixin import AtrRiskMixin
+
+class DonchianBreakout(AtrRiskMixin, bt.Strategy):
     params = dict(
         # sinal
         n=20,                 
@@ -18,44 +21,18 @@ class DonchianBreakout(bt.Strategy):
 
     def __init__(self):
      
-        self.dc_high = bt.ind.Highest(self.data.high, period=self.p.n)
-        self.dc_low  = bt.ind.Lowest(self.data.low, period=self.p.n)
+        self.dc_high = ind.Highest(self.data.high, period=self.p.n)
+        self.dc_low  = ind.Lowest(self.data.low, period=self.p.n)
 
-    
-        self.atr = bt.ind.ATR(self.data, period=self.p.atr_period) if self.p.stop_method == "atr" else None
+        self.setup_atr_risk()
 
         self.entry_order = None
         self.stop_order  = None
         self._pending_stop_price = None
 
-    # ---------------- sizing + stop calc ----------------
-    def _calc_size_and_stop(self):
-        price = float(self.data.close[0])
-
-        if self.p.stop_method == "atr":
-            if self.atr is None or self.atr[0] <= 0:
-                return 0, None
-            stop_price = price - float(self.p.atr_mult) * float(self.atr[0])
-        else:
-        
-            stop_price = float(self.dc_low[0])
-
-        risk_per_share = max(price - stop_price, 0.0)
-        if risk_per_share <= 0:
-            return 0, stop_price
-
-        equity = float(self.broker.getvalue())
-        cash   = float(self.broker.get_cash())
-        risk_cash = equity * float(self.p.risk_pct)
-
-        size_risk = int(risk_cash // risk_per_share)
-        size_cash = int(cash // price)
-        size = max(0, min(size_risk, size_cash))
-
-        if size < self.p.lot_size:
-            return 0, stop_price
-        size = (size // self.p.lot_size) * self.p.lot_size
-        return size, stop_price
+    def _alt_stop(self):
+        # stop na banda inferior do canal
+        return float(self.dc_low[0])
 
     # ---------------- lógica de trading ----------------
     def _long_entry_signal(self) -> bool:
@@ -1,7 +1,10 @@
 # app/strategies/momentum.py
 import backtrader as bt
 
-class MomentumStrategy(bt.Strategy):
+from app.strategies import bt_indicators as ind
+from app.strategies.atr_mixin import AtrRiskMixin
+
+class MomentumStrategy(AtrRiskMixin, bt.Strategy):
     params = dict(
         lookback=60,            # janela para retorno acumulado
         thresh=0.0,             # só entra se retorno > thresh (0.0 = positivo)
@@ -18,46 +21,19 @@ class MomentumStrategy(bt.Strategy):
 
     def __init__(self):
         # simples momentum: retorno acumulado em janela (close / close[-lookback] - 1)
-        self.mom = bt.ind.PercentChange(self.data.close, period=self.p.lookback)
+        self.mom = ind.Momentum(self.data.close, period=self.p.lookback)
 
         # stops auxiliares
-        self.atr = bt.ind.ATR(self.data, period=self.p.atr_period) if self.p.stop_method == "atr" else None
-        self.ma  = bt.ind.SMA(self.data.close, period=self.p.ma_period) if self.p.stop_method == "ma" else None
+        self.setup_atr_risk()
+        self.ma  = ind.Sma(self.data.close, period=self.p.ma_period) if self.p.stop_method == "ma" else None
 
         self.entry_order = None
         self.stop_order  = None
         self._pending_stop_price = None
 
-    # ---------------- sizing + stop calc ----------------
-    def _calc_size_and_stop(self):
-        price = float(self.data.close[0])
-
-        if self.p.stop_method == "atr":
-            if self.atr is None or self.atr[0] <= 0:
-                return 0, None
-            stop_price = price - float(self.p.atr_mult) * float(self.atr[0])
-        else:
-            # stop pela média móvel escolhida
-            if self.ma is None or self.ma[0] <= 0:
-                return 0, None
-            stop_price = float(self.ma[0])
-
-        risk_per_share = max(price - stop_price, 0.0)
-        if risk_per_share <= 0:
-            return 0, stop_price
-
-        equity = float(self.broker.getvalue())
-        cash   = float(self.broker.get_cash())
-        risk_cash = equity * float(self.p.risk_pct)
-
-        size_risk = int(risk_cash // risk_per_share)
-        size_cash = int(cash // price)
-        size = max(0, min(size_risk, size_cash))
-
-        if size < self.p.lot_size:
-            return 0, stop_price
-        size = (size // self.p.lot_size) * self.p.lot_size
-        return size, stop_price
+    def _alt_stop(self):
+        # stop pela média móvel escolhida
+        return float(self.ma[0]) if self.ma is not None else None
 
     # ---------------- lógica de trading ----------------
     def _long_entry_signal(self) -> bool:
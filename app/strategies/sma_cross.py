@@ -1,7 +1,10 @@
 # app/strategies/sma_cross.py
 import backtrader as bt
 
-class SmaCrossStrategy(bt.Strategy):
+from app.strategies import bt_indicators as ind
+from app.strategies.atr_mixin import AtrRiskMixin
+
+class SmaCrossStrategy(AtrRiskMixin, bt.Strategy):
     params = dict(
         fast=20,
         slow=100,
@@ -15,45 +18,19 @@ class SmaCrossStrategy(bt.Strategy):
     )
 
     def __init__(self):
-        self.sma_fast = bt.ind.SMA(self.data.close, period=self.p.fast)
-        self.sma_slow = bt.ind.SMA(self.data.close, period=self.p.slow)
+        self.sma_fast = ind.Sma(self.data.close, period=self.p.fast)
+        self.sma_slow = ind.Sma(self.data.close, period=self.p.slow)
         self.xover    = bt.ind.CrossOver(self.sma_fast, self.sma_slow)
 
-        self.atr = bt.ind.ATR(self.data, period=self.p.atr_period) if self.p.stop_method == "atr" else None
+        self.setup_atr_risk()
 
         self.entry_order = None
         self.stop_order  = None
         self._pending_stop_price = None
 
-    # ---------------- sizing + stop calc ----------------
-    def _calc_size_and_stop(self):
-        price = float(self.data.close[0])
-
-        if self.p.stop_method == "atr":
-            if self.atr is None or self.atr[0] <= 0:
-                return 0, None
-            stop_price = price - float(self.p.atr_mult) * float(self.atr[0])
-        else:
-            # stop por média lenta (exemplo alternativo)
-            stop_price = float(self.sma_slow[0])
-
-        risk_per_share = max(price - stop_price, 0.0)
-        if risk_per_share <= 0:
-            return 0, stop_price
-
-        equity = float(self.broker.getvalue())
-        cash   = float(self.broker.get_cash())
-        risk_cash = equity * float(self.p.risk_pct)
-
-        size_risk = int(risk_cash // risk_per_share)
-        size_cash = int(cash // price)
-        size = max(0, min(size_risk, size_cash))
-
-        # arredonda por lote
-        if size < self.p.lot_size:
-            return 0, stop_price
-        size = (size // self.p.lot_size) * self.p.lot_size
-        return size, stop_price
+    def _alt_stop(self):
+        # stop por média lenta (exemplo alternativo)
+        return float(self.sma_slow[0])
 
     # ---------------- lógica de trading ----------------
     def next(self):
@@ -0,0 +1,125 @@
+# app/telemetry.py
+"""
+Telemetria de execução de backtests: tempo de parede por fase (fetch, simulate, persist),
+barras, trades, pico de RSS e engine. Gravada em `backtest_telemetry` (crud.save_backtest_telemetry)
+e agregada por GET /stats/performance; as fases também vão para /metrics.
+
+Pico de RSS é do processo (VmHWM no Linux, ru_maxrss nos demais). O pico é zerado no início
+de uma execução quando nenhuma outra está em andamento no processo; com execuções
+concorrentes (threads da API) o valor cobre todas elas.
+
+Execuções com profiling (cProfile + tracemalloc, várias vezes mais lentas) são gravadas
+com `profiled=True` e ficam fora de /stats/performance e das métricas.
+"""
+from __future__ import annotations
+import contextlib
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app import metrics
+
+PHASES = ("fetch", "simulate", "persist")
+
+_phase_seconds = metrics.histogram("backtest_phase_seconds", "Tempo de parede por fase do backtest")
+_bars = metrics.counter("backtest_bars_total", "Barras simuladas")
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def _read_hwm() -> int | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def peak_rss_bytes() -> int:
+    hwm = _read_hwm()
+    if hwm is not None:
+        return hwm
+    import resource  # indisponível no Windows; lá o /proc também não existe
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024   # macOS em bytes, Linux em KiB
+
+
+def _reset_peak_rss() -> None:
+    # "5" em clear_refs zera o VmHWM (Linux >= 4.0); sem permissão, fica o pico do processo
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+@dataclass
+class RunTelemetry:
+    strategy_type: str
+    engine: str = "backtrader"
+    timeframe: str | None = None
+    bars: int = 0
+    trades: int = 0
+    phases: dict[str, float] = field(default_factory=dict)
+    peak_rss_bytes: int | None = None
+    profiled: bool = False   # rodou sob app.profiling: tempos/RSS inflados, fora do relatório
+    _t0: float = field(default=0.0, repr=False)
+
+    def __enter__(self) -> "RunTelemetry":
+        global _in_flight
+        with _in_flight_lock:
+            if _in_flight == 0:
+                _reset_peak_rss()
+            _in_flight += 1
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _in_flight
+        self.peak_rss_bytes = peak_rss_bytes()
+        with _in_flight_lock:
+            _in_flight -= 1
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def absorb(self, result: dict) -> None:
+        """Engine, barras, trades e fases medidas dentro de backtest_engine.run_backtest."""
+        info = result.get("telemetry") or {}
+        self.engine = info.get("engine", self.engine)
+        self.bars = int(info.get("bars", 0))
+        self.trades = len(result.get("trades") or [])
+        for name, seconds in (info.get("phases") or {}).items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def record(self) -> dict:
+        """Campos de crud.save_backtest_telemetry; exporta as fases para /metrics (exceto execuções com profiling)."""
+        if not self.profiled:
+            for name, seconds in self.phases.items():
+                _phase_seconds.observe(seconds, phase=name, strategy_type=self.strategy_type, engine=self.engine)
+            _bars.inc(self.bars, strategy_type=self.strategy_type, engine=self.engine)
+        return {
+            "strategy_type": self.strategy_type,
+            "engine": self.engine,
+            "timeframe": self.timeframe,
+            "bars": self.bars,
+            "trades": self.trades,
+            **{f"{p}_seconds": self.phases.get(p) for p in PHASES},
+            "total_seconds": self.total_seconds,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "profiled": self.profiled,
+        }
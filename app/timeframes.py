@@ -0,0 +1,110 @@
+# app/timeframes.py
+"""
+Timeframes suportados e reamostragem vetorizada de OHLCV.
+
+- Intraday ("1m" ... "1h"): baixados do provedor e guardados compactados em
+  `intraday_chunks` (um registro por símbolo/intervalo/dia; ver crud_prices).
+- "1d": tabela `prices`.
+- "1wk", "1mo": reamostrados das barras diárias armazenadas.
+
+A reamostragem é uma redução por grupo (np.*.reduceat sobre os inícios de cada período),
+sem groupby do pandas. Sem imports pesados no topo: main valida o timeframe no startup.
+"""
+from __future__ import annotations
+
+INTRADAY_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "1h": 60}
+RESAMPLED = ("1wk", "1mo")
+TIMEFRAMES = (*INTRADAY_MINUTES, "1d", *RESAMPLED)
+# "M"/"1M" = mês (convenção do pandas); minutos são sempre minúsculos ("1m")
+ALIASES = {"60m": "1h", "D": "1d", "W": "1wk", "1w": "1wk", "1W": "1wk", "M": "1mo", "1M": "1mo"}
+
+# pregões por ano; intraday multiplica pelas barras por pregão observadas na série
+TRADING_DAYS = 252
+PERIODS_PER_YEAR = {"1d": TRADING_DAYS, "1wk": 52, "1mo": 12}
+
+
+def normalize(timeframe: str | None) -> str:
+    """"1d" por padrão; aceita aliases ("60m", "1w"); ValueError para timeframe desconhecido."""
+    tf = (timeframe or "1d").strip()
+    tf = ALIASES.get(tf, tf)
+    if tf not in TIMEFRAMES:
+        raise ValueError(f"Timeframe inválido: {timeframe} (use {', '.join(TIMEFRAMES)})")
+    return tf
+
+
+def is_intraday(timeframe: str) -> bool:
+    return timeframe in INTRADAY_MINUTES
+
+
+def periods_per_year(timeframe: str, dates=None) -> float:
+    """Fator de anualização (Sharpe): fixo para 1d/1wk/1mo; intraday usa barras/pregão da série."""
+    if timeframe in PERIODS_PER_YEAR:
+        return PERIODS_PER_YEAR[timeframe]
+    import numpy as np
+    if dates is None or not len(dates):
+        return TRADING_DAYS * 390 / INTRADAY_MINUTES[timeframe]   # pregão de 6h30
+    days = np.unique(np.asarray(dates, dtype="datetime64[D]"))
+    return TRADING_DAYS * len(dates) / len(days)
+
+
+def finer_intervals(timeframe: str) -> list[str]:
+    """Intervalos intraday que agregam exatamente em `timeframe`, do maior para o menor."""
+    target = INTRADAY_MINUTES[timeframe]
+    return [tf for tf, m in sorted(INTRADAY_MINUTES.items(), key=lambda kv: -kv[1])
+            if m < target and target % m == 0]
+
+
+def _intraday_buckets(ts, minutes: int):
+    """Início (epoch s) do balde de cada barra, alinhado à primeira barra do pregão (9:30, 10:00...)."""
+    import numpy as np
+    day = ts // 86400
+    starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    first = np.repeat(ts[starts], np.diff(np.r_[starts, len(ts)]))
+    width = 60 * minutes
+    return first + (ts - first) // width * width
+
+
+def period_keys(dates, timeframe: str):
+    """Chave do período de cada barra (barras consecutivas com a mesma chave formam um grupo)."""
+    import numpy as np
+    ts = np.asarray(dates, dtype="datetime64[s]").astype(np.int64)
+    day = ts // 86400
+    if timeframe in INTRADAY_MINUTES:
+        return _intraday_buckets(ts, INTRADAY_MINUTES[timeframe])
+    if timeframe == "1d":
+        return day
+    if timeframe == "1wk":
+        return (day + 3) // 7   # 1970-01-01 foi quinta: semanas de segunda a domingo
+    if timeframe == "1mo":
+        return np.asarray(dates, dtype="datetime64[M]").astype(np.int64)
+    raise ValueError(f"Timeframe inválido: {timeframe}")
+
+
+def resample_ohlcv(cols: dict, timeframe: str) -> dict:
+    """
+    Agrega colunas OHLCV ({"date": datetime64, "open": ..., "volume": ...}, ordenadas por
+    data) no timeframe pedido: open do primeiro, high máx., low mín., close do último,
+    volume somado. Rótulo: início do balde (intraday), o dia ("1d") ou o último pregão do
+    período ("1wk"/"1mo"), para que a barra só exista depois de fechada.
+    """
+    import numpy as np
+    dates = np.asarray(cols["date"], dtype="datetime64[s]")
+    if not len(dates):
+        return {k: np.asarray(v)[:0] for k, v in cols.items()}
+    keys = period_keys(dates, timeframe)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(dates)] - 1
+    if timeframe in INTRADAY_MINUTES:
+        label = keys[starts].astype("datetime64[s]")
+    elif timeframe == "1d":
+        label = dates[starts].astype("datetime64[D]").astype("datetime64[s]")
+    else:
+        label = dates[ends]
+    return {
+        "date": label,
+        "open": np.asarray(cols["open"], dtype=float)[starts],
+        "high": np.maximum.reduceat(np.asarray(cols["high"], dtype=float), starts),
+        "low": np.minimum.reduceat(np.asarray(cols["low"], dtype=float), starts),
+        "close": np.asarray(cols["close"], dtype=float)[ends],
+        "volume": np.add.reduceat(np.asarray(cols["volume"], dtype=float), starts),
+    }
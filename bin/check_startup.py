@@ -0,0 +1,86 @@
+# bin/check_startup.py
+"""
+Orçamento de startup da API: roda `python -X importtime -c "import app.main"` num
+processo limpo e falha se o import demorar/consumir mais que o orçamento ou se
+puxar dependências pesadas que devem ser carregadas sob demanda.
+
+    python bin/check_startup.py [--max-seconds 2.0] [--max-rss-mb 150]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# módulos que não podem ser importados só por carregar a API
+HEAVY_MODULES = ("pandas", "numpy", "backtrader", "matplotlib", "yfinance", "pyarrow")
+
+# VmHWM (pico de RSS) é zerado no exec; ru_maxrss herdaria o pico do processo pai
+_PROBE = (
+    "import resource, sys, app.main\n"
+    "try:\n"
+    "    hwm = next(l for l in open('/proc/self/status') if l.startswith('VmHWM'))\n"
+    "    rss = int(hwm.split()[1]) / 1024\n"
+    "except OSError:\n"
+    "    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+    "print('RSS_MB', rss)\n"
+    "print('LOADED', ','.join(m for m in %r if m in sys.modules))\n" % (HEAVY_MODULES,)
+)
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure() -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    deps = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if indent == 1:  # módulos de nível superior (sem dupla contagem)
+            total_us += cumulative
+        elif indent == 3:  # imports diretos de um módulo de nível superior
+            deps.append((cumulative, name))
+    out = dict(line.split(" ", 1) for line in proc.stdout.splitlines() if " " in line)
+    loaded = out.get("LOADED", "").strip()
+    return {
+        "import_seconds": total_us / 1e6,
+        "rss_mb": float(out["RSS_MB"]),
+        "heavy_loaded": [m for m in loaded.split(",") if m],
+        "slowest": sorted(deps, reverse=True)[:10],
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-seconds", type=float, default=float(os.getenv("STARTUP_MAX_SECONDS", "2.0")))
+    ap.add_argument("--max-rss-mb", type=float, default=float(os.getenv("STARTUP_MAX_RSS_MB", "150")))
+    args = ap.parse_args(argv)
+
+    r = measure()
+    print(f"import app.main: {r['import_seconds']:.3f}s, RSS {r['rss_mb']:.1f} MB")
+    for us, name in r["slowest"]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    errors = []
+    if r["heavy_loaded"]:
+        errors.append(f"dependências pesadas importadas no startup: {r['heavy_loaded']}")
+    if r["import_seconds"] > args.max_seconds:
+        errors.append(f"import {r['import_seconds']:.3f}s > orçamento {args.max_seconds}s")
+    if r["rss_mb"] > args.max_rss_mb:
+        errors.append(f"RSS {r['rss_mb']:.1f} MB > orçamento {args.max_rss_mb} MB")
+    for e in errors:
+        print("FALHA:", e)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+# bin/import_prices.py
+import argparse
+from app.db import SessionLocal
+from app.services import price_import
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Importa OHLCV de CSV/Parquet para a tabela prices (em blocos).")
+    ap.add_argument("path", help="arquivo .csv ou .parquet")
+    ap.add_argument("--ticker", help="ticker do arquivo, se não houver coluna ticker/symbol")
+    ap.add_argument("--format", choices=price_import.IMPORT_FORMATS, help="padrão: pela extensão")
+    ap.add_argument("--chunksize", type=int, default=50_000)
+    args = ap.parse_args()
+
+    fmt = price_import.detect_format(args.path, args.format)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            stats = price_import.import_prices(db, f, fmt=fmt, default_ticker=args.ticker, chunksize=args.chunksize)
+        print(
+            f"Importadas {stats['rows_upserted']} linhas de {stats['symbols']} tickers "
+            f"em {stats['seconds']}s ({stats['rows_per_sec']} linhas/s)."
+        )
+    finally:
+        db.close()
@@ -0,0 +1,67 @@
+# bin/load_test_reads.py
+"""
+Teste de carga dos endpoints de leitura: N clientes concorrentes repetindo GETs.
+
+    python bin/load_test_reads.py --url http://localhost:8000 --concurrency 64 --requests 4000
+
+Compare a API com leituras assíncronas (padrão) e com o fallback no threadpool
+(ASYNC_DB=0 no processo da API). `{id}` nos paths é trocado por --backtest-id.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = "/backtests?limit=50,/backtests/{id}/results,/strategies"
+
+
+async def _worker(client: httpx.AsyncClient, paths: list[str], counter: dict, stats: dict):
+    while counter["left"] > 0:
+        counter["left"] -= 1
+        path = paths[counter["left"] % len(paths)]
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        s = stats[path]
+        s["lat"].append(time.perf_counter() - t0)
+        s["errors"] += 0 if ok else 1
+
+
+def _pct(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) >= 2 else values[0] * 1000
+
+
+async def run(url: str, paths: list[str], concurrency: int, total: int) -> dict:
+    stats = {p: {"lat": [], "errors": 0} for p in paths}
+    counter = {"left": total}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        await client.get(paths[0])  # aquece conexões/caches
+        t0 = time.perf_counter()
+        await asyncio.gather(*[_worker(client, paths, counter, stats) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - t0
+    return {"elapsed": elapsed, "total": total, "stats": stats}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Carga concorrente nos endpoints de leitura.")
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--paths", default=DEFAULT_PATHS, help="lista separada por vírgula")
+    ap.add_argument("--backtest-id", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=4000)
+    args = ap.parse_args()
+
+    paths = [p.strip().replace("{id}", str(args.backtest_id)) for p in args.paths.split(",") if p.strip()]
+    out = asyncio.run(run(args.url, paths, args.concurrency, args.requests))
+    print(f"{out['total']} requisições, {args.concurrency} concorrentes, {out['elapsed']:.2f}s "
+          f"-> {out['total'] / out['elapsed']:.0f} req/s")
+    for path, s in out["stats"].items():
+        if s["lat"]:
+            print(f"  {path:40s} n={len(s['lat']):6d}  p50={_pct(s['lat'], 50):7.1f}ms  "
+                  f"p95={_pct(s['lat'], 95):7.1f}ms  erros={s['errors']}")
@@ -0,0 +1,10 @@
+from app.db import SessionLocal
+from app.crud import rebuild_backtest_summaries
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        n = rebuild_backtest_summaries(db)
+        print(f"Resumos reconstruídos: {n} backtests.")
+    finally:
+        db.close()
@@ -0,0 +1,54 @@
+"""
+Worker da fila de backtests. Rode quantos processos/hosts quiser apontando para o mesmo banco:
+
+    python bin/run_backtest_worker.py                # loop contínuo
+    python bin/run_backtest_worker.py --once         # drena a fila e sai
+    python bin/run_backtest_worker.py --processes 4  # 4 workers neste host
+    python bin/run_backtest_worker.py --once --profile  # grava cProfile + tracemalloc de cada backtest
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import signal
+import threading
+
+from app.jobs.backtest_worker import run_worker
+
+
+def _worker_main(args) -> int:
+    stop = threading.Event()
+    # SIGTERM/SIGINT: termina o backtest atual e sai (o heartbeat cuida do resto se morrer)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    return run_worker(
+        poll_interval=args.poll,
+        heartbeat_interval=args.heartbeat,
+        stale_after=args.stale_after,
+        max_attempts=args.max_attempts,
+        stop_when_empty=args.once,
+        stop_event=stop,
+        profile=args.profile,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de backtests (fila no banco)")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--poll", type=float, default=2.0, help="Intervalo (s) de polling com a fila vazia")
+    parser.add_argument("--heartbeat", type=float, default=10.0, help="Intervalo (s) do heartbeat")
+    parser.add_argument("--stale-after", type=float, default=60.0, help="Sem heartbeat por N s -> re-enfileira")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--once", action="store_true", help="Sai quando a fila estiver vazia")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profiling (cProfile + tracemalloc) de cada backtest; ver GET /backtests/{id}/profile")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+
+    if args.processes <= 1:
+        _worker_main(args)
+    else:
+        procs = [mp.Process(target=_worker_main, args=(args,), name=f"worker-{i}") for i in range(args.processes)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
@@ -1,9 +1,11 @@
+import sys
 from app.db import SessionLocal
 from app.jobs.daily_indicators import run_daily_indicators
 
 if __name__ == "__main__":
+    # tickers por argumento; sem argumentos, todos os cadastrados em `symbols`
     db = SessionLocal()
     try:
-        run_daily_indicators(db, tickers=["PETR4.SA","VALE3.SA","AAPL"])
+        run_daily_indicators(db, tickers=sys.argv[1:] or None)
     finally:
         db.close()
@@ -0,0 +1,21 @@
+"""
+Agendador isolado (com o agendador desligado nas réplicas da API, o padrão):
+
+    python bin/run_scheduler.py
+"""
+import logging
+import signal
+import threading
+
+from app.scheduler import get_scheduler
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    sched = get_scheduler()
+    sched.start()
+    stop.wait()
+    sched.stop(wait=True)
@@ -8,17 +8,24 @@ from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 os.environ.setdefault("BT_DEBUG", "0")  # logs silenciosos nos testes
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # app.db exige uma URL na importação
+os.environ.setdefault("SCHEDULER_ENABLED", "0")  # sem jobs agendados durante os testes
 
 # --- app imports
 from app.main import app
-from app.db import Base, get_db
+from app.db import Base, get_db, get_read_db, ThreadReadSession
 from app import models
 
 @pytest.fixture(scope="session")
 def engine_sqlite():
-    engine = create_engine("sqlite:///:memory:", future=True)
+    # StaticPool + check_same_thread: o TestClient executa os endpoints em outra thread
+    engine = create_engine(
+        "sqlite:///:memory:", future=True,
+        connect_args={"check_same_thread": False}, poolclass=StaticPool,
+    )
     Base.metadata.create_all(bind=engine)
     yield engine
     engine.dispose()
@@ -41,6 +48,8 @@ def client(db_session, monkeypatch):
         finally:
             pass
     app.dependency_overrides[get_db] = _get_db_override
+    # leituras "assíncronas" caem no fallback com a mesma sessão (SQLite em memória)
+    app.dependency_overrides[get_read_db] = lambda: ThreadReadSession(db_session)
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
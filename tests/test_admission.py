@@ -0,0 +1,47 @@
+# tests/test_admission.py
+import threading
+import anyio
+import pytest
+from fastapi import HTTPException
+from app import admission, metrics
+
+def test_gate_rejects_when_queue_full():
+    gate = admission.AdmissionGate("test_gate", max_concurrent=1, max_queue=1, retry_after=7)
+    release = threading.Event()
+    results, errors = [], []
+
+    def _work(i):
+        release.wait(5)
+        return i
+
+    async def _call(i):
+        try:
+            results.append(await gate.run(_work, i))
+        except HTTPException as e:
+            errors.append(e)
+
+    async def _main():
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(_call, 1)   # executa
+            await anyio.sleep(0.05)
+            tg.start_soon(_call, 2)   # fila
+            await anyio.sleep(0.05)
+            assert gate.in_flight == 1 and gate.queue_depth == 1
+            tg.start_soon(_call, 3)   # recusado
+            await anyio.sleep(0.05)
+            release.set()
+
+    anyio.run(_main)
+    assert sorted(results) == [1, 2]
+    assert len(errors) == 1
+    assert errors[0].status_code == 429
+    assert errors[0].headers["Retry-After"] == "7"
+    assert metrics.counter("admission_rejected_total", "").value(gate="test_gate") == 1
+
+def test_metrics_endpoint_exposes_admission(client):
+    assert client.get("/strategies").status_code == 200
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'admission_queue_depth{gate="backtest"} 0' in r.text
+    assert "# TYPE admission_rejected_total counter" in r.text
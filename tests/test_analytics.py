@@ -0,0 +1,55 @@
+# tests/test_analytics.py
+import numpy as np
+import pandas as pd
+from app import analytics
+
+def _equity(n=300, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100_000 * np.cumprod(1.0 + rng.normal(0.0005, 0.01, n))
+
+def test_rolling_mean_std_matches_pandas():
+    x = np.random.default_rng(1).normal(size=500)
+    mean, std = analytics.rolling_mean_std(x, 21)
+    s = pd.Series(x).rolling(21)
+    np.testing.assert_allclose(mean[20:], s.mean().values[20:], rtol=1e-9)
+    np.testing.assert_allclose(std[20:], s.std(ddof=0).values[20:], rtol=1e-6)
+    assert np.isnan(mean[:20]).all()
+
+def test_rolling_max_matches_pandas():
+    x = _equity()
+    out = analytics.rolling_max(x, 30)
+    ref = pd.Series(x).rolling(30).max().values
+    np.testing.assert_allclose(out[29:], ref[29:])
+
+def test_rolling_metrics_drawdown_and_sharpe():
+    eq = _equity()
+    res = analytics.rolling_metrics(eq, 63)
+    s = pd.Series(eq)
+    rets = s.pct_change()
+    ref_sharpe = rets.rolling(63).mean() / rets.rolling(63).std(ddof=0) * np.sqrt(252)
+    np.testing.assert_allclose(res["sharpe"][63:], ref_sharpe.values[63:], rtol=1e-6)
+    ref_dd = s / s.rolling(63).max() - 1.0
+    np.testing.assert_allclose(res["drawdown"][62:], ref_dd.values[62:])
+    assert (res["drawdown"][62:] <= 0).all()
+
+def test_downsample_indices_keeps_endpoints():
+    idx = analytics.downsample_indices(10_000, 500)
+    assert len(idx) <= 500
+    assert idx[0] == 0 and idx[-1] == 9_999
+    assert list(analytics.downsample_indices(5, 500)) == [0, 1, 2, 3, 4]
+
+def test_lttb_keeps_extremes_and_size():
+    n = 20_000
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 500.0)
+    y[7_777] = 5.0   # pico isolado
+    y[12_345] = -5.0  # vale isolado
+    idx = analytics.lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 7_777 in idx and 12_345 in idx
+
+def test_lttb_short_series_is_identity():
+    idx = analytics.lttb_indices(np.arange(10.0), np.arange(10.0), 50)
+    assert list(idx) == list(range(10))
@@ -0,0 +1,84 @@
+# tests/test_async_db.py
+import threading
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, http_cache, serialization, db as app_db
+from app.db import Base, get_db, get_read_db, async_url, pool_options
+from app.main import app
+
+aiosqlite = pytest.importorskip("aiosqlite")
+
+
+def test_async_url_and_pool_options(monkeypatch):
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    assert async_url("postgresql+psycopg2://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+    assert async_url("sqlite:////tmp/dev.db") == "sqlite+aiosqlite:////tmp/dev.db"
+    assert async_url("sqlite://") is None and async_url("mysql://x") is None
+    monkeypatch.setenv("ASYNC_DATABASE_URL", "postgresql+asyncpg://ro@replica/db")
+    assert async_url("postgresql://u@h/db") == "postgresql+asyncpg://ro@replica/db"
+
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "600")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+    opts = pool_options("postgresql://u@h/db")
+    assert (opts["pool_size"], opts["max_overflow"], opts["pool_recycle"], opts["pool_pre_ping"]) == (20, 0, 600, False)
+    assert pool_options("sqlite:///x.db") == {"pool_pre_ping": False}
+
+
+def test_read_endpoints_through_async_engine(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    with Session() as s:
+        for i in range(3):
+            bt = crud.create_backtest_record(
+                s, ticker=f"ASY{i}.SA", start_date="2021-01-01", end_date="2021-12-31",
+                strategy_type="sma_cross", strategy_params={"fast": 5}, initial_cash=1e5, commission=0.0, timeframe="1d",
+            )
+            crud.save_metrics(s, bt.id, {"total_return": 0.1 * i, "sharpe": 1.0, "max_drawdown": -0.05})
+            crud.save_daily_positions(s, bt.id, [{"date": "2021-01-04", "position_size": 0, "cash": 1e5, "equity": 1e5, "drawdown": 0.0}])
+            crud.set_backtest_status(s, bt.id, "finished")
+        last_id = bt.id
+
+    def _sync_db():
+        with Session() as s:
+            yield s
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    app_db.configure_async_engine(async_engine)
+    app.dependency_overrides[get_db] = _sync_db
+    app.dependency_overrides.pop(get_read_db, None)
+    http_cache.body_cache.invalidate()  # ids deste banco podem coincidir com os do banco em memória
+    threads, payload = [], serialization.results_payload
+    monkeypatch.setattr(serialization, "results_payload",
+                        lambda *a, **k: threads.append(threading.get_ident()) or payload(*a, **k))
+    try:
+        with TestClient(app) as c:
+            loop_thread = c.portal.call(threading.get_ident)
+            rows = c.get("/backtests?limit=2").json()
+            assert [r["ticker"] for r in rows] == ["ASY2.SA", "ASY1.SA"]
+            nxt = c.get("/backtests?limit=2").headers["X-Next-Cursor"]
+            assert [r["ticker"] for r in c.get(f"/backtests?limit=2&cursor={nxt}").json()] == ["ASY0.SA"]
+
+            res = c.get(f"/backtests/{last_id}/results")
+            assert res.status_code == 200 and res.json()["metrics"]["total_return"] == pytest.approx(0.2)
+            # payload + orjson fora do event loop (thread de trabalho do anyio)
+            assert threads and all(t != loop_thread for t in threads)
+            assert c.get("/backtests/999999/results").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        app_db.configure_async_engine(None)
+        anyio.run(async_engine.dispose)
+        engine.dispose()
+
+    # mesmo resultado pelo fallback síncrono
+    with Session() as s:
+        assert crud.get_results_columns(s, last_id)["metrics"]["total_return"] == pytest.approx(0.2)
@@ -20,3 +20,22 @@ def test_engine_runs_with_fake_data(monkeypatch, fake_prices_df):
     assert "metrics" in res
     assert "equity_curve" in res
     assert isinstance(res["metrics"]["total_return"], float)
+
+def test_trade_excursions_segmented():
+    import pandas as pd
+    from app.backtest_engine import compute_trade_excursions
+    df = pd.DataFrame({
+        "date": pd.date_range("2021-01-01", periods=6),
+        "high": [11.0, 12.0, 13.0, 10.5, 10.0, 9.8],
+        "low":  [ 9.0,  9.5, 11.0,  9.0,  8.0, 9.5],
+    })
+    trades = [
+        {"open_date": "2021-01-02", "date": "2021-01-03", "side": "BUY", "price": 10.0, "stop_price": 9.0},
+        {"open_date": "2021-01-04", "date": "2021-01-06", "side": "BUY", "price": 10.0},
+    ]
+    compute_trade_excursions(df, trades)
+    assert abs(trades[0]["mfe"] - 0.3) < 1e-12 and abs(trades[0]["mae"] - (-0.05)) < 1e-12
+    assert trades[0]["bars_held"] == 1 and trades[0]["stop_distance"] == 1.0
+    assert abs(trades[1]["mae"] - (-0.2)) < 1e-12 and abs(trades[1]["mfe"] - 0.05) < 1e-12
+    assert trades[1]["bars_held"] == 2 and trades[1]["stop_distance"] is None
+    assert "stop_price" not in trades[0]
@@ -0,0 +1,95 @@
+# tests/test_backtest_worker.py
+import multiprocessing as mp
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.db import Base
+from app.jobs.backtest_worker import run_worker, process_one
+
+def _queue(db, n):
+    ids = []
+    for i in range(n):
+        bt = crud.create_backtest_record(
+            db, ticker="FAKE.SA", start_date="2021-01-01", end_date="2021-03-01",
+            strategy_type="sma_cross", strategy_params={"fast": 5, "slow": 20},
+            initial_cash=100_000.0, commission=0.0, timeframe="1d",
+        )
+        crud.set_backtest_status(db, bt.id, "queued")
+        ids.append(bt.id)
+    return ids
+
+def _worker_proc(url, worker_id, out):
+    engine = create_engine(url, future=True, connect_args={"timeout": 30})
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    out.put((worker_id, run_worker(factory, worker_id=worker_id, stop_when_empty=True, heartbeat_interval=0.2)))
+    engine.dispose()
+
+@pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="requer fork (fetch_prices fake herdado)")
+def test_workers_drain_queue_in_parallel(tmp_path, patch_fetch_prices):
+    url = f"sqlite:///{tmp_path / 'queue.db'}"
+    engine = create_engine(url, future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    with Session() as db:
+        ids = _queue(db, 12)
+
+    ctx = mp.get_context("fork")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_worker_proc, args=(url, f"w{i}", out)) for i in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=120)
+        assert p.exitcode == 0
+    counts = dict(out.get(timeout=5) for _ in procs)
+    assert sum(counts.values()) == len(ids)  # nenhum backtest processado duas vezes
+
+    with Session() as db:
+        bts = db.execute(select(models.Backtest).where(models.Backtest.id.in_(ids))).scalars().all()
+        assert {b.status for b in bts} == {"finished"}
+        assert all(b.attempts == 1 for b in bts)
+        n_metrics = db.execute(select(func.count()).select_from(models.Metric)).scalar_one()
+        assert n_metrics == len(ids)
+    engine.dispose()
+
+def test_stale_running_backtest_is_requeued_and_rerun(db_session, engine_sqlite, patch_fetch_prices):
+    (bt_id,) = _queue(db_session, 1)
+    # worker "morto": reservou, gravou resultado parcial e parou de enviar heartbeat
+    assert crud.claim_next_backtest(db_session, "dead:1").id == bt_id
+    crud.save_metrics(db_session, bt_id, {"total_return": 9.9, "sharpe": 9.9, "max_drawdown": 0.0})
+    bt = crud.get_backtest(db_session, bt_id)
+    bt.heartbeat_at = datetime.utcnow() - timedelta(minutes=10)
+    db_session.commit()
+
+    assert crud.claim_next_backtest(db_session, "w1") is None
+    assert crud.requeue_stale_backtests(db_session, timedelta(seconds=60)) == (1, 0)
+
+    factory = sessionmaker(bind=engine_sqlite, autoflush=False, future=True)
+    assert process_one(db_session, factory, "w1") == bt_id
+    db_session.expire_all()
+    bt = crud.get_backtest(db_session, bt_id)
+    assert (bt.status, bt.claimed_by, bt.attempts) == ("finished", "w1", 2)
+    metrics = db_session.execute(select(models.Metric).where(models.Metric.backtest_id == bt_id)).scalars().all()
+    assert len(metrics) == 1 and metrics[0].total_return != 9.9
+
+def test_requeue_gives_up_after_max_attempts(db_session):
+    (bt_id,) = _queue(db_session, 1)
+    bt = crud.claim_next_backtest(db_session, "dead:2")
+    bt.attempts = 3
+    bt.heartbeat_at = datetime.utcnow() - timedelta(minutes=10)
+    db_session.commit()
+    assert crud.requeue_stale_backtests(db_session, timedelta(seconds=60), max_attempts=3) == (0, 1)
+    db_session.refresh(bt)
+    assert bt.status == "error"
+
+def test_enqueue_endpoint(client):
+    r = client.post("/backtests/enqueue", json={
+        "ticker": "FAKE.SA", "start_date": "2021-01-01", "end_date": "2021-03-01",
+        "strategy_type": "sma_cross", "strategy_params": {"fast": 5, "slow": 20},
+    })
+    assert r.status_code == 202
+    assert r.json()["status"] == "queued"
@@ -16,6 +16,7 @@ def test_run_backtest_sma_cross(client, patch_fetch_prices):
     assert r.status_code == 200, r.text
     data = r.json()
     assert "id" in data and "status" in data
+    assert data["data_source"] == "yahoo" and data["stale"] is False
     bt_id = data["id"]
 
     r2 = client.get(f"/backtests/{bt_id}/results")
@@ -44,3 +45,237 @@ def test_list_backtests(client, patch_fetch_prices):
     arr = r2.json()
     assert isinstance(arr, list)
     assert len(arr) >= 1
+
+def test_backtest_rolling(client, patch_fetch_prices):
+    payload = {
+        "ticker": "FAKE3.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 5, "slow": 20},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+
+    r = client.get(f"/backtests/{bt_id}/rolling?window=10&max_points=20")
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["window"] == 10
+    assert data["total_points"] > 20
+    assert len(data["points"]) <= 20
+    assert data["points"][0]["sharpe"] is None
+    assert data["points"][-1]["drawdown"] is not None
+
+    assert client.get("/backtests/999999/rolling").status_code == 404
+
+def test_results_expose_trade_excursions(client, patch_fetch_prices):
+    payload = {
+        "ticker": "FAKE4.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 5, "slow": 20},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+    trades = client.get(f"/backtests/{bt_id}/results").json()["trades"]
+    for t in trades:
+        assert {"mae", "mfe", "bars_held", "stop_distance", "open_date"} <= set(t)
+        if t["mae"] is not None:
+            assert t["mae"] <= t["mfe"]
+
+def test_results_stream_ndjson(client, patch_fetch_prices):
+    payload = {
+        "ticker": "FAKE5.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 5, "slow": 20},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+
+    r = client.get(f"/backtests/{bt_id}/results/stream")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows[0]["type"] == "metrics"
+    full_daily = [x for x in rows if x["type"] == "daily"]
+    assert len(full_daily) == len(client.get(f"/backtests/{bt_id}/results").json()["daily_positions"])
+
+    r = client.get(f"/backtests/{bt_id}/results/stream?from=2021-01-10&to=2021-01-20&fields=equity&include=daily")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows and all(x["type"] == "daily" for x in rows)
+    assert all(set(x) == {"type", "date", "equity"} for x in rows)
+    assert rows[0]["date"] >= "2021-01-10" and rows[-1]["date"] < "2021-01-21"
+
+    assert client.get(f"/backtests/{bt_id}/results/stream?fields=bogus").status_code == 400
+
+def test_backtest_series_lttb(client, patch_fetch_prices):
+    payload = {
+        "ticker": "FAKE6.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 5, "slow": 20},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+
+    r = client.get(f"/backtests/{bt_id}/series?points=10")
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert len(data["equity"]) == 10 and len(data["drawdown"]) == 10
+    assert data["total_points"] > 10
+    assert data["price"] == []  # sem preços armazenados para o ticker
+    assert client.get(f"/backtests/{bt_id}/series?points=10").json() == data
+    assert client.get("/backtests/999999/series").status_code == 404
+
+def test_list_backtests_keyset_pagination(client, patch_fetch_prices):
+    payload = {
+        "ticker": "PAGE.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "momentum",
+        "strategy_params": {"lookback": 10},
+    }
+    created = {client.post("/backtests/run", json=payload).json()["id"] for _ in range(5)}
+
+    seen, cursor = [], None
+    while True:
+        url = "/backtests?ticker=PAGE.SA&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url)
+        assert r.status_code == 200
+        page = r.json()
+        seen += [x["id"] for x in page]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert set(seen) == created and len(seen) == len(created)
+    assert seen == sorted(seen, reverse=True)  # mesmo created_at => desempata por id desc
+
+    first = client.get("/backtests?ticker=PAGE.SA&status=finished&limit=1").json()[0]
+    assert first["metrics"] is not None and "sharpe" in first["metrics"]
+    assert client.get("/backtests?cursor=@@@").status_code == 400
+
+def test_leaderboard_from_summary(client, patch_fetch_prices):
+    base = {
+        "ticker": "LEAD3.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+    }
+    for fast in (3, 5, 8):
+        r = client.post("/backtests/run", json={**base, "strategy_params": {"fast": fast, "slow": 20}})
+        assert r.status_code == 200
+
+    r = client.get("/leaderboard?metric=total_return&strategy_type=sma_cross&exchange=B3&ticker=LEAD3.SA&limit=2")
+    assert r.status_code == 200, r.text
+    rows = r.json()
+    assert [x["rank"] for x in rows] == [1, 2]
+    assert rows[0]["metrics"]["total_return"] >= rows[1]["metrics"]["total_return"]
+    assert rows[0]["exchange"] == "B3" and rows[0]["params"]["slow"] == 20
+
+    asc = client.get("/leaderboard?metric=total_return&order=asc&ticker=LEAD3.SA").json()
+    assert asc[0]["metrics"]["total_return"] <= asc[-1]["metrics"]["total_return"]
+    assert client.get("/leaderboard?metric=bogus").status_code == 400
+
+def test_results_etag_and_conditional_get(client, patch_fetch_prices):
+    payload = {
+        "ticker": "ETAG.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 5, "slow": 20},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+
+    r = client.get(f"/backtests/{bt_id}/results", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert "immutable" in r.headers["cache-control"]
+    etag = r.headers["etag"]
+    assert r.json()["backtest_id"] == bt_id
+
+    r2 = client.get(f"/backtests/{bt_id}/results", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+    r3 = client.get(f"/backtests/{bt_id}/results", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r3.headers
+    assert r3.json() == r.json()
+    assert r3.headers["etag"] != etag  # representação diferente => ETag forte diferente
+
+def test_lru_cache_byte_budget():
+    from app.cache import LRUCache
+    c = LRUCache(maxsize=100, max_bytes=10, sizeof=len)
+    c.set("a", b"12345")
+    c.set("b", b"12345")
+    c.set("c", b"123")
+    assert c.get("a") is None and c.get("b") == b"12345"
+    assert c.total_bytes == 8
+    c.set("huge", b"x" * 11)
+    assert c.get("huge") is None
+
+def test_results_fast_path_matches_schema_and_columnar(client, db_session, patch_fetch_prices):
+    from app import crud, schemas
+    payload = {
+        "ticker": "FASTJ.SA",
+        "start_date": "2021-01-01",
+        "end_date": "2021-12-31",
+        "strategy_type": "sma_cross",
+        "strategy_params": {"fast": 3, "slow": 10},
+    }
+    bt_id = client.post("/backtests/run", json=payload).json()["id"]
+
+    fast = client.get(f"/backtests/{bt_id}/results").json()
+    res = crud.get_results(db_session, bt_id)
+    slow = schemas.BacktestResults(backtest_id=bt_id, **{k: res[k] for k in
+        ("metrics", "trades", "daily_positions", "equity_curve")}).model_dump(mode="json")
+    assert fast == slow
+
+    col = client.get(f"/backtests/{bt_id}/results?layout=columnar").json()
+    assert col["layout"] == "columnar" and "equity_curve" not in col
+    assert col["daily_positions"]["equity"] == [p["equity"] for p in fast["equity_curve"]]
+    assert col["trades"]["pnl"] == [t["pnl"] for t in fast["trades"]]
+    assert client.get(f"/backtests/{bt_id}/results?layout=xml").status_code == 422
+
+    # OpenAPI documenta os dois formatos (oneOf) e cada corpo casa com o seu
+    spec = client.get("/openapi.json").json()
+    ref = spec["paths"]["/backtests/{backtest_id}/results"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    one_of = spec["components"]["schemas"][ref["$ref"].rsplit("/", 1)[-1]]["oneOf"]
+    assert [r["$ref"].rsplit("/", 1)[-1] for r in one_of] == ["BacktestResults", "BacktestResultsColumnar"]
+    assert isinstance(schemas.BacktestResultsResponse.model_validate(fast).root, schemas.BacktestResults)
+    assert isinstance(schemas.BacktestResultsResponse.model_validate(col).root, schemas.BacktestResultsColumnar)
+
+def test_rebuild_summaries_in_batches():
+    from sqlalchemy import create_engine, delete, select
+    from sqlalchemy.orm import sessionmaker
+    from app import crud, models, sql_stats
+    from app.db import Base
+
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    with Session() as db:
+        db.add(models.Symbol(ticker="REB1", exchange="NYSE"))
+        ids = []
+        for i in range(5):
+            bt = crud.create_backtest_record(
+                db, ticker="REB1" if i % 2 else "REB2.SA", start_date="2021-01-01", end_date="2021-12-31",
+                strategy_type="sma_cross", strategy_params={"fast": i, "slow": 20}, initial_cash=1e5,
+                commission=0.0, timeframe="1d",
+            )
+            crud.save_metrics(db, bt.id, {"total_return": i / 10, "sharpe": 1.0, "max_drawdown": -0.1})
+            ids.append(bt.id)
+        db.execute(delete(models.BacktestSummary).where(models.BacktestSummary.backtest_id == ids[0]))
+        db.query(models.BacktestSummary).update({"sharpe": None, "exchange": None})
+        db.commit()
+
+        sql_stats.install()
+        with sql_stats.track() as st:
+            assert crud.rebuild_backtest_summaries(db, batch_size=2) == 5
+        assert st.count <= 3 * 3   # 3 páginas x (backtests, exchanges, upsert): nada por linha
+
+        rows = {s.backtest_id: s for s in db.execute(select(models.BacktestSummary)).scalars()}
+        assert sorted(rows) == ids
+        assert [rows[i].fast for i in ids] == [0, 1, 2, 3, 4]
+        assert all(s.sharpe == 1.0 for s in rows.values())
+        assert [rows[i].exchange for i in ids] == ["B3", "NYSE", "B3", "NYSE", "B3"]
+    engine.dispose()
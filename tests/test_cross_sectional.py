@@ -0,0 +1,103 @@
+# tests/test_cross_sectional.py
+import numpy as np
+import pandas as pd
+
+from app import cross_sectional as xs
+from app.crud_prices import ensure_symbol, bulk_upsert_prices
+
+
+def _universe(T=300, N=8, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0.0005, 0.02, (T, N)), axis=0)
+    close[:80, 0] = np.nan            # listado depois
+    close[rng.random((T, N)) < 0.02] = np.nan  # buracos
+    dates = np.array(pd.bdate_range("2020-01-01", periods=T), dtype="datetime64[D]")
+    return dates, close
+
+
+def _naive(close, rebal, weights, commission):
+    """Carteira em quantidades, barra a barra."""
+    prices = xs.forward_fill(close)
+    value, shares, cash = 1.0, np.zeros(close.shape[1]), 1.0
+    out, k = [], 0
+    for t in range(len(close)):
+        p = np.nan_to_num(prices[t])
+        value = cash + (shares * p).sum()
+        if k < len(rebal) and t == rebal[k]:
+            cur = shares * p / value
+            value *= 1 - commission * np.abs(weights[k] - cur).sum()
+            shares = np.where(weights[k] > 0, weights[k] * value / np.where(p > 0, p, 1), 0.0)
+            cash = value * (1 - weights[k].sum())
+            k += 1
+        out.append(value)
+    return np.array(out)
+
+
+def test_vectorized_simulation_matches_share_based_loop():
+    dates, close = _universe()
+    scores = xs.lookback_returns(xs.forward_fill(close), 40, skip=5)
+    scores[np.isnan(close)] = np.nan
+    rebal = xs.rebalance_indices(dates, "M")
+    rebal = rebal[rebal >= 40]
+    weights = xs.top_k_weights(scores[rebal], 3)
+    sim = xs.simulate_rebalanced(close, rebal, weights, commission=0.002)
+    np.testing.assert_allclose(sim["equity"], _naive(close, rebal, weights, 0.002), rtol=1e-10)
+    assert (sim["positions"][rebal[0]:] == 3).all()
+
+
+def test_ranking_top_k_and_rebalance_dates():
+    scores = np.array([[0.1, np.nan, 0.3, -0.2], [np.nan, np.nan, np.nan, np.nan]])
+    ranks = xs.rank_scores(scores)
+    np.testing.assert_array_equal(ranks[0], [2, np.nan, 1, 3])
+    assert np.isnan(ranks[1]).all()
+    w = xs.top_k_weights(scores, 2)
+    np.testing.assert_array_equal(w, [[0.5, 0, 0.5, 0], [0, 0, 0, 0]])
+
+    dates = np.array(pd.bdate_range("2024-01-01", "2024-03-31"), dtype="datetime64[D]")
+    assert [str(dates[i]) for i in xs.rebalance_indices(dates, "M")] == ["2024-01-31", "2024-02-29", "2024-03-29"]
+    assert str(dates[xs.rebalance_indices(dates, "W")[0]]) == "2024-01-05"  # sexta
+    assert list(xs.rebalance_indices(dates, 20)[:2]) == [19, 39]
+
+
+def test_momentum_rotation_picks_strongest_and_respects_start():
+    T = 260
+    dates = np.array(pd.bdate_range("2021-01-01", periods=T), dtype="datetime64[D]")
+    growth = np.array([0.002, 0.001, -0.001, 0.0])
+    close = 10 * np.cumprod(np.ones((T, 4)) + growth, axis=0)
+    r = xs.momentum_rotation(dates, ["A", "B", "C", "D"], close, lookback=20, top_k=2,
+                             rebalance="M", start=dates[100])
+    assert list(r["holdings"]) == ["A", "B"]
+    assert r["daily_positions"][0]["date"] == str(dates[100])
+    assert r["metrics"]["total_return"] > 0 and r["metrics"]["max_drawdown"] == 0.0
+
+
+def test_momentum_rotation_endpoint(client, db_session):
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2022-01-03", periods=200)
+    tickers = [f"XS{i}.SA" for i in range(5)]
+    for i, t in enumerate(tickers):
+        close = 20 * np.cumprod(1 + rng.normal(0.001 * (i - 2), 0.01, len(dates)))
+        df = pd.DataFrame({"date": dates, "open": close, "high": close, "low": close, "close": close, "volume": 1e5})
+        bulk_upsert_prices(db_session, ensure_symbol(db_session, t).id, df)
+
+    r = client.post("/portfolio/momentum", json={
+        "start_date": "2022-03-01", "end_date": "2022-12-31", "tickers": tickers,
+        "lookback": 20, "top_k": 2, "rebalance": "M", "commission": 0.001,
+    })
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["n_tickers"] == 5 and len(body["holdings"]) == 2 and body["rebalances"] >= 7
+
+    res = client.get(f"/backtests/{body['id']}/results").json()
+    assert res["daily_positions"][0]["date"].startswith("2022-03-01")
+    assert abs(res["metrics"]["total_return"] - body["metrics"]["total_return"]) < 1e-9
+
+    from app import models
+    tel = db_session.query(models.BacktestTelemetry).filter_by(backtest_id=body["id"]).one()
+    assert (tel.engine, tel.strategy_type, tel.profiled) == ("xs_numpy", "xs_momentum", False)
+    assert tel.bars % 5 == 0 and 5 * 150 < tel.bars <= 5 * 200   # pregões (com histórico) x tickers
+    assert tel.simulate_seconds > 0 and tel.persist_seconds > 0
+
+    bad = client.post("/portfolio/momentum", json={"start_date": "2022-03-01", "end_date": "2022-12-31",
+                                                   "tickers": tickers, "rebalance": "X"})
+    assert bad.status_code == 400
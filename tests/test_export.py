@@ -0,0 +1,48 @@
+# tests/test_export.py
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.crud_prices import ensure_symbol, bulk_upsert_prices
+
+PAYLOAD = {
+    "ticker": "EXP.SA",
+    "start_date": "2021-01-01",
+    "end_date": "2021-12-31",
+    "strategy_type": "sma_cross",
+    "strategy_params": {"fast": 5, "slow": 20},
+}
+
+def test_export_backtest_parquet_and_arrow(client, patch_fetch_prices):
+    bt_id = client.post("/backtests/run", json=PAYLOAD).json()["id"]
+    equity = [p["equity"] for p in client.get(f"/backtests/{bt_id}/results").json()["equity_curve"]]
+
+    r = client.get(f"/backtests/{bt_id}/export?format=parquet")
+    assert r.status_code == 200
+    assert "attachment" in r.headers["content-disposition"]
+    t = pq.read_table(io.BytesIO(r.content))
+    assert t.column("equity").to_pylist() == equity
+
+    r = client.get(f"/backtests/{bt_id}/export?format=arrow&table=trades")
+    t = pa.ipc.open_file(pa.BufferReader(r.content)).read_all()
+    assert "mae" in t.column_names
+
+def test_export_bulk_arrow_stream(client, patch_fetch_prices):
+    ids = [client.post("/backtests/run", json=PAYLOAD).json()["id"] for _ in range(3)]
+    r = client.get("/backtests/export?ids=" + ",".join(map(str, ids)))
+    assert r.status_code == 200
+    reader = pa.ipc.open_stream(pa.BufferReader(r.content))
+    batches = list(reader)
+    assert len(batches) == 3
+    t = pa.Table.from_batches(batches)
+    assert sorted(set(t.column("backtest_id").to_pylist())) == ids
+
+def test_export_prices(client, db_session, fake_prices_df):
+    sym = ensure_symbol(db_session, "EXPPRICE.SA")
+    bulk_upsert_prices(db_session, sym.id, fake_prices_df)
+    r = client.get("/prices/EXPPRICE.SA/export?format=parquet")
+    assert r.status_code == 200
+    t = pq.read_table(io.BytesIO(r.content))
+    assert t.num_rows == len(fake_prices_df)
+    assert t.column("close").to_pylist() == fake_prices_df["close"].tolist()
+    assert client.get("/prices/NOPE/export").status_code == 404
@@ -0,0 +1,50 @@
+# tests/test_health.py
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app import health, models
+
+def test_live_and_ready(client):
+    assert client.get("/health/live").json() == {"status": "ok"}
+    r = client.get("/health/ready")
+    assert r.status_code == 200
+    assert r.json()["status"] == "ready"
+
+def test_probe_snapshot_reports_queue_and_pool(engine_sqlite, db_session):
+    from app.crud import count_queued_backtests
+    before = count_queued_backtests(db_session)
+    db_session.add(models.Backtest(
+        ticker="FAKE.SA", start_date=datetime(2021, 1, 1), end_date=datetime(2021, 2, 1),
+        strategy_type="sma_cross", status="queued",
+    ))
+    db_session.commit()
+    probe = health.HealthProbe(engine_sqlite, sessionmaker(bind=engine_sqlite), interval=60)
+    assert probe.snapshot() == (None, None) and not probe.ready()
+    snap = probe.refresh()
+    assert snap["db"]["ok"] and snap["db"]["latency_ms"] >= 0
+    assert snap["queue"] == {"ok": True, "queued": before + 1}
+    assert snap["pool"]["class"] == "StaticPool"
+    assert snap["market_data"]["circuit"] in ("closed", "half_open", "open")
+    assert probe.ready()
+
+def test_probe_endpoints_do_not_touch_db(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(health, "probe_db", lambda engine: calls.append(1) or {"ok": True, "latency_ms": 0.0})
+    for _ in range(20):
+        client.get("/health/ready")
+        client.get("/health/deep")
+        client.get("/health")
+    assert calls == []  # probes só leem o snapshot
+
+def test_not_ready_when_db_probe_fails(client, monkeypatch):
+    probe = health.get_probe()
+    monkeypatch.setattr(health, "probe_db", lambda engine: {"ok": False, "error": "down"})
+    probe.refresh()
+    try:
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health").status_code == 503
+        assert client.get("/health/live").status_code == 200
+        deep = client.get("/health/deep").json()
+        assert deep["db"] == {"ok": False, "error": "down"}
+    finally:
+        monkeypatch.undo()
+        probe.refresh()
@@ -0,0 +1,92 @@
+# tests/test_indicators.py
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import indicators as ind
+
+
+def _ohlc(n=500, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.cumprod(1 + rng.normal(0, 0.02, n))
+    high = close * (1 + abs(rng.normal(0, 0.01, n)))
+    low = close * (1 - abs(rng.normal(0, 0.01, n)))
+    return high, low, close
+
+
+def _stream(obj, *series, reload_at=None):
+    out = []
+    for i, xs in enumerate(zip(*series)):
+        if i == reload_at:  # estado ida e volta por JSON no meio da série
+            obj = type(obj)(obj.period, json.loads(json.dumps(obj.dump())))
+        out.append(obj.update(*(float(x) for x in xs)))
+    return np.array(out)
+
+
+@pytest.mark.parametrize("make,batch,cols", [
+    (lambda: ind.Sma(20), lambda h, l, c: ind.sma(c, 20), "c"),
+    (lambda: ind.Highest(15), lambda h, l, c: ind.highest(h, 15), "h"),
+    (lambda: ind.Lowest(15), lambda h, l, c: ind.lowest(l, 15), "l"),
+    (lambda: ind.Momentum(30), lambda h, l, c: ind.momentum(c, 30), "c"),
+    (lambda: ind.WilderAtr(14), lambda h, l, c: ind.wilder_atr(h, l, c, 14), "hlc"),
+])
+def test_streaming_matches_batch_exactly(make, batch, cols):
+    h, l, c = _ohlc()
+    series = [{"h": h, "l": l, "c": c}[k] for k in cols]
+    expected = batch(h, l, c)
+    np.testing.assert_array_equal(_stream(make(), *series), expected)
+    np.testing.assert_array_equal(_stream(make(), *series, reload_at=137), expected)
+
+
+def test_batch_matches_reference_definitions():
+    h, l, c = _ohlc()
+    s = pd.Series(c)
+    np.testing.assert_allclose(ind.sma(c, 20), s.rolling(20).mean(), rtol=1e-12)
+    np.testing.assert_array_equal(ind.highest(h, 10), pd.Series(h).rolling(10).max())
+    np.testing.assert_allclose(ind.momentum(c, 5), s.pct_change(5), rtol=1e-12)
+    assert np.isnan(ind.wilder_atr(h, l, c, 14)[:14]).all() and not np.isnan(ind.wilder_atr(h, l, c, 14)[14])
+    assert np.isnan(ind.momentum([0.0, 1.0, 2.0], 1)[1])
+
+
+def test_size_and_stop():
+    kw = dict(atr_mult=2.0, risk_pct=0.01, equity=100000.0, cash=100000.0)
+    # risco por ação = 2 * 2.5 = 5 -> 1000 / 5 = 200 ações
+    assert ind.size_and_stop(50.0, stop_method="atr", atr=2.5, alt_stop=None, **kw) == (200, 45.0)
+    assert ind.size_and_stop(50.0, stop_method="atr", atr=2.5, alt_stop=None, lot_size=100, **kw) == (200, 45.0)
+    assert ind.size_and_stop(50.0, stop_method="atr", atr=float("nan"), alt_stop=None, **kw) == (0, None)
+    # limitado pelo caixa
+    assert ind.size_and_stop(50.0, stop_method="ma", atr=None, alt_stop=49.9,
+                             **{**kw, "cash": 5000.0}) == (100, 49.9)
+    assert ind.size_and_stop(50.0, stop_method="ma", atr=None, alt_stop=51.0, **kw) == (0, 51.0)
+
+
+@pytest.mark.parametrize("runonce", [True, False])
+def test_backtrader_wrappers_use_library(runonce):
+    import backtrader as bt
+    from app.strategies import bt_indicators
+
+    h, l, c = _ohlc(120)
+    df = pd.DataFrame({"open": c, "high": h, "low": l, "close": c, "volume": 1.0},
+                      index=pd.bdate_range("2022-01-03", periods=len(c)))
+    seen = {}
+
+    class _Probe(bt.Strategy):
+        def __init__(self):
+            self.i = dict(atr=bt_indicators.Atr(self.data, period=14),
+                          high=bt_indicators.Highest(self.data.high, period=20),
+                          mom=bt_indicators.Momentum(self.data.close, period=10))
+
+        def next(self):
+            for k, v in self.i.items():
+                seen.setdefault(k, []).append(v[0])
+
+    cerebro = bt.Cerebro(runonce=runonce, stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(_Probe)
+    cerebro.run()
+
+    start = len(c) - len(seen["atr"])  # strategy.next começa após o maior aquecimento
+    np.testing.assert_allclose(seen["atr"], ind.wilder_atr(h, l, c, 14)[start:], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(seen["high"], ind.highest(h, 20)[start:])
+    np.testing.assert_allclose(seen["mom"], ind.momentum(c, 10)[start:], rtol=0, atol=1e-12)
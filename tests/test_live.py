@@ -0,0 +1,103 @@
+# tests/test_live.py
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import live_engine
+from app.crud_prices import ensure_symbol, bulk_upsert_prices
+from app.strategies import validate_and_normalize_params
+
+
+def _bars(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.cumprod(1 + rng.normal(0.0005, 0.02, n))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - abs(rng.normal(0, 0.01, n)))
+    dates = pd.bdate_range("2021-01-01", periods=n)
+    return pd.DataFrame({"date": dates, "open": open_, "high": high, "low": low, "close": close, "volume": 1e6})
+
+
+def _as_bars(df):
+    return [
+        {"date": d.strftime("%Y-%m-%d"), "open": o, "high": h, "low": l, "close": c}
+        for d, o, h, l, c in zip(df["date"], df["open"], df["high"], df["low"], df["close"])
+    ]
+
+
+@pytest.mark.parametrize("strategy_type,params", [
+    ("sma_cross", {"fast": 10, "slow": 30}),
+    ("donchian", {"n": 20}),
+    ("momentum", {"lookback": 20, "stop_method": "ma", "ma_period": 30}),
+])
+def test_incremental_equals_full_replay(strategy_type, params):
+    p = validate_and_normalize_params(strategy_type, params)
+    bars = _as_bars(_bars())
+
+    full = live_engine.build(strategy_type, p, commission=0.001)
+    full_events = full.run(bars)
+
+    part = live_engine.build(strategy_type, p, commission=0.001)
+    events = part.run(bars[:200])
+    state = json.loads(json.dumps(part.dump()))  # ida e volta pelo banco
+    resumed = live_engine.build(strategy_type, p, state)
+    events += resumed.run(bars)  # barras já vistas são ignoradas
+
+    assert events == full_events
+    assert resumed.summary() == full.summary()
+    assert resumed.bars == len(bars)
+    assert any(e["event"] == "fill" for e in full_events)
+
+
+def test_live_state_api_advances_only_new_bars(client, db_session):
+    df = _bars(300, seed=11)
+    ticker = "LIVE1.SA"
+    sym = ensure_symbol(db_session, ticker)
+    bulk_upsert_prices(db_session, sym.id, df.iloc[:250])
+
+    payload = {"ticker": ticker, "strategy_type": "donchian", "strategy_params": {"n": 20},
+               "start_date": "2021-01-01"}
+    r = client.post("/live/states", json=payload)
+    assert r.status_code == 200, r.text
+    state = r.json()
+    assert state["bars"] == 250
+    assert state["last_date"] == df["date"].iloc[249].strftime("%Y-%m-%d")
+
+    # mesmo ticker+estratégia+parâmetros reaproveita o estado
+    assert client.post("/live/states", json=payload).json()["id"] == state["id"]
+    # ... mas não com outro caixa, comissão ou início: 409 em vez do estado antigo
+    for change in ({"initial_cash": 5000.0}, {"commission": 0.001}, {"start_date": "2021-06-01"}):
+        r = client.post("/live/states", json={**payload, **change})
+        assert r.status_code == 409 and next(iter(change)) in r.json()["detail"]
+
+    r = client.post(f"/live/states/{state['id']}/advance")
+    assert r.json()["events"] == [] and r.json()["bars"] == 250
+
+    bulk_upsert_prices(db_session, sym.id, df.iloc[250:])
+    r = client.post(f"/live/states/{state['id']}/advance")
+    assert r.status_code == 200
+    assert r.json()["bars"] == 300
+    assert r.json()["last_date"] == df["date"].iloc[-1].strftime("%Y-%m-%d")
+
+    full = live_engine.build("donchian", validate_and_normalize_params("donchian", {"n": 20}))
+    full.run(_as_bars(df))
+    assert client.get(f"/live/states/{state['id']}").json()["equity"] == full.summary()["equity"]
+
+    assert client.get("/live/states", params={"ticker": ticker}).json()[0]["id"] == state["id"]
+    assert client.get("/live/states/999999").status_code == 404
+
+
+def test_incomplete_live_strategy_fails_at_construction():
+    class NoExitSignal(live_engine.LiveStrategy):
+        _init_indicators = live_engine.LiveSmaCross._init_indicators
+        _dump_indicators = live_engine.LiveSmaCross._dump_indicators
+        _update_indicators = live_engine.LiveSmaCross._update_indicators
+        _ready = live_engine.LiveSmaCross._ready
+        _entry_signal = live_engine.LiveSmaCross._entry_signal
+        _alt_stop = live_engine.LiveSmaCross._alt_stop
+
+    params = validate_and_normalize_params("sma_cross", {"fast": 5, "slow": 20})
+    with pytest.raises(TypeError, match="_exit_signal"):
+        NoExitSignal(params)   # antes: NotImplementedError só na primeira barra com sinal
+    assert live_engine.LiveSmaCross(params).bars == 0
@@ -0,0 +1,75 @@
+# tests/test_price_import.py
+import io
+import pandas as pd
+from sqlalchemy import select, func
+
+from app import models
+from app.services import price_import
+
+def _vendor_csv(fake_prices_df, tickers):
+    frames = []
+    for t in tickers:
+        df = fake_prices_df.rename(columns=str.capitalize).copy()
+        df.insert(0, "Symbol", t)
+        frames.append(df)
+    return pd.concat(frames).to_csv(index=False).encode()
+
+def _count(db, ticker):
+    return db.execute(
+        select(func.count()).select_from(models.Price).join(models.Symbol).where(models.Symbol.ticker == ticker)
+    ).scalar_one()
+
+def test_import_service_chunked_and_idempotent(db_session, fake_prices_df):
+    data = _vendor_csv(fake_prices_df, ["IMPA.SA", "IMPB.SA"])
+    stats = price_import.import_prices(db_session, io.BytesIO(data), fmt="csv", chunksize=7)
+    assert stats["rows_upserted"] == 2 * len(fake_prices_df)
+    assert stats["chunks"] > 1 and stats["symbols"] == 2
+    assert _count(db_session, "IMPA.SA") == len(fake_prices_df)
+
+    # reimportar atualiza em vez de duplicar
+    df = fake_prices_df.copy()
+    df["close"] = df["close"] * 2
+    price_import.import_prices(db_session, io.BytesIO(df.to_csv(index=False).encode()),
+                               fmt="csv", default_ticker="IMPA.SA")
+    assert _count(db_session, "IMPA.SA") == len(fake_prices_df)
+    last = db_session.execute(
+        select(models.Price.close).join(models.Symbol)
+        .where(models.Symbol.ticker == "IMPA.SA").order_by(models.Price.date.desc()).limit(1)
+    ).scalar_one()
+    assert abs(last - fake_prices_df["close"].iloc[-1] * 2) < 1e-9
+
+def test_import_endpoint_parquet(client, db_session, fake_prices_df):
+    buf = io.BytesIO()
+    fake_prices_df.to_parquet(buf, index=False)
+    r = client.post(
+        "/data/prices/import",
+        files={"file": ("dump.parquet", buf.getvalue(), "application/octet-stream")},
+        data={"ticker": "IMPPQ.SA"},
+    )
+    assert r.status_code == 200, r.text
+    assert r.json()["rows_upserted"] == len(fake_prices_df)
+    assert r.json()["rows_per_sec"] > 0
+    assert _count(db_session, "IMPPQ.SA") == len(fake_prices_df)
+
+def test_import_endpoint_requires_ticker(client, fake_prices_df):
+    r = client.post("/data/prices/import",
+                    files={"file": ("x.csv", fake_prices_df.to_csv(index=False).encode(), "text/csv")})
+    assert r.status_code == 400
+
+def test_import_without_date_column_is_rejected(client, db_session, fake_prices_df):
+    data = fake_prices_df.drop(columns=["date"]).to_csv(index=False).encode()
+    r = client.post("/data/prices/import", files={"file": ("nodate.csv", data, "text/csv")}, data={"ticker": "IMPND.SA"})
+    assert r.status_code == 400 and "coluna de data ausente" in r.json()["detail"]
+    assert _count(db_session, "IMPND.SA") == 0
+
+def test_symbol_ids_are_not_reused_across_imports(db_session, fake_prices_df):
+    data = fake_prices_df.to_csv(index=False).encode()
+    price_import.import_prices(db_session, io.BytesIO(data), fmt="csv", default_ticker="IMPDEL.SA")
+    sym = db_session.execute(select(models.Symbol).where(models.Symbol.ticker == "IMPDEL.SA")).scalar_one()
+    db_session.execute(models.Price.__table__.delete().where(models.Price.symbol_id == sym.id))
+    db_session.delete(sym)
+    db_session.commit()
+
+    # o símbolo recriado ganha outro id; um cache global devolveria o id apagado
+    price_import.import_prices(db_session, io.BytesIO(data), fmt="csv", default_ticker="IMPDEL.SA")
+    assert _count(db_session, "IMPDEL.SA") == len(fake_prices_df)
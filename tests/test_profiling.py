@@ -0,0 +1,100 @@
+# tests/test_profiling.py
+import pstats
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, main, profiling
+from app.db import Base
+from app.jobs.backtest_worker import process_one
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+REQ = {"ticker": "PROF1.SA", "start_date": "2021-01-01", "end_date": "2021-03-01",
+       "strategy_type": "sma_cross", "strategy_params": {"fast": 5, "slow": 20}, "profile": True}
+
+
+def test_profile_call_artifact():
+    def work():
+        data = [list(range(1000)) for _ in range(200)]
+        return sum(map(sum, data))
+
+    result, art = profiling.profile_call(work)
+    assert result == 200 * sum(range(1000))
+    assert art.peak_memory_bytes > 200 * 1000 * 8
+    names = [f["function"] for f in art.summary["call_tree"]]
+    assert any(n.endswith("(work)") for n in names)
+    assert art.summary["top_allocations"] and "cumulative" in art.summary["report"]
+    assert profiling.load_summary(art.summary_blob()) == art.summary
+
+
+def test_profiled_run_is_admin_only_and_downloadable(client, patch_fetch_prices, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert client.post("/backtests/run", json=REQ, headers=ADMIN).status_code == 403   # desligado sem ADMIN_TOKEN
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/backtests/run", json=REQ, headers={"X-Admin-Token": "x"}).status_code == 403
+
+    r = client.post("/backtests/run", json=REQ, headers=ADMIN)
+    assert r.status_code == 200, r.text
+    url = r.json()["profile_url"]
+    bt_id = r.json()["id"]
+    assert url == f"/backtests/{bt_id}/profile"
+
+    assert client.get(url).status_code == 403
+    prof = client.get(url, headers=ADMIN).json()
+    assert prof["backtest_id"] == bt_id and prof["peak_memory_bytes"] > 0
+    assert any("run_backtest" in f["function"] for f in prof["call_tree"])
+
+    dump = client.get(f"{url}?format=pstats", headers=ADMIN)
+    assert dump.headers["content-disposition"].endswith(f'backtest_{bt_id}.pstats"')
+    path = tmp_path / "bt.pstats"
+    path.write_bytes(dump.content)
+    assert pstats.Stats(str(path)).total_calls > 0
+
+    # sem profile: nada gravado
+    plain = client.post("/backtests/run", json={**REQ, "profile": False}).json()
+    assert plain["profile_url"] is None
+    assert client.get(f"/backtests/{plain['id']}/profile", headers=ADMIN).status_code == 404
+
+
+def test_worker_profile_flag(tmp_path, patch_fetch_prices):
+    engine = create_engine(f"sqlite:///{tmp_path / 'prof.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    with Session() as db:
+        bt = crud.create_backtest_record(
+            db, ticker="PROF2.SA", start_date="2021-01-01", end_date="2021-03-01", strategy_type="sma_cross",
+            strategy_params={"fast": 5, "slow": 20}, initial_cash=1e5, commission=0.0, timeframe="1d",
+        )
+        crud.set_backtest_status(db, bt.id, "queued")
+        bt_id = bt.id
+        assert process_one(db, Session, "w-prof", heartbeat_interval=5, profile=True) == bt_id
+        prof = crud.get_backtest_profile(db, bt_id)
+        assert prof is not None and prof.wall_seconds > 0
+        assert profiling.load_summary(prof.summary)["call_tree"]
+    engine.dispose()
+
+
+def test_enqueue_profile_is_admin_only_and_honoured_by_worker(client, db_session, monkeypatch, tmp_path, patch_fetch_prices):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    req = {**REQ, "ticker": "PROF3.SA"}
+    assert client.post("/backtests/enqueue", json=req).status_code == 403
+    r = client.post("/backtests/enqueue", json=req, headers=ADMIN)
+    assert r.status_code == 202 and r.json()["profile_url"] == f"/backtests/{r.json()['id']}/profile"
+    from app import models
+    assert db_session.get(models.Backtest, r.json()["id"]).profile_requested
+
+    # worker sem --profile honra o pedido gravado
+    engine = create_engine(f"sqlite:///{tmp_path / 'prof_q.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    with Session() as db:
+        bt = crud.create_backtest_record(
+            db, ticker="PROF3.SA", start_date="2021-01-01", end_date="2021-03-01", strategy_type="sma_cross",
+            strategy_params={"fast": 5, "slow": 20}, initial_cash=1e5, commission=0.0, timeframe="1d",
+            profile_requested=True,
+        )
+        crud.set_backtest_status(db, bt.id, "queued")
+        bt_id = bt.id
+        assert process_one(db, Session, "w-q", heartbeat_interval=5) == bt_id
+        assert crud.get_backtest_profile(db, bt_id) is not None
+    engine.dispose()
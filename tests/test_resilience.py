@@ -0,0 +1,88 @@
+# tests/test_resilience.py
+import time
+import pytest
+from app.services import yahoo, market_data
+from app.services.resilience import CircuitBreaker, CircuitOpenError, retry_call, call_with_timeout
+
+class _Clock:
+    def __init__(self):
+        self.t = 0.0
+    def __call__(self):
+        return self.t
+
+def _boom():
+    raise yahoo.MarketDataError("throttled")
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    clock = _Clock()
+    cb = CircuitBreaker("t", failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(3):
+        with pytest.raises(yahoo.MarketDataError):
+            cb.call(_boom)
+    assert cb.state == "open"
+    with pytest.raises(CircuitOpenError):
+        cb.call(lambda: 1)  # falha rápida, sem chamar a função
+
+    clock.t = 10
+    assert cb.state == "half_open"
+    with pytest.raises(yahoo.MarketDataError):
+        cb.call(_boom)  # chamada de teste falhou: reabre
+    assert cb.state == "open"
+
+    clock.t = 25
+    assert cb.call(lambda: 42) == 42
+    assert cb.state == "closed"
+
+def test_breaker_ignores_non_failure_exceptions():
+    cb = CircuitBreaker("t", failure_threshold=1)
+    with pytest.raises(ValueError):
+        cb.call(lambda: (_ for _ in ()).throw(ValueError("sem dados")), failure_on=(yahoo.MarketDataError,))
+    assert cb.state == "closed"
+
+def test_retry_call_backoff_and_timeout():
+    calls, sleeps = [], []
+    def _flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError()
+        return "ok"
+    assert retry_call(_flaky, retries=3, retry_on=(TimeoutError,), base_delay=1, max_delay=4, sleep=sleeps.append) == "ok"
+    assert len(sleeps) == 2 and all(0 <= s <= 4 for s in sleeps)
+
+    with pytest.raises(TimeoutError):
+        call_with_timeout(time.sleep, 0.05, 1)
+
+def test_fetch_prices_trips_breaker(monkeypatch):
+    monkeypatch.setattr(yahoo, "breaker", CircuitBreaker("yahoo", failure_threshold=2, reset_timeout=60))
+    monkeypatch.setattr(yahoo, "YAHOO_RETRIES", 0)
+    monkeypatch.setattr(yahoo, "_download", lambda *a: _boom())
+    for _ in range(2):
+        with pytest.raises(yahoo.MarketDataError):
+            yahoo.fetch_prices("AAPL", "2024-01-01", "2024-02-01")
+    with pytest.raises(CircuitOpenError):
+        yahoo.fetch_prices("AAPL", "2024-01-01", "2024-02-01")
+
+def test_market_data_falls_back_to_stored_prices(db_session, fake_prices_df, monkeypatch):
+    from app.crud_prices import ensure_symbol, bulk_upsert_prices
+    sym = ensure_symbol(db_session, "LOCAL3.SA")
+    bulk_upsert_prices(db_session, sym.id, fake_prices_df)
+
+    def _open(*a):
+        raise CircuitOpenError("yahoo", 30)
+    monkeypatch.setattr(yahoo, "fetch_prices", _open)
+
+    data = market_data.load_prices("LOCAL3.SA", "2021-01-01", "2021-12-31", db=db_session)
+    assert data.source == "local"
+    assert len(data.df) == len(fake_prices_df)
+    assert data.stale  # último preço em março, fim pedido em dezembro
+
+    fresh = market_data.load_prices("LOCAL3.SA", "2021-01-01", "2021-03-01", db=db_session)
+    assert not fresh.stale
+
+    with pytest.raises(ValueError):
+        market_data.load_prices("NADA.SA", "2021-01-01", "2021-03-01", db=db_session)
+
+def test_health_reports_breaker_state(client):
+    r = client.get("/health")
+    assert r.status_code == 200
+    assert r.json()["market_data"] in ("closed", "half_open", "open")
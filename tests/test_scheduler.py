@@ -0,0 +1,127 @@
+# tests/test_scheduler.py
+import json
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, scheduler
+from app.scheduler import CronSchedule, Job, JobBusy, Scheduler
+
+def test_cron_next_after():
+    assert CronSchedule("30 22 * * 1-5").next_after(datetime(2024, 1, 5, 23, 0)) == datetime(2024, 1, 8, 22, 30)  # sex -> seg
+    assert CronSchedule("*/15 * * * *").next_after(datetime(2024, 1, 1, 10, 14, 59)) == datetime(2024, 1, 1, 10, 15)
+    assert CronSchedule("0 0 1 */3 *").next_after(datetime(2024, 2, 10)) == datetime(2024, 4, 1)
+    assert CronSchedule("0 9 * * 0").next_after(datetime(2024, 1, 1)) == datetime(2024, 1, 7, 9, 0)  # domingo
+    with pytest.raises(ValueError):
+        CronSchedule("61 * * * *")
+
+@pytest.fixture
+def sched(engine_sqlite):
+    s = Scheduler(sessionmaker(bind=engine_sqlite, autoflush=False, future=True), sleep=lambda _: None)
+    yield s
+    s.stop(wait=True)
+
+def _runs(db, name):
+    db.expire_all()
+    return db.execute(
+        select(models.JobRun).where(models.JobRun.job_name == name).order_by(models.JobRun.id)
+    ).scalars().all()
+
+def test_trigger_records_steps_and_duration(sched, db_session):
+    def _job(db, ctx, n=2):
+        for i in range(n):
+            with ctx.step(f"step{i}"):
+                pass
+        ctx.note("feito")
+
+    sched.register(Job("t_steps", _job, None))
+    assert sched.trigger("t_steps", {"n": 3}).result(timeout=10) == "ok"
+    (run,) = _runs(db_session, "t_steps")
+    assert run.status == "ok" and run.trigger == "manual" and run.duration_ms is not None
+    assert [s["name"] for s in json.loads(run.steps_json)] == ["step0", "step1", "step2"]
+    assert "feito" in run.message
+
+def test_retries_then_success(sched, db_session):
+    calls = []
+    def _flaky(db, ctx):
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("falha transitória")
+
+    sched.register(Job("t_retry", _flaky, None, retries=2, retry_delay=0.01))
+    assert sched.trigger("t_retry").result(timeout=10) == "ok"
+    runs = _runs(db_session, "t_retry")
+    assert [(r.attempt, r.status) for r in runs] == [(1, "error"), (2, "error"), (3, "ok")]
+
+def test_overlap_prevented(sched):
+    release = threading.Event()
+    sched.register(Job("t_block", lambda db, ctx: release.wait(5), None))
+    fut = sched.trigger("t_block")
+    with pytest.raises(JobBusy):
+        sched.trigger("t_block")
+    release.set()
+    assert fut.result(timeout=10) == "ok"
+    assert sched.trigger("t_block").result(timeout=10) == "ok"
+
+def test_run_pending_fires_due_jobs(sched):
+    done = []
+    job = sched.register(Job("t_cron", lambda db, ctx: done.append(1), "*/5 * * * *"))
+    assert sched.run_pending(job.next_run) == ["t_cron"]
+    sched.stop(wait=True)
+    assert done == [1]
+    assert job.next_run > datetime.utcnow()
+
+def test_jobs_api_trigger_and_runs(client, sched, monkeypatch, patch_fetch_prices, db_session):
+    from app.jobs.daily_indicators import daily_indicators
+    sched.register(Job("t_daily", daily_indicators, None))
+    monkeypatch.setattr(scheduler, "_scheduler", sched)
+
+    assert [j["name"] for j in client.get("/jobs").json()] == ["t_daily"]
+    r = client.post("/jobs/t_daily/trigger", json={"params": {"tickers": ["FAKE.SA"]}})
+    assert r.status_code == 202
+    assert client.post("/jobs/nope/trigger").status_code == 404
+    sched.stop(wait=True)
+
+    runs = client.get("/jobs/runs", params={"job_name": "t_daily"}).json()
+    assert runs[0]["status"] == "ok"
+    assert {s["name"] for s in runs[0]["steps"]} == {"fetch:FAKE.SA", "upsert:FAKE.SA", "live:FAKE.SA"}
+
+def test_schedule_lease_is_atomic_across_replicas(sched, db_session, monkeypatch):
+    from datetime import timedelta
+    from app import crud
+    ttl = timedelta(minutes=5)
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r1") == 0
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r2") == 1
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r3") is None
+    crud.release_job_lease(db_session, "t_lease", 0, "r3")           # não é dono: nada muda
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r3") is None
+    crud.release_job_lease(db_session, "t_lease", 0, "r1")
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r3") == 0
+    # lease vencido (réplica morreu) é retomado
+    db_session.query(models.JobLease).filter_by(job_name="t_lease", slot=1).update(
+        {"lease_expires": datetime.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+    assert crud.acquire_job_lease(db_session, "t_lease", 2, ttl, "r4") == 1
+
+    # execução agendada com a vaga tomada por outra réplica: pulada, sem rodar o job
+    done = []
+    job = sched.register(Job("t_leased", lambda db, ctx: done.append(1), "* * * * *"))
+    assert crud.acquire_job_lease(db_session, "t_leased", 1, ttl, "other") == 0
+    sched.run_pending(job.next_run)
+    sched.stop(wait=True)
+    assert done == [] and _runs(db_session, "t_leased") == []
+    # manual ignora o lease; a agendada libera a vaga ao terminar
+    crud.release_job_lease(db_session, "t_leased", 0, "other")
+    s2 = Scheduler(sched.session_factory, sleep=lambda _: None)
+    s2.register(job)
+    assert s2.trigger("t_leased", trigger="schedule").result(timeout=10) == "ok"
+    s2.stop(wait=True)
+    db_session.expire_all()
+    lease = db_session.query(models.JobLease).filter_by(job_name="t_leased").one()
+    assert done == [1] and lease.holder is None
+
+    monkeypatch.delenv("SCHEDULER_ENABLED", raising=False)
+    assert not scheduler.enabled()   # opt-in
@@ -0,0 +1,111 @@
+# tests/test_screener.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import live_engine, screener
+from app.crud_prices import ensure_symbol, bulk_upsert_prices
+from app.strategies import validate_and_normalize_params
+
+CASES = {
+    "sma_cross": {"fast": 5, "slow": 15},
+    "donchian": {"n": 10},
+    "momentum": {"lookback": 10, "thresh": 0.01},
+}
+
+
+def _ohlc(T=220, N=4, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 30 * np.cumprod(1 + rng.normal(0, 0.02, (T, N)), axis=0)
+    high = close * (1 + rng.uniform(0, 0.02, (T, N)))
+    low = close * (1 - rng.uniform(0, 0.02, (T, N)))
+    dates = np.array(pd.bdate_range("2023-01-02", periods=T), dtype="datetime64[D]")
+    return dates, {"high": high, "low": low, "close": close}
+
+
+@pytest.mark.parametrize("strategy_type", list(CASES))
+def test_vectorized_signals_match_live_engine(strategy_type):
+    """O sinal da última barra do screener = decisão do modo live barra a barra."""
+    params = validate_and_normalize_params(strategy_type, CASES[strategy_type])
+    dates, m = _ohlc()
+    window = screener.warmup_bars(strategy_type, params)
+    T, N = m["close"].shape
+
+    for j in range(N):
+        eng = live_engine.build(strategy_type, params)
+        for t in range(T):
+            bar = {k: float(v[t, j]) for k, v in m.items()}
+            eng._update_indicators(bar)
+            eng.bars += 1
+            if t < window:
+                continue
+            got = screener.evaluate(strategy_type, params, dates[t + 1 - window:t + 1], list("ABCD"),
+                                    {k: v[t + 1 - window:t + 1] for k, v in m.items()})[j]
+            ready = eng._ready()
+            expected = "entry" if ready and eng._entry_signal(bar) else (
+                "exit" if ready and eng._exit_signal(bar) else None)
+            assert got["signal"] == expected, (j, t)
+            if expected == "entry":
+                _, stop = eng._calc_size_and_stop(bar["close"])
+                assert got["stop"] == pytest.approx(stop, rel=1e-3)
+
+
+def test_stale_ticker_does_not_signal():
+    params = validate_and_normalize_params("momentum", {"lookback": 5, "thresh": 0.0})
+    dates, m = _ohlc(T=80, N=2)
+    m["close"][:, :] = np.linspace(10, 20, 80)[:, None]
+    m["high"], m["low"] = m["close"] * 1.01, m["close"] * 0.99
+    for v in m.values():
+        v[-3:, 1] = np.nan
+    a, b = screener.evaluate("momentum", params, dates, ["A", "B"], m)
+    assert a["signal"] == "entry" and not a["stale"] and a["stop"] < a["close"]
+    assert b["signal"] is None and b["stale"] and b["date"] == str(dates[-4])
+
+
+def test_screener_endpoint_caches_until_new_bars(client, db_session):
+    dates = pd.bdate_range("2023-03-01", periods=60)
+    tickers = ["SCR0.SA", "SCR1.SA", "SCR2.SA"]
+    closes = {
+        "SCR0.SA": np.r_[np.full(59, 10.0), 12.0],  # rompe o canal na última barra
+        "SCR1.SA": np.r_[np.full(59, 10.0), 8.0],
+        "SCR2.SA": np.full(60, 10.0),
+    }
+    for t, close in closes.items():
+        df = pd.DataFrame({"date": dates, "open": close, "high": close + 0.1, "low": close - 0.1,
+                           "close": close, "volume": 1e5})
+        bulk_upsert_prices(db_session, ensure_symbol(db_session, t).id, df)
+
+    url = f"/screener?strategy=donchian&params=%7B%22n%22%3A%2010%7D&tickers={','.join(tickers)}"
+    r = client.get(url)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    by = {x["ticker"]: x for x in body["results"]}
+    assert body["cached"] is False and body["params"]["n"] == 10 and body["universe"] == 3
+    assert by["SCR0.SA"]["signal"] == "entry" and by["SCR0.SA"]["stop"] < 12.0
+    assert by["SCR1.SA"]["signal"] is None and by["SCR2.SA"]["signal"] is None
+    assert (body["entries"], body["exits"]) == (1, 0)
+
+    mom = client.get(f"/screener?strategy=momentum&params=%7B%22lookback%22%3A%205%7D&tickers={','.join(tickers)}").json()
+    assert [x["signal"] for x in mom["results"]] == ["entry", "exit", "exit"]
+
+    again = client.get(url + "&signal=entry").json()
+    assert again["cached"] is True and [x["ticker"] for x in again["results"]] == ["SCR0.SA"]
+
+    # barra nova invalida o cache
+    nxt = pd.DataFrame({"date": [dates[-1] + pd.offsets.BDay()], "open": [12.5], "high": [12.6],
+                        "low": [12.4], "close": [12.5], "volume": [1e5]})
+    bulk_upsert_prices(db_session, ensure_symbol(db_session, "SCR0.SA").id, nxt)
+    fresh = client.get(url).json()
+    by = {x["ticker"]: x for x in fresh["results"]}
+    assert fresh["cached"] is False and fresh["as_of"] == str(nxt["date"][0].date())
+    assert by["SCR1.SA"]["stale"] and by["SCR1.SA"]["signal"] is None
+
+    assert client.get("/screener?strategy=nope").status_code == 400
+    assert client.get("/screener?strategy=donchian&params=[1").status_code == 400
+
+    # chaves distintas (parâmetros/tickers arbitrários da query) não acumulam locks
+    for n in range(11, 91):
+        assert client.get(f"/screener?strategy=donchian&params=%7B%22n%22%3A%20{n}%7D&tickers=SCR2.SA,X{n}").status_code == 200
+    assert len(screener._locks) == screener.LOCK_STRIPES
+    assert len(screener._cache._data) <= screener._cache.maxsize
+    assert all(k[2] is None or len(k[2]) == 64 for k in screener._cache._data)   # digest, não a lista
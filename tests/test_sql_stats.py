@@ -0,0 +1,74 @@
+# tests/test_sql_stats.py
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import crud, http_cache, metrics, models, sql_stats
+
+
+def _bt(db, ticker):
+    bt = crud.create_backtest_record(
+        db, ticker=ticker, start_date="2021-01-01", end_date="2021-12-31", strategy_type="sma_cross",
+        strategy_params={"fast": 5}, initial_cash=1e5, commission=0.0, timeframe="1d",
+    )
+    crud.save_metrics(db, bt.id, {"total_return": 0.1, "sharpe": 1.0, "max_drawdown": -0.05})
+    crud.set_backtest_status(db, bt.id, "finished")
+    return bt.id
+
+
+def test_request_counts_are_exported(client, db_session):
+    bt_id = _bt(db_session, "SQLS0.SA")
+    http_cache.body_cache.invalidate()
+    h = metrics.histogram("sql_queries_per_request", "")
+    key = (("route", "/backtests/{backtest_id}/results"),)
+    requests_before = h._hist.get(key, [0])[-1]
+    r = client.get(f"/backtests/{bt_id}/results")
+    assert r.status_code == 200
+    assert "x-db-queries" not in r.headers       # headers só em dev / SQL_STATS_HEADERS=1
+    after = h._hist[key]
+    assert after[-1] == requests_before + 1
+    assert after[-2] >= 1                       # ao menos um statement somado
+
+
+def test_headers_slow_log_and_n_plus_one(engine_sqlite, db_session, monkeypatch, caplog):
+    ids = [_bt(db_session, f"SQLS{i}.SA") for i in range(1, 13)]
+    monkeypatch.setattr(sql_stats, "SLOW_MS", 0.0)   # tudo é "lento"
+    monkeypatch.setattr(sql_stats, "N_PLUS_ONE", 10)
+
+    app = FastAPI()
+    app.add_middleware(sql_stats.SQLStatsMiddleware, headers=True)
+
+    @app.get("/n1")
+    def n1():
+        # laço clássico de N+1: um SELECT por backtest
+        return [db_session.execute(select(models.Backtest.ticker).where(models.Backtest.id == i)).scalar_one()
+                for i in ids]
+
+    counter = metrics.counter("sql_n_plus_one_total", "")
+    n1_before = counter.value(route="/n1")
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"), TestClient(app) as c:
+        r = c.get("/n1")
+    assert r.status_code == 200 and len(r.json()) == 12
+    assert int(r.headers["x-db-queries"]) == 12
+    assert float(r.headers["x-db-time-ms"]) >= float(r.headers["x-db-slowest-ms"]) > 0
+    assert counter.value(route="/n1") == n1_before + 1   # uma vez por forma, não por repetição
+
+    text = caplog.text
+    assert "possível N+1" in text and text.count("possível N+1") == 1
+    assert f"params=({ids[0]}," in text                   # slow log traz os parâmetros
+
+
+def test_track_block_and_slowest():
+    from sqlalchemy import create_engine, text
+    engine = create_engine("sqlite://")
+    sql_stats.install()
+    with sql_stats.track() as st, engine.connect() as conn:
+        for i in range(5):
+            conn.execute(text("select :x"), {"x": i})
+        conn.execute(text("select 1 union all select 2"))
+    assert st.count == 6 and len(st.slowest) == sql_stats.KEEP_SLOWEST
+    assert st.summary()["queries"] == 6 and st.summary()["repeated"] == {}
+    assert sql_stats.current() is None
+    engine.dispose()
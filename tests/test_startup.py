@@ -0,0 +1,16 @@
+# tests/test_startup.py
+import importlib.util
+import pathlib
+
+_spec = importlib.util.spec_from_file_location(
+    "check_startup", pathlib.Path(__file__).resolve().parents[1] / "bin" / "check_startup.py"
+)
+check_startup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(check_startup)
+
+def test_import_app_main_is_lean():
+    r = check_startup.measure()
+    assert r["heavy_loaded"] == [], r
+    # orçamento folgado para CI lenta; o objetivo é pegar regressões grosseiras
+    assert r["import_seconds"] < 5.0, r
+    assert r["rss_mb"] < 200, r
@@ -0,0 +1,88 @@
+# tests/test_telemetry.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import crud, models, telemetry
+
+RUN = {"ticker": "TELE1.SA", "start_date": "2021-01-01", "end_date": "2021-03-31",
+       "strategy_type": "sma_cross", "strategy_params": {"fast": 5, "slow": 20}}
+
+
+def test_run_records_phases_size_and_rss(client, db_session, patch_fetch_prices, fake_prices_df):
+    r = client.post("/backtests/run", json=RUN)
+    assert r.status_code == 200, r.text
+    tel = db_session.query(models.BacktestTelemetry).filter_by(backtest_id=r.json()["id"]).one()
+    assert (tel.strategy_type, tel.engine, tel.timeframe) == ("sma_cross", "backtrader", "1d")
+    assert tel.bars == len(fake_prices_df)
+    n_trades = len(client.get(f"/backtests/{tel.backtest_id}/results").json()["trades"])
+    assert tel.trades == n_trades
+    assert min(tel.fetch_seconds, tel.simulate_seconds, tel.persist_seconds) > 0
+    assert tel.total_seconds == pytest.approx(tel.fetch_seconds + tel.simulate_seconds + tel.persist_seconds)
+    assert tel.peak_rss_bytes > 10 * 2**20
+
+
+def test_performance_report_percentiles_and_buckets(client, db_session):
+    monday = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    monday -= timedelta(days=monday.weekday() + 7)   # segunda-feira da semana passada
+    totals = [0.5, 0.7, 1.0, 1.2, 4.0]
+    for i, total in enumerate(totals):
+        bt = crud.create_backtest_record(
+            db_session, ticker="TELE2.SA", start_date="2021-01-01", end_date="2021-12-31",
+            strategy_type="perf_probe", strategy_params={}, initial_cash=1e5, commission=0.0, timeframe="1d",
+        )
+        crud.save_backtest_telemetry(db_session, bt.id, {
+            "strategy_type": "perf_probe", "engine": "backtrader", "timeframe": "1d",
+            "bars": 1000, "trades": 3, "fetch_seconds": 0.1, "simulate_seconds": total - 0.2,
+            "persist_seconds": 0.1, "total_seconds": total, "peak_rss_bytes": (100 + i) * 2**20,
+        })
+        db_session.query(models.BacktestTelemetry).filter_by(backtest_id=bt.id).update(
+            {"created_at": monday + timedelta(days=i)})   # segunda a sexta da mesma semana
+    db_session.commit()
+
+    week = client.get("/stats/performance?bucket=week&strategy_type=perf_probe").json()
+    assert len(week) == 1
+    g = week[0]
+    assert g["period"] == monday.date().isoformat() and g["runs"] == 5 and g["bars"] == 5000
+    assert g["p50_seconds"] == pytest.approx(np.percentile(totals, 50))
+    assert g["p95_seconds"] == pytest.approx(np.percentile(totals, 95))
+    assert g["bars_per_sec"] == pytest.approx(5000 / sum(t - 0.2 for t in totals))
+    assert g["max_peak_rss_bytes"] == 104 * 2**20
+
+    days = client.get("/stats/performance?bucket=day&strategy_type=perf_probe").json()
+    assert [d["runs"] for d in days] == [1] * 5
+    old = (monday - timedelta(days=60)).isoformat()
+    assert client.get(f"/stats/performance?strategy_type=perf_probe&created_to={old}").json() == []
+    assert client.get("/stats/performance?bucket=year").status_code == 422
+
+
+def test_peak_rss_reset_only_when_idle(monkeypatch):
+    resets = []
+    monkeypatch.setattr(telemetry, "_reset_peak_rss", lambda: resets.append(1))
+    with telemetry.RunTelemetry("sma_cross") as outer:
+        with telemetry.RunTelemetry("sma_cross"):
+            pass
+    assert resets == [1] and outer.peak_rss_bytes > 0
+
+
+def test_profiled_runs_are_flagged_and_excluded(client, db_session, patch_fetch_prices, monkeypatch):
+    from app import main
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "tok")
+    r = client.post("/backtests/run", json={**RUN, "ticker": "TELE3.SA", "strategy_type": "donchian",
+                                            "strategy_params": {"n": 10}, "profile": True},
+                    headers={"X-Admin-Token": "tok"})
+    assert r.status_code == 200, r.text
+    tel = db_session.query(models.BacktestTelemetry).filter_by(backtest_id=r.json()["id"]).one()
+    assert tel.profiled
+
+    def _runs(**extra):
+        q = "&".join(f"{k}={v}" for k, v in extra.items())
+        rows = client.get(f"/stats/performance?bucket=all&strategy_type=donchian&{q}").json()
+        return sum(g["runs"] for g in rows)
+
+    base = _runs()
+    assert _runs(include_profiled="true") == base + 1
+    client.post("/backtests/run", json={**RUN, "ticker": "TELE4.SA", "strategy_type": "donchian",
+                                        "strategy_params": {"n": 10}})
+    assert _runs() == base + 1
@@ -0,0 +1,175 @@
+# tests/test_timeframes.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import timeframes
+from app.crud_prices import ensure_symbol, bulk_upsert_prices, upsert_intraday_bars, iter_intraday_bars, get_intraday_columns
+from app.services import market_data, yahoo
+from app.services.resilience import CircuitOpenError
+
+
+def _daily(start="2022-01-03", periods=300, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 20 * np.cumprod(1 + rng.normal(0.0005, 0.015, periods))
+    dates = pd.bdate_range(start, periods=periods)
+    return pd.DataFrame({"date": dates, "open": close * 0.995, "high": close * 1.01,
+                         "low": close * 0.99, "close": close, "volume": rng.integers(1e5, 1e6, periods).astype(float)})
+
+
+def _intraday(days=3, minutes=1, seed=4):
+    """Pregões de 10:00 às 16:59 com alguns minutos faltando."""
+    rng = np.random.default_rng(seed)
+    stamps = []
+    for d in pd.bdate_range("2024-03-04", periods=days):
+        stamps.extend(d + pd.Timedelta(hours=10) + pd.to_timedelta(np.arange(0, 420, minutes), unit="m"))
+    stamps = pd.DatetimeIndex(stamps)
+    stamps = stamps[rng.random(len(stamps)) > 0.05]
+    close = 30 + np.cumsum(rng.normal(0, 0.05, len(stamps)))
+    return pd.DataFrame({"date": stamps, "open": close + 0.01, "high": close + 0.05,
+                         "low": close - 0.05, "close": close, "volume": rng.integers(100, 1000, len(stamps)).astype(float)})
+
+
+def _cols(df):
+    return {c: df[c].to_numpy() for c in df.columns}
+
+
+@pytest.mark.parametrize("tf, period", [("1wk", "W"), ("1mo", "M")])
+def test_resample_matches_pandas_groupby(tf, period):
+    df = _daily()
+    out = timeframes.resample_ohlcv(_cols(df), tf)
+    ref = df.groupby(df["date"].dt.to_period(period)).agg(
+        date=("date", "last"), open=("open", "first"), high=("high", "max"),
+        low=("low", "min"), close=("close", "last"), volume=("volume", "sum"))
+    np.testing.assert_array_equal(out["date"], ref["date"].to_numpy(dtype="datetime64[s]"))
+    for c in ("open", "high", "low", "close", "volume"):
+        np.testing.assert_allclose(out[c], ref[c].to_numpy())
+
+
+def test_intraday_buckets_align_to_session_open():
+    df = _intraday()
+    df = df[~((df["date"].dt.hour == 10) & (df["date"].dt.minute < 3))]  # pregão "abre" 10:03
+    out = timeframes.resample_ohlcv(_cols(df), "15m")
+    labels = pd.DatetimeIndex(out["date"])
+    assert labels[0] == pd.Timestamp("2024-03-04 10:03") and labels[1] == pd.Timestamp("2024-03-04 10:18")
+
+    # referência: laço sobre os baldes
+    first = df.groupby(df["date"].dt.date)["date"].transform("min")
+    bucket = first + ((df["date"] - first) // pd.Timedelta(minutes=15)) * pd.Timedelta(minutes=15)
+    ref = df.groupby(bucket).agg(open=("open", "first"), high=("high", "max"), low=("low", "min"),
+                                 close=("close", "last"), volume=("volume", "sum"))
+    np.testing.assert_array_equal(labels, ref.index)
+    for c in ref.columns:
+        np.testing.assert_allclose(out[c], ref[c].to_numpy())
+
+
+def test_normalize_and_annualization():
+    assert timeframes.normalize(None) == "1d" and timeframes.normalize("60m") == "1h"
+    assert timeframes.normalize("1M") == "1mo" and timeframes.normalize("1m") == "1m"
+    with pytest.raises(ValueError):
+        timeframes.normalize("3d")
+    assert timeframes.finer_intervals("15m") == ["5m", "1m"]
+    dates = _intraday(days=2, minutes=5)["date"].to_numpy()
+    assert timeframes.periods_per_year("5m", dates) == pytest.approx(252 * len(dates) / 2)
+
+
+def test_intraday_storage_roundtrip_merge_and_chunks(db_session):
+    sid = ensure_symbol(db_session, "INTRA1.SA").id
+    df = _intraday(days=5)
+    upsert_intraday_bars(db_session, sid, "1m", df.iloc[:1000])
+    # sobreposição: barras repetidas são substituídas, o resto do dia é mantido
+    tail = df.iloc[900:].copy()
+    tail["close"] += 1.0
+    upsert_intraday_bars(db_session, sid, "1m", tail)
+
+    expected = pd.concat([df.iloc[:900], tail])
+    cols = get_intraday_columns(db_session, "INTRA1.SA", "1m")
+    np.testing.assert_array_equal(cols["date"], expected["date"].to_numpy(dtype="datetime64[s]"))
+    np.testing.assert_array_equal(cols["close"], expected["close"].to_numpy())
+
+    blocks = list(iter_intraday_bars(db_session, "INTRA1.SA", "1m", chunk_days=2))
+    assert [len(np.unique(b["date"].astype("datetime64[D]"))) for b in blocks] == [2, 2, 1]
+    window = get_intraday_columns(db_session, "INTRA1.SA", "1m",
+                                  pd.Timestamp("2024-03-05 12:00").to_pydatetime(),
+                                  pd.Timestamp("2024-03-06 11:00").to_pydatetime())
+    assert window["date"][0] >= np.datetime64("2024-03-05T12:00") and window["date"][-1] <= np.datetime64("2024-03-06T11:00")
+
+    from app import models
+    blobs = sum(len(c.data) for c in db_session.query(models.IntradayChunk).filter_by(symbol_id=sid))
+    assert blobs < len(expected) * 6 * 8 * 0.6   # bem menor que as colunas float64 cruas
+
+
+def test_weekly_resample_is_cached_until_new_bars(db_session, monkeypatch):
+    monkeypatch.setattr(yahoo, "fetch_prices", lambda *a, **k: pytest.fail("não deveria baixar"))
+    sid = ensure_symbol(db_session, "WEEK1.SA").id
+    df = _daily(start="2023-01-02", periods=120)
+    bulk_upsert_prices(db_session, sid, df.iloc[:-1])
+    end = df["date"].iloc[-1].strftime("%Y-%m-%d")
+
+    a = market_data.load_prices("WEEK1.SA", "2023-01-02", end, db=db_session, timeframe="1wk")
+    b = market_data.load_prices("WEEK1.SA", "2023-01-02", end, db=db_session, timeframe="1wk")
+    assert a.source == "local" and not a.stale and b.df is a.df
+    assert len(a.df) == df["date"].dt.to_period("W").iloc[:-1].nunique()
+
+    bulk_upsert_prices(db_session, sid, df.iloc[-1:])
+    c = market_data.load_prices("WEEK1.SA", "2023-01-02", end, db=db_session, timeframe="1wk")
+    assert c.df is not a.df and c.df["close"].iloc[-1] == df["close"].iloc[-1]
+
+
+def test_backtest_runs_on_weekly_and_intraday(client, db_session, monkeypatch):
+    def _down(*a, **k):
+        raise CircuitOpenError("yahoo", 30)
+    monkeypatch.setattr(yahoo, "fetch_prices", _down)
+    bulk_upsert_prices(db_session, ensure_symbol(db_session, "TFW.SA").id, _daily(start="2022-01-03", periods=400))
+    upsert_intraday_bars(db_session, ensure_symbol(db_session, "TFI.SA").id, "5m", _intraday(days=10, minutes=5))
+
+    base = {"start_date": "2022-01-03", "end_date": "2023-07-31", "strategy_type": "sma_cross",
+            "strategy_params": {"fast": 3, "slow": 8}}
+    r = client.post("/backtests/run", json={**base, "ticker": "TFW.SA", "timeframe": "1wk"})
+    assert r.status_code == 200, r.text
+    res = client.get(f"/backtests/{r.json()['id']}/results").json()
+    assert 75 <= len(res["equity_curve"]) <= 85        # ~400 pregões em semanas
+
+    # 15m sem barras de 15m armazenadas: reamostra das de 5m
+    r = client.post("/backtests/run", json={**base, "ticker": "TFI.SA", "timeframe": "15m",
+                                            "start_date": "2024-03-04", "end_date": "2024-03-15"})
+    assert r.status_code == 200, r.text
+    assert r.json()["data_source"] == "local"
+    curve = client.get(f"/backtests/{r.json()['id']}/results").json()["equity_curve"]
+    assert len(curve) == 10 * 28 and curve[1]["date"].startswith("2024-03-04T10:15")
+
+    bad = client.post("/backtests/run", json={**base, "ticker": "TFW.SA", "timeframe": "3d"})
+    assert bad.status_code == 400
+
+
+def test_rolling_and_series_of_intraday_backtest(client, db_session, monkeypatch):
+    def _down(*a, **k):
+        raise CircuitOpenError("yahoo", 30)
+    monkeypatch.setattr(yahoo, "fetch_prices", _down)
+    bars = _intraday(days=6, minutes=5, seed=7)
+    upsert_intraday_bars(db_session, ensure_symbol(db_session, "TFR.SA").id, "5m", bars)
+    r = client.post("/backtests/run", json={
+        "ticker": "TFR.SA", "start_date": "2024-03-04", "end_date": "2024-03-11", "timeframe": "1h",
+        "strategy_type": "sma_cross", "strategy_params": {"fast": 3, "slow": 8}})
+    assert r.status_code == 200, r.text
+    bt_id = r.json()["id"]
+
+    rolling = client.get(f"/backtests/{bt_id}/rolling?window=5").json()
+    stamps = [p["date"] for p in rolling["points"]]
+    assert len(stamps) == len(set(stamps)) == rolling["total_points"] == 6 * 7   # 7 barras de 1h por pregão
+    assert stamps[1] == "2024-03-04T11:00:00"
+
+    # anualização intraday: vol. rolante = desvio dos retornos * sqrt(252 * barras por pregão)
+    curve = client.get(f"/backtests/{bt_id}/results").json()["equity_curve"]
+    eq = np.array([p["equity"] for p in curve])
+    rets = eq[1:] / eq[:-1] - 1
+    expected = rets[-5:].std() * np.sqrt(252 * 7)
+    assert rolling["points"][-1]["volatility"] == pytest.approx(expected, rel=1e-6, abs=1e-12)
+
+    series = client.get(f"/backtests/{bt_id}/series?points=2000").json()
+    eq_dates = [p["date"] for p in series["equity"]]
+    assert len(eq_dates) == len(set(eq_dates)) == 6 * 7
+    price = series["price"]
+    assert len(price) == 6 * 7 and price[0]["date"] == "2024-03-04T10:00:00"
+    hourly = timeframes.resample_ohlcv(_cols(bars), "1h")
+    assert price[-1]["value"] == pytest.approx(hourly["close"][-1])